@@ -0,0 +1,347 @@
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import stat
+import struct
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Literal, Optional
+
+"""
+Vibes Coding - Content-Addressed Artifact Store
+
+Generated projects share a lot of identical files (config.py, run.py, error
+handlers, __init__.py boilerplate). The artifact store keeps every distinct
+file content exactly once as a blob named by its SHA-256, and records each
+project as a manifest of path -> blob hash. Project files are materialized
+from the blobs as reflinks where the filesystem supports them, otherwise as
+copies, so disk use grows with unique content rather than with the number of
+projects. A copy takes as much space as its blob, so on filesystems without
+reflinks the default mode deduplicates nothing.
+
+There, link mode "hardlink" deduplicates instead: project files become
+read-only hardlinks to their blobs. A hardlinked project file shares its blob's
+inode, so it is never made writable (editors that save by writing a new file
+and renaming it just break the link); hardlinks are only used when asked for
+explicitly. Garbage collection and the report re-hash every blob, so a blob
+changed through a project file anyway is detected, and removed instead of
+counted as savings. Blobs that no manifest references are removed by garbage
+collection as well.
+
+The report counts what is actually on disk: the blobs, plus every project
+file that shares neither its blob's inode (hardlink) nor its extents (reflink,
+as reported by the filesystem).
+
+Usage:
+    python vibes_artifacts.py report
+    python vibes_artifacts.py gc [--prune-missing]
+    python vibes_artifacts.py materialize MANIFEST TARGET_DIR
+"""
+
+DEFAULT_STORE_DIR = ".vibes_store"
+GC_GRACE_SECONDS = 60 * 60  # Never collect blobs this young: their manifest may still be being written
+FICLONE = 0x40049409  # Linux ioctl that clones a file's extents (btrfs, xfs, ...)
+FS_IOC_FIEMAP = 0xC020660B  # Linux ioctl that maps a file's extents
+FIEMAP_EXTENT_LAST = 0x1
+FIEMAP_EXTENT_SHARED = 0x2000
+FIEMAP_EXTENTS = 32  # Extents fetched per ioctl call
+READ_ONLY = stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH
+
+LinkMode = Literal["auto", "reflink", "hardlink", "copy"]
+
+
+@dataclass
+class StoreReport:
+    projects: int
+    files: int
+    blobs: int
+    logical_bytes: int  # What every project would take as independent copies
+    stored_bytes: int  # What the intact blobs actually take
+    project_bytes: int = 0  # What project files sharing no data with their blob take on top
+    corrupt: List[str] = field(default_factory=list)  # Blobs whose content no longer matches their hash
+
+    @property
+    def disk_bytes(self) -> int:
+        return self.stored_bytes + self.project_bytes
+
+    @property
+    def saved_bytes(self) -> int:
+        return self.logical_bytes - self.disk_bytes
+
+    def summary(self) -> str:
+        ratio = self.logical_bytes / self.disk_bytes if self.disk_bytes else 1.0
+        saved = (f"{self.saved_bytes} bytes saved" if self.saved_bytes >= 0
+                 else f"{-self.saved_bytes} bytes more than plain copies")
+        return (
+            f"Artifact store: {self.projects} projects, {self.files} files, {self.blobs} unique blobs; "
+            f"{self.logical_bytes} bytes logical, {self.disk_bytes} bytes on disk "
+            f"({self.stored_bytes} in blobs, {self.project_bytes} in project copies; {saved}, {ratio:.1f}x dedup)"
+            + (f"; {len(self.corrupt)} corrupt blobs (run gc to remove them)" if self.corrupt else "")
+        )
+
+
+@dataclass
+class GcReport:
+    blobs_removed: int = 0
+    bytes_freed: int = 0
+    manifests_pruned: int = 0
+    corrupt_removed: int = 0
+
+
+def _reflink(source: str, target: str) -> None:
+    import fcntl
+
+    with open(source, "rb") as src, open(target, "wb") as dst:
+        fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+
+
+def _shared_bytes(path: str) -> int:
+    """Bytes of a file in extents the filesystem reports as shared (e.g. with a reflinked blob); 0 if unknown"""
+    try:
+        import fcntl
+    except ImportError:
+        return 0
+    header, extent = struct.Struct("=QQIIII"), struct.Struct("=QQQ2QI3I")
+    shared = 0
+    start = 0
+    try:
+        with open(path, "rb") as f:
+            while True:
+                request = bytearray(header.size + extent.size * FIEMAP_EXTENTS)
+                header.pack_into(request, 0, start, 2 ** 64 - 1 - start, 0, 0, FIEMAP_EXTENTS, 0)
+                fcntl.ioctl(f.fileno(), FS_IOC_FIEMAP, request)
+                mapped = header.unpack_from(request)[3]
+                if not mapped:
+                    break
+                for i in range(mapped):
+                    logical, _, length, _, _, flags, *_ = extent.unpack_from(request, header.size + extent.size * i)
+                    if flags & FIEMAP_EXTENT_SHARED:
+                        shared += length
+                if flags & FIEMAP_EXTENT_LAST:
+                    break
+                start = logical + length
+    except OSError:
+        return 0
+    return shared
+
+
+class ArtifactStore:
+    """Blobs keyed by content hash plus one manifest per project"""
+
+    def __init__(self, root: str = DEFAULT_STORE_DIR, link_mode: LinkMode = "auto"):
+        self.root = root
+        self.link_mode = link_mode
+        self.blobs_added = 0
+        self.blobs_reused = 0
+
+    @classmethod
+    def from_env(cls) -> "ArtifactStore":
+        """Build a store from VIBES_STORE_* environment variables"""
+        return cls(
+            root=os.getenv("VIBES_STORE_DIR", DEFAULT_STORE_DIR),
+            link_mode=os.getenv("VIBES_STORE_LINK", "auto"),
+        )
+
+    def blob_path(self, digest: str) -> str:
+        return os.path.join(self.root, "blobs", digest[:2], digest)
+
+    def manifest_path(self, project_dir: str) -> str:
+        project_dir = os.path.abspath(project_dir)
+        key = hashlib.sha1(project_dir.encode("utf-8")).hexdigest()[:12]
+        return os.path.join(self.root, "manifests", f"{os.path.basename(project_dir)}-{key}.json")
+
+    def put(self, data: bytes) -> str:
+        """Store content once and return its hash"""
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.blob_path(digest)
+        if os.path.exists(path):
+            self.blobs_reused += 1
+            return digest
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.chmod(tmp_path, READ_ONLY)
+        os.replace(tmp_path, path)
+        self.blobs_added += 1
+        return digest
+
+    def link(self, digest: str, target: str) -> str:
+        """Materialize a blob at target; returns how it was done"""
+        source = self.blob_path(digest)
+        # Hardlinks share the blob's inode, so "auto" never uses them: editing the file would corrupt the blob
+        modes = ["reflink", "copy"] if self.link_mode == "auto" else [self.link_mode]
+        for mode in modes:
+            try:
+                if os.path.lexists(target):
+                    os.remove(target)
+                if mode == "reflink":
+                    _reflink(source, target)
+                elif mode == "hardlink":
+                    os.chmod(source, READ_ONLY)  # The project file is the blob's inode, so it must stay read-only
+                    os.link(source, target)
+                else:
+                    shutil.copyfile(source, target)
+                return mode
+            except (OSError, ImportError):
+                if mode == modes[-1]:
+                    raise
+        return modes[-1]
+
+    def save_manifest(self, project_dir: str, files: Dict[str, str], sizes: Dict[str, int]) -> str:
+        """Record a project as path -> blob hash"""
+        path = self.manifest_path(project_dir)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({
+                "project_dir": os.path.abspath(project_dir),
+                "created_at": time.time(),
+                "files": {p: {"sha256": files[p], "size": sizes[p]} for p in sorted(files)},
+            }, f, indent=2)
+        os.replace(tmp_path, path)
+        return path
+
+    def manifests(self) -> List[Dict]:
+        directory = os.path.join(self.root, "manifests")
+        if not os.path.isdir(directory):
+            return []
+        result = []
+        for name in sorted(os.listdir(directory)):
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(directory, name), "r") as f:
+                    result.append(dict(json.load(f), manifest=os.path.join(directory, name)))
+            except (OSError, json.JSONDecodeError):
+                continue
+        return result
+
+    def materialize(self, manifest_path: str, target_dir: str) -> Dict[str, int]:
+        """Recreate a stored project in target_dir; returns how many files each link mode produced"""
+        with open(manifest_path, "r") as f:
+            manifest = json.load(f)
+        root = os.path.abspath(target_dir)
+        counts: Dict[str, int] = {}
+        for path, entry in manifest["files"].items():
+            target = os.path.abspath(os.path.join(root, path))
+            if os.path.commonpath([root, target]) != root:
+                raise ValueError(f"Refusing to materialize file outside the target directory: {path}")
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            mode = self.link(entry["sha256"], target)
+            counts[mode] = counts.get(mode, 0) + 1
+        return counts
+
+    def _blobs(self) -> Dict[str, os.stat_result]:
+        directory = os.path.join(self.root, "blobs")
+        blobs = {}
+        for root, _, names in os.walk(directory):
+            for name in names:
+                if name.endswith(".tmp"):
+                    continue
+                try:
+                    blobs[name] = os.stat(os.path.join(root, name))
+                except FileNotFoundError:
+                    continue
+        return blobs
+
+    def _intact(self, digest: str) -> bool:
+        """Re-hash a blob; False when its content was changed (e.g. through a hardlinked project file)"""
+        sha = hashlib.sha256()
+        try:
+            with open(self.blob_path(digest), "rb") as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                    sha.update(chunk)
+        except FileNotFoundError:
+            return True
+        return sha.hexdigest() == digest
+
+    def _project_bytes(self, project_dir: str, path: str, blob: os.stat_result) -> int:
+        """Bytes a project file takes on top of its blob: none for a hardlink, only unshared extents for a reflink"""
+        try:
+            st = os.stat(os.path.join(project_dir, path))
+        except OSError:
+            return 0
+        if (st.st_dev, st.st_ino) == (blob.st_dev, blob.st_ino):
+            return 0
+        return max(0, st.st_size - _shared_bytes(os.path.join(project_dir, path)))
+
+    def gc(self, prune_missing: bool = False) -> GcReport:
+        """Remove corrupt blobs and blobs no manifest refers to; optionally drop manifests of deleted projects first"""
+        report = GcReport()
+        referenced = set()
+        for manifest in self.manifests():
+            if prune_missing and not os.path.isdir(manifest.get("project_dir", "")):
+                os.remove(manifest["manifest"])
+                report.manifests_pruned += 1
+                continue
+            referenced.update(entry["sha256"] for entry in manifest.get("files", {}).values())
+
+        now = time.time()
+        for digest, st in self._blobs().items():
+            corrupt = not self._intact(digest)
+            if not corrupt and (digest in referenced or now - st.st_mtime < GC_GRACE_SECONDS):
+                continue
+            try:
+                os.remove(self.blob_path(digest))
+            except FileNotFoundError:
+                continue
+            report.blobs_removed += 1
+            report.bytes_freed += st.st_size
+            report.corrupt_removed += corrupt
+        return report
+
+    def report(self) -> StoreReport:
+        manifests = self.manifests()
+        blobs = self._blobs()
+        corrupt = sorted(digest for digest in blobs if not self._intact(digest))
+        files = [(m.get("project_dir", ""), path, entry) for m in manifests for path, entry in m.get("files", {}).items()]
+        # Files whose blob is damaged or gone are not being deduplicated, so they count toward neither side
+        intact = [(d, path, entry) for d, path, entry in files if entry["sha256"] in blobs and entry["sha256"] not in corrupt]
+        return StoreReport(
+            projects=len(manifests),
+            files=len(files),
+            blobs=len(blobs) - len(corrupt),
+            logical_bytes=sum(entry["size"] for _, _, entry in intact),
+            stored_bytes=sum(st.st_size for digest, st in blobs.items() if digest not in corrupt),
+            project_bytes=sum(self._project_bytes(d, path, blobs[entry["sha256"]]) for d, path, entry in intact),
+            corrupt=corrupt,
+        )
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Vibes Coding artifact store maintenance")
+    parser.add_argument("--store-dir", default=os.getenv("VIBES_STORE_DIR", DEFAULT_STORE_DIR))
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("report", help="Show how much space deduplication saves")
+    gc = commands.add_parser("gc", help="Remove blobs that no project manifest refers to")
+    gc.add_argument("--prune-missing", action="store_true", help="First drop manifests whose project directory is gone")
+    materialize = commands.add_parser("materialize", help="Recreate a stored project from its manifest")
+    materialize.add_argument("manifest")
+    materialize.add_argument("target_dir")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    store = ArtifactStore(args.store_dir, os.getenv("VIBES_STORE_LINK", "auto"))
+    if args.command == "report":
+        print(f"🗃️ {store.report().summary()}")
+    elif args.command == "gc":
+        result = store.gc(prune_missing=args.prune_missing)
+        print(f"🧹 Removed {result.blobs_removed} blobs ({result.bytes_freed} bytes, {result.corrupt_removed} corrupt), "
+              f"pruned {result.manifests_pruned} manifests")
+    else:
+        counts = store.materialize(args.manifest, args.target_dir)
+        print(f"📦 Materialized {sum(counts.values())} files in {args.target_dir} "
+              f"({', '.join(f'{n} {mode}' for mode, n in sorted(counts.items()))})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
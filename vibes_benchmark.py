@@ -0,0 +1,582 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextlib
+import glob
+import io
+import json
+import os
+import re
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from agents import set_tracing_disabled
+
+import vibes_coding
+from vibes_cache import ResponseCache
+from vibes_fake_model import FakeModel, FakeModelProvider, FakeRateLimitError, FakeResponse
+from vibes_history import item_text
+from vibes_plan_index import PlanIndex
+from vibes_ratelimit import RateLimiter
+from vibes_server import PipelineServer, http_request
+
+"""
+Vibes Coding - Offline Pipeline Benchmark
+
+Drives vibes_coding's pipeline over the bundled *_vibe.txt specs against the
+offline fake model, once per scenario (baseline, speculative, per-file, ...),
+and reports wall-clock, number of model calls, tokens per phase and pipeline
+overhead (wall-clock time not covered by any model call). No network access
+is needed. With --check it instead runs asserting checks of components that
+a benchmark number alone cannot verify, and exits non-zero if any fails.
+
+Usage:
+    python vibes_benchmark.py
+    python vibes_benchmark.py --scenario baseline --scenario per-file --latency 0.2 --json bench.json
+    python vibes_benchmark.py --import-time
+    python vibes_benchmark.py --check
+    python vibes_benchmark.py --check server
+"""
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+SCENARIOS: Dict[str, Dict[str, Any]] = {
+    "baseline": {},
+    "speculative": {"speculative": True},
+    "optimistic-guardrail": {"optimistic_guardrail": True},
+    "per-file": {"per_file": True},
+    "incremental": {"incremental": True},
+    "history": {"history_budget": 4000},
+    "stream": {"stream": True},
+    "warm-cache": {},
+    "plan-reuse": {"reuse_plans": True},
+    "throttled": {},
+    "server": {},
+    "smoke": {"smoke_tests": True},
+}
+
+# Simulated provider limits for scenarios that exercise the shared rate limiter
+FAKE_PROVIDER_LIMITS: Dict[str, Dict[str, Any]] = {
+    "throttled": {"concurrency_limit": 2, "throttle_rate": 0.05},
+}
+
+# Appended to every spec in the plan-reuse scenario to make near-duplicates of specs seen before
+VARIANT_SUFFIX = "\nKeep the code simple and add comments."
+
+FLASK_FILES = [
+    "run.py", "config.py", "app/__init__.py", "app/routes.py",
+    "app/models.py", "app/utils.py", "app/errors.py", "app/notifications.py",
+]
+CLI_FILES = ["snake_game.py", "config.py"]
+
+
+# Canned outputs, all deterministic functions of the conversation so far
+
+def _spec(items: List[Any]) -> str:
+    return item_text(items[0]) if items else ""
+
+def _mentions(items: List[Any], marker: str) -> bool:
+    return any(marker in item_text(item) for item in items)
+
+def _file_paths(items: List[Any]) -> List[str]:
+    return FLASK_FILES if "flask" in _spec(items).lower() else CLI_FILES
+
+def _file_content(path: str, revised: bool) -> str:
+    header = "# revised after review\n" if revised else ""
+    body = "".join(f"def handler_{i}():\n    return {i}\n\n" for i in range(20))
+    return f"{header}\"\"\"{path}\"\"\"\n\n{body}"
+
+def _plan(items: List[Any]) -> str:
+    kind = "Flask" if "flask" in _spec(items).lower() else "CLI"
+    files = "\n".join(f"- {path}" for path in _file_paths(items))
+    return f"Project type: {kind}\n\nFiles:\n{files}\n\nCore functionality follows the spec.\n"
+
+def _plan_evaluation(items: List[Any]) -> Dict[str, Any]:
+    if _mentions(items, "Plan feedback:") or _mentions(items, vibes_coding.REUSED_PLAN_NOTE):
+        return {"score": "pass", "feedback": "The plan is complete."}
+    return {"score": "needs_improvement", "feedback": "Describe how the user quits the program."}
+
+def _code(items: List[Any]) -> Dict[str, Any]:
+    revised = _mentions(items, "Code Feedback:")
+    return {
+        "files": [
+            {"path": path, "content": _file_content(path, revised), "file_type": "python"}
+            for path in _file_paths(items)
+        ],
+        "explanation": "Generated offline by the fake model.",
+        "dependencies": ["flask"] if "flask" in _spec(items).lower() else ["pygame"],
+        "project_type": "flask" if "flask" in _spec(items).lower() else "cli",
+    }
+
+def _code_evaluation(items: List[Any]) -> Dict[str, Any]:
+    if "# revised" in item_text(items[-1]):
+        return {"score": "pass", "feedback": "Looks good.", "file_verdicts": []}
+    path = _file_paths(items)[-1]
+    return {
+        "score": "needs_improvement",
+        "feedback": f"{path} is missing error handling.",
+        "file_verdicts": [{"path": path, "score": "needs_improvement", "feedback": "Add error handling."}],
+    }
+
+def _file_list(items: List[Any]) -> Dict[str, Any]:
+    code = _code(items)
+    return {
+        "files": [
+            {"path": path, "file_type": "python", "purpose": f"Implements {path}", "interface": "handler_0() -> int"}
+            for path in _file_paths(items)
+        ],
+        "explanation": code["explanation"],
+        "dependencies": code["dependencies"],
+        "project_type": code["project_type"],
+    }
+
+def _single_file(items: List[Any]) -> Dict[str, Any]:
+    match = re.search(r"Generate only the file '([^']+)'", item_text(items[-1]))
+    path = match.group(1) if match else "main.py"
+    return {"path": path, "content": _file_content(path, _mentions(items, "Code Feedback:")), "file_type": "python"}
+
+def _refinement(items: List[Any]) -> Dict[str, Any]:
+    paths = re.findall(r"^File: (.+)$", item_text(items[-1]), flags=re.MULTILINE)
+    return {
+        "files": [{"path": path, "content": _file_content(path, True), "file_type": "python"} for path in paths],
+        "dependencies": [],
+    }
+
+
+def default_responses(latency: float) -> Dict[str, FakeResponse]:
+    """Canned responses for every output type the pipeline uses"""
+    return {
+        "text": FakeResponse(_plan, latency=latency),
+        "ValidationResult": FakeResponse({"is_valid": True, "message": "Valid project description."}, latency=latency),
+        "EvaluationResult": FakeResponse(_plan_evaluation, latency=latency),
+        "CodeEvaluationResult": FakeResponse(_code_evaluation, latency=latency),
+        "CodeGenerationResult": FakeResponse(_code, latency=latency * 4),
+        "ProjectFileList": FakeResponse(_file_list, latency=latency),
+        "FileStructure": FakeResponse(_single_file, latency=latency),
+        "FileRefinementResult": FakeResponse(_refinement, latency=latency),
+    }
+
+
+@dataclass
+class PhaseStats:
+    calls: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    model_seconds: float = 0.0
+
+
+@dataclass
+class ScenarioResult:
+    scenario: str
+    specs: int
+    succeeded: int
+    wall_clock: float
+    model_calls: int
+    model_busy: float  # Wall-clock time covered by at least one model call
+    overhead: float  # Wall-clock time outside of any model call
+    phases: Dict[str, PhaseStats] = field(default_factory=dict)
+    throttled: int = 0  # Calls the fake provider rejected with a 429
+    retries: int = 0
+    rate_wait: float = 0.0  # Seconds calls spent queued in the rate limiter
+
+
+def _agent_names() -> Dict[str, str]:
+    """Map each agent's instructions back to its name so calls can be grouped by phase"""
+    return {
+        agent.instructions: agent.name
+        for agent in vibes_coding.build_agents().values()
+        if isinstance(agent.instructions, str)
+    }
+
+def _busy_time(intervals: List[tuple[float, float]]) -> float:
+    """Length of the union of (start, end) intervals"""
+    busy = 0.0
+    current_start = current_end = None
+    for start, end in sorted(intervals):
+        if current_end is None or start > current_end:
+            if current_end is not None:
+                busy += current_end - current_start
+            current_start, current_end = start, end
+        else:
+            current_end = max(current_end, end)
+    if current_end is not None:
+        busy += current_end - current_start
+    return busy
+
+
+async def run_through_server(specs: List[str], workdir: str, options: vibes_coding.PipelineOptions) -> List[Any]:
+    """Submit every spec to a local pipeline server over HTTP, follow its events and fetch its archive"""
+    server = PipelineServer(os.path.join(workdir, "server-jobs"), workers=len(specs), options=options)
+    await server.start()
+    try:
+        host, port = await server.serve("127.0.0.1", 0)
+
+        async def submit_and_wait(spec: str) -> Any:
+            with open(spec) as f:
+                body = json.dumps({"spec": f.read(), "name": os.path.basename(spec)[:-4]}).encode("utf-8")
+            status, _, payload = await http_request(host, port, "POST", "/jobs", body, "application/json")
+            if status != 202:
+                raise RuntimeError(f"Server refused {spec}: {status} {payload!r}")
+            job_id = json.loads(payload)["id"]
+            await http_request(host, port, "GET", f"/jobs/{job_id}/events")  # Returns once the job has ended
+            job = server.jobs[job_id]
+            if job.status == "success":
+                status, headers, _ = await http_request(host, port, "GET", f"/jobs/{job_id}/archive")
+                if status != 200 or headers.get("content-type") != "application/zip":
+                    raise RuntimeError(f"No archive for {spec}: {status}")
+            return job.result
+
+        return await asyncio.gather(*(submit_and_wait(spec) for spec in specs))
+    finally:
+        await server.stop()
+
+
+async def run_scenario(scenario: str, spec_files: List[str], latency: float, workdir: str, verbose: bool = False) -> ScenarioResult:
+    model = FakeModel(default_responses(latency), **FAKE_PROVIDER_LIMITS.get(scenario, {}))
+    vibes_coding.use_model_provider(FakeModelProvider(model))
+    limiter = vibes_coding.rate_limiter = RateLimiter(base_delay=latency, max_delay=latency * 20)
+    cache_dir = os.path.join(workdir, f".cache-{scenario}")
+    vibes_coding.response_cache = ResponseCache(cache_dir=cache_dir, enabled=scenario == "warm-cache")
+    vibes_coding.plan_index = PlanIndex(path=os.path.join(workdir, f"plans-{scenario}.json"))
+    options = vibes_coding.PipelineOptions(**SCENARIOS[scenario])
+
+    specs = []
+    for spec in spec_files:
+        target = os.path.join(workdir, scenario, os.path.basename(spec))
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        shutil.copy(spec, target)
+        specs.append(target)
+
+    output = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+    with output:
+        if scenario == "warm-cache":
+            # Fill the cache first, then measure the replay
+            await asyncio.gather(*(vibes_coding.run_vibes_pipeline(spec, options) for spec in specs))
+            model.calls.clear()
+        if scenario == "plan-reuse":
+            # Approve plans for the original specs, then measure near-duplicate variants of them
+            await asyncio.gather(*(vibes_coding.run_vibes_pipeline(spec, options) for spec in specs))
+            model.calls.clear()
+            variants = []
+            for spec in specs:
+                variant = spec.replace(".txt", "_variant.txt")
+                with open(spec) as src, open(variant, "w") as dst:
+                    dst.write(src.read() + VARIANT_SUFFIX)
+                variants.append(variant)
+            specs = variants
+        started = time.perf_counter()
+        if scenario == "server":
+            results = await run_through_server(specs, workdir, options)
+        else:
+            results = await asyncio.gather(*(vibes_coding.run_vibes_pipeline(spec, options) for spec in specs))
+        wall_clock = time.perf_counter() - started
+
+    names = _agent_names()
+    phases: Dict[str, PhaseStats] = {}
+    for call in model.calls:
+        stats = phases.setdefault(names.get(call.system_instructions, call.response_key), PhaseStats())
+        stats.calls += 1
+        stats.input_tokens += call.input_tokens
+        stats.output_tokens += call.output_tokens
+        stats.model_seconds += call.ended - call.started
+
+    busy = _busy_time([(call.started, call.ended) for call in model.calls])
+    return ScenarioResult(
+        scenario=scenario,
+        specs=len(specs),
+        succeeded=sum(1 for r in results if r is not None and r.status == "success"),
+        wall_clock=wall_clock,
+        model_calls=len(model.calls),
+        model_busy=busy,
+        overhead=max(0.0, wall_clock - busy),
+        phases=phases,
+        throttled=model.throttled,
+        retries=limiter.stats.retries,
+        rate_wait=limiter.stats.wait_seconds,
+    )
+
+
+def print_report(results: List[ScenarioResult]) -> None:
+    print("\n📊 Pipeline Benchmark (offline fake model)")
+    print(f"{'Scenario':<20}  {'Specs':>5}  {'OK':>3}  {'Wall':>8}  {'Calls':>5}  {'Tokens in':>9}  {'Tokens out':>10}  {'Overhead':>8}")
+    for r in results:
+        tokens_in = sum(p.input_tokens for p in r.phases.values())
+        tokens_out = sum(p.output_tokens for p in r.phases.values())
+        print(
+            f"{r.scenario:<20}  {r.specs:>5}  {r.succeeded:>3}  {r.wall_clock:>7.2f}s  {r.model_calls:>5}  "
+            f"{tokens_in:>9}  {tokens_out:>10}  {r.overhead:>7.3f}s"
+        )
+
+    for r in results:
+        if not r.phases:
+            continue
+        print(f"\n{r.scenario} - tokens per phase")
+        print(f"  {'Phase':<20}  {'Calls':>5}  {'In':>8}  {'Out':>8}  {'Model time':>10}")
+        for name, p in sorted(r.phases.items()):
+            print(f"  {name:<20}  {p.calls:>5}  {p.input_tokens:>8}  {p.output_tokens:>8}  {p.model_seconds:>9.2f}s")
+        if r.throttled or r.retries:
+            print(f"  🚦 {r.throttled} calls throttled, {r.retries} retries, {r.rate_wait:.2f}s queued in the rate limiter")
+
+
+async def run_benchmark(scenarios: List[str], spec_files: List[str], latency: float, verbose: bool = False) -> List[ScenarioResult]:
+    set_tracing_disabled(True)
+    saved_cache, saved_config, saved_index = vibes_coding.response_cache, vibes_coding.run_config, vibes_coding.plan_index
+    saved_limiter = vibes_coding.rate_limiter
+    workdir = tempfile.mkdtemp(prefix="vibes-bench-")
+    try:
+        return [await run_scenario(s, spec_files, latency, workdir, verbose) for s in scenarios]
+    finally:
+        vibes_coding.response_cache, vibes_coding.run_config, vibes_coding.plan_index = saved_cache, saved_config, saved_index
+        vibes_coding.rate_limiter = saved_limiter
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+async def check_rate_limiter(spec_files: List[str], latency: float) -> None:
+    """Injected 429s are retried once each, halve the concurrency limit, and the limit grows back"""
+    limiter = RateLimiter(max_concurrency=8, max_retries=5, base_delay=0.001, max_delay=0.01)
+    injected = 3
+    remaining = [injected]
+
+    async def flaky() -> str:
+        if remaining[0]:
+            remaining[0] -= 1
+            raise FakeRateLimitError()
+        await asyncio.sleep(latency)
+        return "ok"
+
+    result, report = await limiter.run(flaky)
+    assert result == "ok", result
+    assert report.retries == injected, f"{injected} injected 429s gave {report.retries} retries"
+    assert limiter.stats.throttled == injected and limiter.stats.failures == 0, limiter.summary()
+    assert limiter.stats.min_concurrency == 8 / 2 ** injected, f"concurrency fell to {limiter.stats.min_concurrency}"
+
+    async def ok() -> str:
+        await asyncio.sleep(latency / 10)
+        return "ok"
+
+    # Additive increase: from 1 back to 8 takes 1 + 2 + ... + 7 = 28 successful calls
+    await asyncio.gather(*(limiter.run(ok) for _ in range(40)))
+    assert limiter.concurrency.limit == limiter.concurrency.maximum, f"concurrency only recovered to {limiter.concurrency.limit:.2f}"
+
+    assert limiter.backoff(0, FakeRateLimitError(retry_after=0.2)) >= 0.2, "Retry-After was not honoured"
+    delays = [limiter.backoff(attempt, FakeRateLimitError()) for attempt in range(3)]
+    assert all(0 <= delay <= min(limiter.max_delay, limiter.base_delay * 2 ** i) for i, delay in enumerate(delays)), delays
+
+    giving_up = RateLimiter(max_retries=2, base_delay=0.001)
+
+    async def always_throttled() -> str:
+        raise FakeRateLimitError()
+
+    try:
+        await giving_up.run(always_throttled)
+    except FakeRateLimitError:
+        pass
+    else:
+        raise AssertionError("a call that is always throttled did not give up")
+    assert giving_up.stats.retries == 2 and giving_up.stats.failures == 1, giving_up.summary()
+
+    # The whole pipeline against the fake provider's own 429s: every spec succeeds and every 429 is retried once
+    throttled = (await run_benchmark(["throttled"], spec_files, latency))[0]
+    assert throttled.succeeded == throttled.specs, f"{throttled.succeeded}/{throttled.specs} specs succeeded"
+    assert throttled.throttled > 0, "the fake provider throttled nothing"
+    assert throttled.retries == throttled.throttled, f"{throttled.throttled} 429s but {throttled.retries} retries"
+
+
+async def _wait_for_status(job: Any, statuses: tuple[str, ...], timeout: float = 10.0) -> None:
+    deadline = time.perf_counter() + timeout
+    while job.status not in statuses:
+        assert time.perf_counter() < deadline, f"job {job.id} stayed {job.status}, expected {' or '.join(statuses)}"
+        await asyncio.sleep(0.005)
+
+
+async def check_server(spec_files: List[str], latency: float) -> None:
+    """Submit, queue limit, cancelling queued and running jobs, HTTP errors and stopping with a job running"""
+    set_tracing_disabled(True)
+    saved_cache, saved_config, saved_index = vibes_coding.response_cache, vibes_coding.run_config, vibes_coding.plan_index
+    saved_limiter = vibes_coding.rate_limiter
+    workdir = tempfile.mkdtemp(prefix="vibes-check-")
+    vibes_coding.use_model_provider(FakeModelProvider(FakeModel(default_responses(latency))))
+    vibes_coding.rate_limiter = RateLimiter(base_delay=latency, max_delay=latency * 20)
+    vibes_coding.response_cache = ResponseCache(cache_dir=os.path.join(workdir, ".cache"), enabled=False)
+    vibes_coding.plan_index = PlanIndex(path=os.path.join(workdir, "plans.json"))
+    with open(spec_files[0]) as f:
+        spec = f.read()
+    server = PipelineServer(os.path.join(workdir, "jobs"), workers=1, max_queue=1)
+    await server.start()
+    stopped = False
+    try:
+        host, port = await server.serve("127.0.0.1", 0)
+
+        async def request(method: str, path: str, body: bytes = b"", content_type: str = "text/plain"):
+            status, headers, payload = await http_request(host, port, method, path, body, content_type)
+            is_json = headers.get("content-type", "").startswith("application/json")
+            return status, headers, json.loads(payload) if is_json else payload
+
+        # Submit over HTTP, follow the events to the end and fetch the project
+        body = json.dumps({"spec": spec, "name": "first"}).encode("utf-8")
+        status, _, job = await request("POST", "/jobs", body, "application/json")
+        assert status == 202, f"submit gave {status}: {job}"
+        await request("GET", f"/jobs/{job['id']}/events")
+        status, _, job = await request("GET", f"/jobs/{job['id']}")
+        assert status == 200 and job["status"] == "success", f"first job ended {job}"
+        status, headers, _ = await request("GET", f"/jobs/{job['id']}/archive")
+        assert status == 200 and headers.get("content-type") == "application/zip", f"archive gave {status}"
+
+        # HTTP error paths
+        for method, path, body, content_type, expected in [
+            ("GET", "/jobs/unknown", b"", "text/plain", 404),
+            ("GET", "/nowhere", b"", "text/plain", 404),
+            ("PUT", "/jobs", b"", "text/plain", 405),
+            ("POST", f"/jobs/{job['id']}/log", b"", "text/plain", 405),
+            ("POST", "/jobs", b"  \n", "text/plain", 400),
+            ("POST", "/jobs", b"{not json", "application/json", 400),
+            ("POST", "/jobs", b'{"name": "no spec"}', "application/json", 400),
+        ]:
+            status, _, _ = await request(method, path, body, content_type)
+            assert status == expected, f"{method} {path} gave {status}, expected {expected}"
+
+        # Queue limit: one job running and one waiting fill a queue of one, so the next is refused
+        status, _, running = await request("POST", "/jobs", spec.encode("utf-8"))
+        assert status == 202, f"submit gave {status}"
+        await _wait_for_status(server.jobs[running["id"]], ("running",))
+        status, _, queued = await request("POST", "/jobs", spec.encode("utf-8"))
+        assert status == 202, f"submit gave {status}"
+        status, headers, _ = await request("POST", "/jobs", spec.encode("utf-8"))
+        assert status == 503 and "retry-after" in headers, f"full queue gave {status} {headers}"
+
+        # Cancel the queued job, then the running one; the worker survives both
+        status, _, cancelled = await request("DELETE", f"/jobs/{queued['id']}")
+        assert status == 200 and cancelled["status"] == "cancelled", f"cancelling a queued job gave {cancelled}"
+        status, _, _ = await request("GET", f"/jobs/{queued['id']}/archive")
+        assert status == 409, f"archive of a cancelled job gave {status}"
+        status, _, _ = await request("DELETE", f"/jobs/{running['id']}")
+        assert status == 200, f"cancelling a running job gave {status}"
+        await _wait_for_status(server.jobs[running["id"]], ("cancelled",))
+        assert server.jobs[running["id"]].message == "Cancelled while running", server.jobs[running["id"]].message
+        assert not any(task.done() for task in server._tasks), "a worker died with its cancelled job"
+
+        # Stop with a job running: the job is cancelled and every worker ends
+        last = server.submit(spec, "last")
+        await _wait_for_status(last, ("running",))
+        try:
+            await asyncio.wait_for(server.stop(), timeout=10)
+        except asyncio.TimeoutError:
+            raise AssertionError("stop() hung with a job running") from None
+        finally:
+            stopped = True
+        assert last.status == "cancelled" and last.message == "Server stopped", f"{last.status}: {last.message}"
+        assert all(task.done() for task in server._tasks), "a worker outlived stop()"
+    finally:
+        if not stopped:
+            await server.stop()
+        vibes_coding.response_cache, vibes_coding.run_config, vibes_coding.plan_index = saved_cache, saved_config, saved_index
+        vibes_coding.rate_limiter = saved_limiter
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+CHECKS: Dict[str, Callable[[List[str], float], Awaitable[None]]] = {
+    "rate-limiter": check_rate_limiter,
+    "server": check_server,
+}
+
+
+async def run_checks(names: List[str], spec_files: List[str], latency: float) -> bool:
+    passed = True
+    for name in names:
+        started = time.perf_counter()
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                await CHECKS[name](spec_files, latency)
+        except AssertionError as e:
+            passed = False
+            print(f"❌ {name}: {e}")
+        else:
+            print(f"✅ {name} ({time.perf_counter() - started:.2f}s)")
+    return passed
+
+
+# Cold-start statements, each timed in a fresh interpreter
+IMPORT_STAGES = [
+    ("import vibes_coding", "import vibes_coding"),
+    ("+ build agents (SDK import)", "import vibes_coding; vibes_coding.build_agents()"),
+    ("+ runtime setup (.env, telemetry)", "import vibes_coding; vibes_coding.build_agents(); vibes_coding.ensure_runtime()"),
+]
+
+
+def measure_import_time(repeats: int = 5) -> List[tuple[str, float]]:
+    """Median cold-start time of each import stage, measured in fresh subprocesses
+
+    The last stage is only a proxy for the old eager import: it is measured on the current tree with
+    telemetry off, so it leaves out the blocking AgentOps network round-trip and whatever else the
+    eager module did differently. It is not a measurement of the old module.
+    """
+    env = dict(os.environ, VIBES_TELEMETRY="0")
+    results = []
+    for label, statement in IMPORT_STAGES:
+        code = f"import time; t = time.perf_counter(); {statement}; print(time.perf_counter() - t)"
+        samples = []
+        for _ in range(repeats):
+            completed = subprocess.run(
+                [sys.executable, "-c", code], cwd=REPO_DIR, env=env, capture_output=True, text=True, check=True,
+            )
+            samples.append(float(completed.stdout.strip().splitlines()[-1]))
+        results.append((label, statistics.median(samples)))
+    return results
+
+
+def print_import_report(results: List[tuple[str, float]]) -> None:
+    print("\n🚀 Cold-start import time (median of fresh interpreters)")
+    for label, seconds in results:
+        print(f"  {label:<36} {seconds * 1000:>8.1f} ms")
+    lazy, eager = results[0][1], results[-1][1]
+    print(f"\n  Bare import is {eager / lazy:.1f}x faster than import plus full setup ({(eager - lazy) * 1000:.0f} ms less)")
+    print("  (full setup is a proxy for the old eager import, measured on this tree with telemetry off)")
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Offline benchmark for the Vibes Coding pipeline")
+    parser.add_argument("--scenario", action="append", choices=list(SCENARIOS),
+                        help="Scenario to run (repeatable, default: all)")
+    parser.add_argument("--specs", default=os.path.join(REPO_DIR, "*_vibe.txt"),
+                        help="Glob of spec files to drive the pipeline with")
+    parser.add_argument("--latency", type=float, default=0.05, help="Simulated seconds per model call")
+    parser.add_argument("--json", metavar="PATH", help="Also write the results as JSON")
+    parser.add_argument("--verbose", action="store_true", help="Show the pipeline's own output")
+    parser.add_argument("--import-time", action="store_true",
+                        help="Measure cold-start import time of vibes_coding instead of running the pipeline")
+    parser.add_argument("--check", action="append", nargs="?", const="all", choices=["all", *CHECKS],
+                        help="Run asserting checks (all, or the named one; repeatable) instead of the benchmark")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    if args.import_time:
+        print_import_report(measure_import_time())
+        return 0
+
+    spec_files = sorted(glob.glob(args.specs))
+    if not spec_files:
+        print(f"⚠️ No spec files match '{args.specs}'")
+        return 1
+    if args.check:
+        names = list(CHECKS) if "all" in args.check else list(dict.fromkeys(args.check))
+        return 0 if asyncio.run(run_checks(names, spec_files, args.latency)) else 1
+
+    results = asyncio.run(run_benchmark(args.scenario or list(SCENARIOS), spec_files, args.latency, args.verbose))
+    print_report(results)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump([asdict(r) for r in results], f, indent=2)
+    return 0 if all(r.succeeded == r.specs for r in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,228 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from pydantic import TypeAdapter
+
+"""
+Vibes Coding - Response Cache
+
+A persistent, content-addressed cache for agent runs. Each entry is keyed by the
+agent name, instructions, output_type schema, model settings and a hash of the
+input items, so rerunning an unchanged spec replays every phase from disk with
+zero model calls.
+
+Entries are stored as JSON files under the cache directory and evicted by age
+and by total size (least recently used first). Writes keep a running total of
+the cache size, so the directory is only scanned when the total exceeds the
+budget (the cache is then trimmed to 90% of it) and every EVICT_EVERY writes,
+to expire old entries and pick up what other processes wrote.
+"""
+
+DEFAULT_CACHE_DIR = ".vibes_cache"
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+DEFAULT_MAX_AGE_SECONDS = 30 * 24 * 60 * 60
+EVICT_EVERY = 100  # Writes between full scans of the cache directory
+EVICT_LOW_WATER = 0.9  # An over-budget cache is trimmed to this fraction of max_bytes, so scans stay rare
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    writes: int = 0
+    evictions: int = 0
+
+
+def _stable_json(value: Any) -> str:
+    """Serialize a value to JSON with a deterministic key order"""
+    return json.dumps(value, sort_keys=True, default=str, separators=(",", ":"))
+
+
+def hash_input_items(input_items: List[Any]) -> str:
+    """Hash a conversation history into a stable hex digest"""
+    return hashlib.sha256(_stable_json(input_items).encode("utf-8")).hexdigest()
+
+
+def output_schema_for(agent: Any) -> Optional[Dict[str, Any]]:
+    """Return the JSON schema of an agent's output_type, or None for plain text agents"""
+    if agent.output_type is None or agent.output_type is str:
+        return None
+    try:
+        return TypeAdapter(agent.output_type).json_schema()
+    except Exception:
+        return {"type": repr(agent.output_type)}
+
+
+def serialize_output(output: Any, output_type: Any) -> Any:
+    """Convert an agent's final output into JSON-compatible data"""
+    if output_type is None or output_type is str:
+        return output
+    return TypeAdapter(output_type).dump_python(output, mode="json")
+
+
+def deserialize_output(data: Any, output_type: Any) -> Any:
+    """Rebuild an agent's final output from cached JSON data"""
+    if output_type is None or output_type is str:
+        return data
+    return TypeAdapter(output_type).validate_python(data)
+
+
+class ResponseCache:
+    """On-disk response cache with size/age-based LRU eviction"""
+
+    def __init__(
+        self,
+        cache_dir: str = DEFAULT_CACHE_DIR,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        max_age_seconds: float = DEFAULT_MAX_AGE_SECONDS,
+        enabled: bool = True,
+    ):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self.enabled = enabled
+        self.stats = CacheStats()
+        self._bytes: Optional[int] = None  # Running total of the cache size; None until the first scan
+        self._writes_since_scan = 0
+
+    @classmethod
+    def from_env(cls) -> "ResponseCache":
+        """Build a cache from VIBES_CACHE_* environment variables"""
+        return cls(
+            cache_dir=os.getenv("VIBES_CACHE_DIR", DEFAULT_CACHE_DIR),
+            max_bytes=int(float(os.getenv("VIBES_CACHE_MAX_MB", DEFAULT_MAX_BYTES / (1024 * 1024))) * 1024 * 1024),
+            max_age_seconds=float(os.getenv("VIBES_CACHE_MAX_AGE_DAYS", DEFAULT_MAX_AGE_SECONDS / 86400)) * 86400,
+            enabled=os.getenv("VIBES_CACHE_BYPASS", "").lower() not in ("1", "true", "yes"),
+        )
+
+    def make_key(self, agent: Any, input_items: List[Any], namespace: Optional[str] = None) -> str:
+        """Build the content address for one agent run
+
+        namespace separates entries produced by different model providers (e.g. the offline fake model).
+        """
+        model = agent.model if isinstance(agent.model, (str, type(None))) else type(agent.model).__name__
+        key_material = {
+            "agent": agent.name,
+            "instructions": agent.instructions if isinstance(agent.instructions, str) else repr(agent.instructions),
+            "output_schema": output_schema_for(agent),
+            "model": model,
+            "model_settings": agent.model_settings.to_json_dict(),
+            "input": hash_input_items(input_items),
+        }
+        tools = getattr(agent, "tools", None)
+        if tools:
+            key_material["tools"] = sorted(tool.name for tool in tools)
+        if namespace:
+            key_material["namespace"] = namespace
+        return hashlib.sha256(_stable_json(key_material).encode("utf-8")).hexdigest()
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return a cached entry, or None on a miss or when the cache is bypassed"""
+        if not self.enabled:
+            return None
+        path = self._entry_path(key)
+        try:
+            with open(path, "r") as f:
+                entry = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.stats.misses += 1
+            return None
+
+        if time.time() - entry.get("created_at", 0) > self.max_age_seconds:
+            self._remove(path)
+            self.stats.misses += 1
+            return None
+
+        # Touch the entry so eviction treats it as recently used
+        os.utime(path, None)
+        self.stats.hits += 1
+        return entry
+
+    def put(self, key: str, entry: Dict[str, Any]) -> None:
+        """Store an entry atomically, then enforce the size and age limits"""
+        if not self.enabled:
+            return
+        path = self._entry_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        entry = dict(entry, created_at=time.time())
+        data = _stable_json(entry).encode("utf-8")
+        try:
+            replaced = os.path.getsize(path)
+        except OSError:
+            replaced = 0
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        self.stats.writes += 1
+        self._writes_since_scan += 1
+        if self._bytes is not None:
+            self._bytes += len(data) - replaced
+        if self._bytes is None or self._bytes > self.max_bytes or self._writes_since_scan >= EVICT_EVERY:
+            self.evict()
+
+    def _remove(self, path: str) -> None:
+        try:
+            os.remove(path)
+            self.stats.evictions += 1
+        except FileNotFoundError:
+            pass
+
+    def evict(self) -> None:
+        """Drop expired entries, then, when over max_bytes, least recently used ones down to the low-water mark"""
+        if not os.path.isdir(self.cache_dir):
+            return
+        now = time.time()
+        entries = []
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if not name.endswith(".json"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                # mtime is refreshed on every hit, so it doubles as last-used time
+                if now - st.st_mtime > self.max_age_seconds:
+                    self._remove(path)
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        target = self.max_bytes * EVICT_LOW_WATER if total > self.max_bytes else self.max_bytes
+        for _, size, path in sorted(entries):
+            if total <= target:
+                break
+            self._remove(path)
+            total -= size
+        self._bytes = total
+        self._writes_since_scan = 0
+
+    def clear(self) -> None:
+        """Remove every cached entry"""
+        if not os.path.isdir(self.cache_dir):
+            return
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if name.endswith(".json"):
+                    self._remove(os.path.join(root, name))
+        self._bytes = 0
+
+    def summary(self) -> str:
+        total = self.stats.hits + self.stats.misses
+        hit_rate = (self.stats.hits / total * 100) if total else 0.0
+        state = "on" if self.enabled else "bypassed"
+        return (
+            f"Cache ({state}): {self.stats.hits} hits, {self.stats.misses} misses "
+            f"({hit_rate:.0f}% hit rate), {self.stats.writes} writes, {self.stats.evictions} evictions"
+        )
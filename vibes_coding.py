@@ -1,14 +1,37 @@
 from __future__ import annotations
 
+import argparse
 import asyncio
+import glob
+import json
+import sys
+import threading
+import time
 from dataclasses import dataclass
-from typing import Literal, Optional, List, Dict
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Literal, Optional, List, Dict
 import os
-from dotenv import load_dotenv
+import shutil
 
-import agentops
+from vibes_artifacts import ArtifactStore
+from vibes_cache import ResponseCache, deserialize_output, serialize_output
+from vibes_dag import Dag, Node, NodeTimeout
+from vibes_envs import EnvBuildError, EnvCache, PreparedEnv
+from vibes_history import HistoryManager, count_tokens, item_tokens
+from vibes_journal import Journal
+from vibes_metrics import RunMetrics, active_run, export_metrics
+from vibes_plan_index import PlanIndex, PlanMatch
+from vibes_policy import PhaseBudget, RefinementLoop, RefinementPolicy
+from vibes_ratelimit import RateLimiter
+from vibes_routing import ModelRouter, model_name
+from vibes_smoke import SmokeReport, SmokeRunner
+from vibes_static_checks import StaticReport, check_files
+from vibes_streaming import StreamMonitor
+from vibes_symbols import SymbolIndex, active_index, symbol_tools
+from vibes_writer import write_project
 
-from agents import Agent, ItemHelpers, Runner, TResponseInputItem, trace, MessageOutputItem
+if TYPE_CHECKING:
+    # The Agents SDK is slow to import, so it is only loaded when the first agent is built or run
+    from agents import Agent, ModelProvider, RunConfig, TResponseInputItem
 
 """
 Vibes Coding - A natural language programming system that allows experienced programmers
@@ -20,16 +43,28 @@ This system uses multiple agents:
 3. Code Generation Agent - Converts the approved plan into actual code
 4. Code Evaluator - Judges the quality of the generated code
 5. Input/Output Guardrails - Ensures inputs and outputs meet quality standards
-"""
-load_dotenv()
 
-agentops.init(os.getenv("AGENTOPS_API_KEY"))
+Importing this module has no side effects: the agents, the .env file and the optional
+AgentOps telemetry are all set up on first use.
+"""
 
 @dataclass
 class EvaluationResult:
     score: Literal["pass", "needs_improvement", "fail"]
     feedback: str
 
+@dataclass
+class FileVerdict:
+    path: str
+    score: Literal["pass", "needs_improvement", "fail"]
+    feedback: str
+
+@dataclass
+class CodeEvaluationResult:
+    score: Literal["pass", "needs_improvement", "fail"]
+    feedback: str
+    file_verdicts: List[FileVerdict] = None  # Only the files that need changes
+
 @dataclass
 class FileStructure:
     path: str
@@ -43,6 +78,25 @@ class CodeGenerationResult:
     dependencies: List[str] = None
     project_type: str = None  # New field to identify project type
 
+@dataclass
+class PlannedFile:
+    path: str
+    file_type: Literal["python", "html", "css", "js", "config", "other"]
+    purpose: str
+    interface: str  # Public classes, functions and routes that sibling files may rely on
+
+@dataclass
+class ProjectFileList:
+    files: List[PlannedFile]
+    explanation: str
+    dependencies: List[str] = None
+    project_type: str = None
+
+@dataclass
+class FileRefinementResult:
+    files: List[FileStructure]
+    dependencies: List[str] = None
+
 @dataclass
 class ValidationResult:
     is_valid: bool
@@ -53,129 +107,331 @@ class ProjectStructure:
     root_dir: str
     subdirs: Dict[str, str] = None  # Dynamic subdirectories based on project type
 
-# Planning and Outline Generation Agent
-planning_agent = Agent(
-    name="planning_agent",
-    instructions=(
-        "You are a planning agent for the Vibes Coding system. "
-        "Analyze the input to determine the appropriate project type and structure. "
-        "Break down the request into clear components including:\n"
-        "1. Project type (Flask, CLI, library, etc.)\n"
-        "2. Project structure and files needed\n"
-        "3. Core functionality components\n"
-        "4. External dependencies\n"
-        "5. Configuration requirements\n"
-        "Create a comprehensive plan that matches the user's requirements."
-    ),
-)
+@dataclass
+class AgentRunResult:
+    final_output: object
+    text_output: str
+    input_list: List[TResponseInputItem]
+    cached: bool = False
+    input_tokens: int = 0
+    output_tokens: int = 0
+    model_calls: int = 0
+    retries: int = 0  # Calls the rate limiter had to retry
+    rate_wait: float = 0.0  # Seconds queued in the rate limiter
 
-# Plan Evaluation Agent
-plan_evaluator = Agent[None](
-    name="plan_evaluator",
-    instructions=(
-        "You evaluate a programming plan created from natural language 'vibes' input. "
-        "Assess if the plan correctly captures the programmer's intent and is structured logically. "
-        "Check that the plan is complete, efficient, and follows best practices. "
-        "Be critical and thorough - the plan should be detailed enough for code generation. "
-        "Never give a pass on the first try - always find at least one thing to improve."
-        "make sure that the plan is not too vague or too detailed"
-        "make sure that the user can quit the program if they want to"
-    ),
-    output_type=EvaluationResult,
-)
+    def to_input_list(self) -> List[TResponseInputItem]:
+        return list(self.input_list)
 
-# Code Generation Agent
-code_generator = Agent[None](
-    name="code_generator",
-    instructions=(
-        "You generate code based on the approved plan. "
-        "Follow best practices for the identified project type:\n"
-        "- For Flask apps: Use standard Flask project structure\n"
-        "- For CLI tools: Use a simple script or click/typer structure\n"
-        "- For libraries: Use standard package structure\n"
-        "Generate all necessary files for a complete, runnable project. "
-        "Return a list of FileStructure objects containing the path and content for each file."
-    ),
-    output_type=CodeGenerationResult,
-)
+@dataclass
+class PipelineOptions:
+    speculative: bool = False  # Start code generation while the plan is still being evaluated
+    optimistic_guardrail: bool = False  # Start the first plan while the input is still being validated
+    per_file: bool = False  # Generate each planned file with its own agent call
+    file_concurrency: int = 4  # Maximum concurrent per-file generation calls
+    incremental: bool = False  # Regenerate only the files the code evaluator flagged
+    history_budget: int = 0  # Token budget for compacted conversation history (0 disables compaction)
+    stream: bool = False  # Stream plans to the console and files to a staging directory as they arrive
+    metrics_dir: Optional[str] = None  # Directory for JSON run reports and Prometheus text files
+    static_checks: bool = True  # Check generated files locally and skip the code evaluator when they fail
+    output_guardrail: bool = True  # Review generated code for security and quality alongside the code evaluator
+    smoke_tests: bool = False  # Run the generated project in isolated subprocesses alongside the reviews
+    env_cache: bool = False  # Link a cached environment with the project's dependencies into it (and smoke-test in it)
+    policy: Optional[RefinementPolicy] = None  # Attempt limits and time/token budgets; None uses the defaults
+    reuse_plans: bool = False  # Start from the approved plan of a near-duplicate earlier spec
+    artifact_store: bool = False  # Keep project files as deduplicated blobs in the artifact store
+    resume: bool = False  # Replay the phases an interrupted run journaled instead of running them again
+    node_timeouts: Optional[Dict[str, float]] = None  # Seconds per pipeline graph node, e.g. {"code": 600}
 
-# Code Evaluation Agent
-code_evaluator = Agent[None](
-    name="code_evaluator",
-    instructions=(
-        "You evaluate generated code against the original 'vibes' input and the approved plan. "
-        "Assess whether the code correctly implements the plan and captures the programmer's intent. "
-        "Check for bugs, inefficiencies, or deviations from best practices. "
-        "Be critical but constructive - provide specific feedback for improvements."
-    ),
-    output_type=EvaluationResult,
-)
+@dataclass
+class PipelineResult:
+    spec_path: str
+    status: Literal["success", "rejected", "error"]
+    message: str
+    project_dir: str = None
+    duration: float = 0.0
+    speculation_saved: float = 0.0  # Seconds of code generation hidden behind plan evaluation
+    speculation_wasted: float = 0.0  # Seconds of code generation spent on discarded plans
+    guardrail_saved: float = 0.0  # Seconds of the first plan hidden behind input validation
+    guardrail_wasted: float = 0.0  # Seconds of planning and speculative coding spent on rejected inputs
+    metrics: Optional[RunMetrics] = None
 
-# Input Guardrail Agent
-input_guardrail = Agent[None](
-    name="input_guardrail",
-    instructions=(
-        "You validate that the natural language input is appropriate for code generation."
-        "the input should be a description of the project and the structure of the project."
-        "if there is text, validate it and say is_valid is true"
-    ),
-    output_type=ValidationResult,
-)
+@dataclass
+class PlanStage:
+    plan: str
+    input_items: List[TResponseInputItem]  # Conversation that produced the final plan
+    loop: RefinementLoop
+    approved: bool = False  # False when the plan loop stopped without the evaluator's pass
+    speculative_task: Optional[asyncio.Task] = None  # Code generation already running on the final plan
+    speculation_started: float = 0.0
+    plan_eval_duration: float = 0.0
+
+@dataclass
+class CodeStage:
+    output: CodeGenerationResult
+    files: List[FileStructure]
+    loop: RefinementLoop
+
+class PipelineStopped(Exception):
+    """A pipeline node ended the run early with a final status (e.g. a rejected input)"""
+
+    def __init__(self, status: str, message: str, project_dir: str = None):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.project_dir = project_dir
+
+# Persistent response cache shared by every agent call
+response_cache = ResponseCache.from_env()
+
+# Request/token rate limits, adaptive concurrency and retries shared by every agent call
+rate_limiter = RateLimiter.from_env()
+
+# Sandboxed subprocess checks of generated projects
+smoke_runner = SmokeRunner.from_env()
+
+# Prepared virtual environments shared by projects with the same dependencies
+env_cache = EnvCache.from_env()
+
+# Per-agent model, settings, fallback and prices; loaded on first use, so a bad config cannot break the import
+_model_router: Optional[ModelRouter] = None
+
+def get_model_router() -> ModelRouter:
+    global _model_router
+    if _model_router is None:
+        _model_router = ModelRouter.from_env()
+    return _model_router
+
+# Deduplicated storage for generated project files
+artifact_store = ArtifactStore.from_env()
 
-# Output Guardrail Agent
-output_guardrail = Agent[None](
-    name="output_guardrail",
-    instructions=(
-        "You validate that the generated code meets quality standards and matches the original intent. "
-        "Flag any security issues, inefficiencies, or deviations from the request. "
-        "Ensure the code follows best practices and is well-documented."
-    ),
-    output_type=ValidationResult,
+# Approved plans of earlier specs, for near-duplicate reuse
+plan_index = PlanIndex.from_env()
+
+# Sent to the plan evaluator together with a reused plan
+REUSED_PLAN_NOTE = (
+    "This plan was approved for a closely related earlier request. Check whether it fits the request above; "
+    "pass it if it does, otherwise explain exactly what has to change."
 )
 
-# Context Management Agent
-context_manager = Agent(
-    name="context_manager",
-    instructions=(
-        "You maintain awareness of the overall application structure and track previously generated code components. "
-        "Ensure new code integrates properly with the existing codebase. "
-        "Provide context about the application structure when needed."
-    ),
-    handoff_description="Provides context about the application structure",
+# Run configuration shared by every agent call; None uses the SDK's default model provider
+run_config: Optional[RunConfig] = None
+
+def use_model_provider(provider: Optional[ModelProvider]) -> None:
+    """Route every agent call through a different model provider, e.g. the offline fake model"""
+    from agents import RunConfig
+
+    global run_config
+    run_config = RunConfig(model_provider=provider) if provider is not None else None
+
+_runtime_ready = False
+_telemetry_thread: Optional[threading.Thread] = None
+
+def start_telemetry() -> Optional[threading.Thread]:
+    """Start AgentOps in a background thread when it is installed and configured"""
+    global _telemetry_thread
+    if _telemetry_thread is not None:
+        return _telemetry_thread
+    api_key = os.getenv("AGENTOPS_API_KEY")
+    if not api_key or os.getenv("VIBES_TELEMETRY", "1").lower() in ("0", "false", "no"):
+        return None
+
+    def init_agentops() -> None:
+        try:
+            import agentops
+            agentops.init(api_key)
+        except Exception as e:
+            print(f"\n⚠️ Telemetry disabled: {str(e)}")
+
+    # Telemetry setup is network-bound, so it must never block the first model call
+    _telemetry_thread = threading.Thread(target=init_agentops, name="agentops-init", daemon=True)
+    _telemetry_thread.start()
+    return _telemetry_thread
+
+def ensure_runtime() -> None:
+    """Load .env and start telemetry once, right before the first agent call"""
+    global _runtime_ready
+    if _runtime_ready:
+        return
+    _runtime_ready = True
+    try:
+        from dotenv import load_dotenv
+        load_dotenv()
+    except ImportError:
+        pass
+    start_telemetry()
+
+def _cache_namespace() -> Optional[str]:
+    if run_config is None:
+        return None
+    return type(run_config.model_provider).__name__
+
+AGENT_NAMES = (
+    "planning_agent", "plan_evaluator", "code_generator", "file_list_agent", "file_generator",
+    "code_evaluator", "file_refiner", "input_guardrail", "output_guardrail",
 )
 
-# Orchestrator Agent
-orchestrator_agent = Agent(
-    name="orchestrator_agent",
-    instructions=(
-        "You are the main orchestrator for the Vibes Coding system. "
-        "You coordinate the entire process from natural language input to code generation. "
-        "Use the tools provided to plan, evaluate, and generate code based on the user's 'vibes' input. "
-        "Always follow the complete workflow: planning → plan evaluation → code generation → code evaluation."
-    ),
-    tools=[
-        planning_agent.as_tool(
-            tool_name="create_plan",
-            tool_description="Create a structured plan from natural language programming instructions",
+_agents: Optional[Dict[str, Agent]] = None
+
+# Build every agent on first use so importing this module stays fast and side-effect free
+def build_agents() -> Dict[str, Agent]:
+    global _agents
+    if _agents is not None:
+        return _agents
+
+    from agents import Agent
+
+    # Structure lookups answered locally from the run's symbol index
+    project_tools = symbol_tools()
+
+    # Planning and Outline Generation Agent
+    planning_agent = Agent(
+        name="planning_agent",
+        instructions=(
+            "You are a planning agent for the Vibes Coding system. "
+            "Analyze the input to determine the appropriate project type and structure. "
+            "Break down the request into clear components including:\n"
+            "1. Project type (Flask, CLI, library, etc.)\n"
+            "2. Project structure and files needed\n"
+            "3. Core functionality components\n"
+            "4. External dependencies\n"
+            "5. Configuration requirements\n"
+            "Create a comprehensive plan that matches the user's requirements."
         ),
-        plan_evaluator.as_tool(
-            tool_name="evaluate_plan",
-            tool_description="Evaluate a programming plan and provide feedback",
+    )
+
+    # Plan Evaluation Agent
+    plan_evaluator = Agent[None](
+        name="plan_evaluator",
+        instructions=(
+            "You evaluate a programming plan created from natural language 'vibes' input. "
+            "Assess if the plan correctly captures the programmer's intent and is structured logically. "
+            "Check that the plan is complete, efficient, and follows best practices. "
+            "Be critical and thorough - the plan should be detailed enough for code generation. "
+            "Pass a plan that is ready for code generation, even on the first try; only ask for improvements "
+            "that would change the generated code. "
+            "Make sure that the plan is not too vague or too detailed. "
+            "Make sure that the user can quit the program if they want to."
         ),
-        code_generator.as_tool(
-            tool_name="generate_code",
-            tool_description="Generate code based on an approved plan",
+        output_type=EvaluationResult,
+    )
+
+    # Code Generation Agent
+    code_generator = Agent[None](
+        name="code_generator",
+        instructions=(
+            "You generate code based on the approved plan. "
+            "Follow best practices for the identified project type:\n"
+            "- For Flask apps: Use standard Flask project structure\n"
+            "- For CLI tools: Use a simple script or click/typer structure\n"
+            "- For libraries: Use standard package structure\n"
+            "Generate all necessary files for a complete, runnable project. "
+            "When you revise an earlier attempt, use the project tools to look up the files, classes, "
+            "functions and signatures it already has. "
+            "Return a list of FileStructure objects containing the path and content for each file."
         ),
-        code_evaluator.as_tool(
-            tool_name="evaluate_code",
-            tool_description="Evaluate generated code against the original intent and plan",
+        output_type=CodeGenerationResult,
+        tools=project_tools,
+    )
+
+    # File List Agent - splits an approved plan into individual files for per-file generation
+    file_list_agent = Agent[None](
+        name="file_list_agent",
+        instructions=(
+            "You turn the approved plan into the exact list of files the project needs. "
+            "For each file give its path relative to the project root, its file type, a one-line purpose "
+            "and its public interface: the classes, functions (with signatures), routes, templates or "
+            "config names that other files will import or reference. "
+            "Also list the external dependencies and the project type."
         ),
-        context_manager.as_tool(
-            tool_name="get_context",
-            tool_description="Get context about the application structure",
+        output_type=ProjectFileList,
+    )
+
+    # File Generation Agent - writes a single file of a planned project
+    file_generator = Agent[None](
+        name="file_generator",
+        instructions=(
+            "You generate exactly one file of a larger project based on the approved plan. "
+            "The other files are being generated at the same time by other agents, so rely only on "
+            "the interfaces listed for them and implement your own file's interface exactly as listed. "
+            "Return a single FileStructure with the requested path and the complete file content."
         ),
-    ],
-)
+        output_type=FileStructure,
+    )
+
+    # Code Evaluation Agent
+    code_evaluator = Agent[None](
+        name="code_evaluator",
+        instructions=(
+            "You evaluate generated code against the original 'vibes' input and the approved plan. "
+            "Assess whether the code correctly implements the plan and captures the programmer's intent. "
+            "Check for bugs, inefficiencies, or deviations from best practices. "
+            "Be critical but constructive - provide specific feedback for improvements. "
+            "For every file that needs changes, add a file verdict with its exact path and the specific "
+            "changes it needs. Leave files that are fine out of the file verdicts. "
+            "Use the project tools to check how files import and call each other."
+        ),
+        output_type=CodeEvaluationResult,
+        tools=project_tools,
+    )
+
+    # File Refinement Agent - fixes only the files the code evaluator flagged
+    file_refiner = Agent[None](
+        name="file_refiner",
+        instructions=(
+            "You fix specific files of an already generated project based on reviewer feedback. "
+            "You receive the approved plan, the paths of all project files, and the full content of "
+            "only the files that need changes together with the feedback for each, plus the review of the "
+            "whole project for problems that span several files. "
+            "Return the complete corrected content of every flagged file, keeping their paths, and of any "
+            "other file a cross-file problem requires you to change, and do not "
+            "change the interfaces other files rely on unless the feedback requires it. "
+            "Only return a dependencies list if the fixes require a different set of dependencies. "
+            "Use the project tools to look up the classes, functions and signatures of the other files."
+        ),
+        output_type=FileRefinementResult,
+        tools=project_tools,
+    )
+
+    # Input Guardrail Agent
+    input_guardrail = Agent[None](
+        name="input_guardrail",
+        instructions=(
+            "You validate that the natural language input is appropriate for code generation."
+            "the input should be a description of the project and the structure of the project."
+            "if there is text, validate it and say is_valid is true"
+        ),
+        output_type=ValidationResult,
+    )
+
+    # Output Guardrail Agent
+    output_guardrail = Agent[None](
+        name="output_guardrail",
+        instructions=(
+            "You validate that the generated code meets quality standards and matches the original intent. "
+            "Flag any security issues, inefficiencies, or deviations from the request. "
+            "Ensure the code follows best practices and is well-documented."
+        ),
+        output_type=ValidationResult,
+    )
+
+    _agents = {
+        agent.name: agent for agent in (
+            planning_agent, plan_evaluator, code_generator, file_list_agent, file_generator,
+            code_evaluator, file_refiner, input_guardrail, output_guardrail,
+        )
+    }
+    return _agents
+
+def get_agent(name: str) -> Agent:
+    return build_agents()[name]
+
+def __getattr__(name: str):
+    # Keep module-level access such as vibes_coding.planning_agent working
+    if name in AGENT_NAMES:
+        return get_agent(name)
+    if name == "model_router":
+        return get_model_router()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # Add a project structure helper function
 def create_project_structure(base_path: str, project_type: str = None) -> ProjectStructure:
@@ -203,84 +459,588 @@ def create_project_structure(base_path: str, project_type: str = None) -> Projec
     
     return ProjectStructure(root_dir=base_path, subdirs=subdirs)
 
-# Modify the workflow function to handle multiple files
-async def vibes_coding_workflow() -> None:
-    print("🌟 Welcome to Vibes Coding 🌟")
-    print("Please provide the path to your input file (.txt)")
-    file_path = input("\nInput file path: ").strip()
-    
+# Run an agent through the response cache
+async def run_agent(
+    agent: Agent,
+    input_items: List[TResponseInputItem],
+    on_text: Callable[[str], None] = None,
+) -> AgentRunResult:
+    """Run an agent on its routed model, replaying the stored response when the same call was made before
+
+    When on_text is given the run is streamed and every text delta is passed to it as it arrives.
+    """
+    from agents import ItemHelpers, Runner
+    from openai.types.responses import ResponseTextDeltaEvent
+
+    started = time.perf_counter()
+    model_router = get_model_router()
+    route = model_router.route(agent.name)
+    base_agent, agent = agent, model_router.agent_for(agent)
+    metrics = active_run.get()
+
+    key = response_cache.make_key(agent, input_items, _cache_namespace())
+    entry = response_cache.get(key)
+    if entry is not None:
+        if on_text is not None:
+            on_text(entry["text_output"])
+        if metrics is not None:
+            metrics.record_agent_call(agent.name, model_name(agent), time.perf_counter() - started, cached=True)
+        return AgentRunResult(
+            final_output=deserialize_output(entry["final_output"], agent.output_type),
+            text_output=entry["text_output"],
+            input_list=entry["input_list"],
+            cached=True,
+        )
+
+    ensure_runtime()
+    streamed_text = False
+
+    def run_on(model_agent: Agent):
+        async def call():
+            nonlocal streamed_text
+            if on_text is None:
+                return await Runner.run(model_agent, input_items, run_config=run_config)
+            result = Runner.run_streamed(model_agent, input_items, run_config=run_config)
+            async for event in result.stream_events():
+                if event.type == "raw_response_event" and isinstance(event.data, ResponseTextDeltaEvent):
+                    streamed_text = True
+                    on_text(event.data.delta)
+            return result
+
+        instructions = model_agent.instructions if isinstance(model_agent.instructions, str) else ""
+        return rate_limiter.run(
+            call,
+            estimated_tokens=count_tokens(instructions) + sum(item_tokens(item) for item in input_items),
+            used_tokens=lambda r: r.context_wrapper.usage.input_tokens + r.context_wrapper.usage.output_tokens,
+            # Text already streamed to the console or staging directory cannot be taken back
+            can_retry=lambda: not streamed_text,
+        )
+
+    fallback = False
+    try:
+        if route.timeout:
+            result, call_report = await asyncio.wait_for(run_on(agent), route.timeout)
+        else:
+            result, call_report = await run_on(agent)
+    except Exception as e:
+        if route.fallback is None or streamed_text:
+            raise
+        reason = f"timed out after {route.timeout:g}s" if isinstance(e, asyncio.TimeoutError) else f"failed ({e})"
+        print(f"\n🔀 {agent.name}: {model_name(agent)} {reason}, falling back to {route.fallback}")
+        agent = model_router.agent_for(base_agent, fallback=True)
+        key = response_cache.make_key(agent, input_items, _cache_namespace())
+        fallback = True
+        result, call_report = await run_on(agent)
+    usage = result.context_wrapper.usage
+    run_result = AgentRunResult(
+        final_output=result.final_output,
+        text_output=ItemHelpers.text_message_outputs(result.new_items),
+        input_list=result.to_input_list(),
+        input_tokens=usage.input_tokens,
+        output_tokens=usage.output_tokens,
+        model_calls=usage.requests,
+        retries=call_report.retries,
+        rate_wait=call_report.waited,
+    )
+    if metrics is not None:
+        model = model_name(agent)
+        metrics.record_agent_call(
+            agent.name, model, time.perf_counter() - started,
+            input_tokens=usage.input_tokens,
+            output_tokens=usage.output_tokens,
+            cost=model_router.cost(model, usage.input_tokens, usage.output_tokens),
+            fallback=fallback,
+        )
+    response_cache.put(key, {
+        "agent": agent.name,
+        "final_output": serialize_output(run_result.final_output, agent.output_type),
+        "text_output": run_result.text_output,
+        "input_list": run_result.input_list,
+    })
+    return run_result
+
+async def run_streamed_phase(
+    agent: Agent,
+    input_items: List[TResponseInputItem],
+    stream: Optional[StreamMonitor],
+    mode: Literal["timer", "print", "files"] = "timer",
+) -> AgentRunResult:
+    """Run an agent, streaming its output through the monitor when streaming is enabled"""
+    if stream is None:
+        return await run_agent(agent, input_items)
+    phase = stream.start(agent.name)
+    callbacks = {"timer": phase.timer, "print": phase.printer, "files": phase.file_stager}
+    try:
+        return await run_agent(agent, input_items, on_text=callbacks[mode]())
+    finally:
+        phase.finish()
+
+async def gather_or_cancel(*coros: Awaitable[Any]) -> List[Any]:
+    """Like asyncio.gather, but the first failure cancels the others instead of leaving them running"""
+    tasks = [asyncio.ensure_future(coro) for coro in coros]
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+        for task in done:
+            if task.exception() is not None:
+                raise task.exception()
+        return [task.result() for task in tasks]
+    finally:
+        pending = [task for task in tasks if not task.done()]
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+def _file_manifest(planned_files: List[PlannedFile]) -> str:
+    """Describe every planned file and its interface for the per-file generators"""
+    return "\n\n".join(
+        f"{f.path} ({f.file_type}): {f.purpose}\nInterface:\n{f.interface}" for f in planned_files
+    )
+
+# Generate each planned file with its own agent call and assemble a CodeGenerationResult
+async def generate_code_per_file(
+    input_items: List[TResponseInputItem],
+    concurrency: int = 4,
+    stream: Optional[StreamMonitor] = None,
+) -> AgentRunResult:
+    file_list_result = await run_streamed_phase(get_agent("file_list_agent"), input_items, stream)
+    file_list: ProjectFileList = file_list_result.final_output
+    manifest = _file_manifest(file_list.files)
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def generate_file(planned: PlannedFile) -> tuple[FileStructure, AgentRunResult]:
+        request = (
+            f"Project files and their interfaces:\n\n{manifest}\n\n"
+            f"Generate only the file '{planned.path}' ({planned.file_type}). Purpose: {planned.purpose}"
+        )
+        async with semaphore:
+            phase = stream.start("file_generator") if stream else None
+            result = await run_agent(
+                get_agent("file_generator"),
+                input_items + [{"content": request, "role": "user"}],
+                on_text=phase.timer() if phase else None,
+            )
+        file: FileStructure = result.final_output
+        if phase:
+            phase.finish()
+            stream.stage_file(phase, planned.path, file.content)
+        # Keep the planned path so sibling references stay consistent
+        return FileStructure(path=planned.path, content=file.content, file_type=planned.file_type), result
+
+    # One failed file fails the attempt, so the other files' model calls are cancelled rather than paid for
+    generated = await gather_or_cancel(*(generate_file(planned) for planned in file_list.files))
+    runs = [file_list_result] + [result for _, result in generated]
+    code_output = CodeGenerationResult(
+        files=[file for file, _ in generated],
+        explanation=file_list.explanation,
+        dependencies=file_list.dependencies,
+        project_type=file_list.project_type,
+    )
+    code_text = json.dumps(serialize_output(code_output, CodeGenerationResult))
+    return AgentRunResult(
+        final_output=code_output,
+        text_output=code_text,
+        input_list=list(input_items) + [{"content": code_text, "role": "assistant"}],
+        cached=all(run.cached for run in runs),
+        input_tokens=sum(run.input_tokens for run in runs),
+        output_tokens=sum(run.output_tokens for run in runs),
+        model_calls=sum(run.model_calls for run in runs),
+        retries=sum(run.retries for run in runs),
+        rate_wait=sum(run.rate_wait for run in runs),
+    )
+
+async def generate_code(
+    input_items: List[TResponseInputItem],
+    options: PipelineOptions,
+    stream: Optional[StreamMonitor] = None,
+) -> AgentRunResult:
+    """Run code generation in the mode selected by the pipeline options"""
+    if options.per_file:
+        return await generate_code_per_file(input_items, options.file_concurrency, stream)
+    return await run_streamed_phase(get_agent("code_generator"), input_items, stream, "files")
+
+def flagged_files(evaluation: CodeEvaluationResult, code_output: CodeGenerationResult) -> List[FileVerdict]:
+    """Return the verdicts that name a generated file and ask for changes"""
+    paths = {file.path for file in code_output.files}
+    return [
+        verdict for verdict in (evaluation.file_verdicts or [])
+        if verdict.score != "pass" and verdict.path in paths
+    ]
+
+# Resend only the flagged files and merge the fixes into the previous result
+async def refine_flagged_files(
+    base_items: List[TResponseInputItem],
+    previous: CodeGenerationResult,
+    verdicts: List[FileVerdict],
+    stream: Optional[StreamMonitor] = None,
+    feedback: str = "",
+) -> AgentRunResult:
+    """feedback is the review of the whole attempt (evaluator, guardrail, smoke tests), for problems spanning files"""
+    flagged = {verdict.path: verdict for verdict in verdicts}
+    sections = [
+        f"File: {file.path}\nFeedback: {flagged[file.path].feedback}\n```\n{file.content}\n```"
+        for file in previous.files if file.path in flagged
+    ]
+    overall = (
+        f"Review of the whole project:\n{feedback}\n\n"
+        "Also address the problems it names that involve these files; "
+        "return any other file you have to change as well.\n\n"
+    ) if feedback.strip() else ""
+    request = (
+        "All project files: " + ", ".join(file.path for file in previous.files) + "\n\n"
+        + overall + "Fix the following files:\n\n" + "\n\n".join(sections)
+    )
+    result = await run_streamed_phase(get_agent("file_refiner"), base_items + [{"content": request, "role": "user"}], stream, "files")
+    refinement: FileRefinementResult = result.final_output
+
+    fixed = {file.path: file for file in refinement.files}
+    merged_files = [fixed.pop(file.path, file) for file in previous.files]
+    merged_files.extend(fixed.values())
+    code_output = CodeGenerationResult(
+        files=merged_files,
+        explanation=previous.explanation,
+        dependencies=refinement.dependencies or previous.dependencies,
+        project_type=previous.project_type,
+    )
+    code_text = json.dumps(serialize_output(code_output, CodeGenerationResult))
+    return AgentRunResult(
+        final_output=code_output,
+        text_output=code_text,
+        input_list=list(base_items) + [{"content": code_text, "role": "assistant"}],
+        cached=result.cached,
+        input_tokens=result.input_tokens,
+        output_tokens=result.output_tokens,
+        model_calls=result.model_calls,
+        retries=result.retries,
+        rate_wait=result.rate_wait,
+    )
+
+def static_evaluation(report: StaticReport) -> CodeEvaluationResult:
+    """Turn a failed static check into the evaluation the code evaluator would have returned"""
+    return CodeEvaluationResult(
+        score="needs_improvement",
+        feedback=report.feedback(),
+        file_verdicts=[
+            FileVerdict(path=path, score="needs_improvement", feedback="; ".join(issue.message for issue in issues))
+            for path, issues in report.errors_by_file().items()
+        ],
+    )
+
+def combine_verdicts(evaluation: CodeEvaluationResult, validation: Optional[ValidationResult]) -> CodeEvaluationResult:
+    """Fold the output guardrail's verdict into the code evaluation, so either review can send the code back"""
+    if validation is None or validation.is_valid:
+        return evaluation
+    return CodeEvaluationResult(
+        score="fail" if evaluation.score == "fail" else "needs_improvement",
+        feedback=f"{evaluation.feedback}\nOutput guardrail: {validation.message}".strip(),
+        file_verdicts=evaluation.file_verdicts,
+    )
+
+def combine_smoke_report(evaluation: CodeEvaluationResult, report: Optional[SmokeReport]) -> CodeEvaluationResult:
+    """Fold smoke-test failures into the code evaluation, flagging the files they point at"""
+    if report is None or not report.failures:
+        return evaluation
+    verdicts = {verdict.path: verdict for verdict in evaluation.file_verdicts or []}
+    for path, failures in report.failures_by_file().items():
+        problems = "; ".join(dict.fromkeys(str(failure) for failure in failures))
+        existing = verdicts.get(path)
+        feedback = f"{existing.feedback}; {problems}" if existing is not None and existing.score != "pass" else problems
+        verdicts[path] = FileVerdict(path=path, score="needs_improvement", feedback=feedback)
+    return CodeEvaluationResult(
+        score="fail" if evaluation.score == "fail" else "needs_improvement",
+        feedback=f"{evaluation.feedback}\n{report.feedback()}".strip(),
+        file_verdicts=list(verdicts.values()),
+    )
+
+def journal_data(result: AgentRunResult, output_type: type = None, **extra) -> Dict:
+    """What the journal keeps of a finished agent run"""
+    return dict(
+        final_output=serialize_output(result.final_output, output_type),
+        text_output=result.text_output,
+        input_list=result.input_list,
+        input_tokens=result.input_tokens,
+        output_tokens=result.output_tokens,
+        model_calls=result.model_calls,
+        **extra,
+    )
+
+def replayed_result(data: Dict, output_type: type = None) -> AgentRunResult:
+    """Rebuild a journaled agent run; it counts as cached since no model is called"""
+    return AgentRunResult(
+        final_output=deserialize_output(data["final_output"], output_type),
+        text_output=data["text_output"],
+        input_list=data["input_list"],
+        cached=True,
+    )
+
+async def _timed(run) -> tuple[AgentRunResult, float]:
+    """Await an agent run and return its result together with the elapsed wall time"""
+    started = time.perf_counter()
+    result = await run
+    return result, time.perf_counter() - started
+
+def _discard_speculation(task: Optional[asyncio.Task], started: float) -> float:
+    """Cancel a speculative code generation run and return the seconds it consumed"""
+    if task is None:
+        return 0.0
+    if task.done() and not task.cancelled() and task.exception() is None:
+        return task.result()[1]
+    task.cancel()
+    return time.perf_counter() - started
+
+# Run the full pipeline for a single spec file without any prompts
+async def run_vibes_pipeline(file_path: str, options: PipelineOptions = None) -> PipelineResult:
+    from agents import trace
+
+    options = options or PipelineOptions()
+    started = time.perf_counter()
+    spec_path = file_path
+    speculation_saved = 0.0
+    speculation_wasted = 0.0
+    guardrail_saved = 0.0
+    guardrail_wasted = 0.0
+    pending_speculation: Optional[PlanStage] = None  # A final plan whose speculative code generation the code node has not taken over
+    history = HistoryManager(options.history_budget) if options.history_budget else None
+    staging_dir = f"{file_path.rsplit('.', 1)[0]}_project.staging"
+    stream = StreamMonitor(staging_dir) if options.stream else None
+    metrics = RunMetrics(spec_path=spec_path)
+    active_run.set(metrics)  # Agent calls of this run, including its subtasks, are accounted here
+    symbols = SymbolIndex()
+    active_index.set(symbols)  # The agents' project tools answer from this run's files
+    policy = options.policy or RefinementPolicy()
+
+    def compact(phase: str, items: List[TResponseInputItem]) -> List[TResponseInputItem]:
+        """Drop superseded plans/code and fit the conversation into the token budget"""
+        return history.compact(phase, items) if history else items
+
+    def finish(status: str, message: str, project_dir: str = None) -> PipelineResult:
+        metrics.finish(status)
+        if options.metrics_dir:
+            try:
+                paths = export_metrics(metrics, options.metrics_dir)
+                print(f"\n📈 Metrics written to {paths['json']} and {paths['prometheus']}")
+            except OSError as e:
+                print(f"\n⚠️ Error writing metrics: {str(e)}")
+        return PipelineResult(
+            spec_path=spec_path,
+            status=status,
+            message=message,
+            project_dir=project_dir,
+            duration=time.perf_counter() - started,
+            speculation_saved=speculation_saved,
+            speculation_wasted=speculation_wasted,
+            guardrail_saved=guardrail_saved,
+            guardrail_wasted=guardrail_wasted,
+            metrics=metrics,
+        )
+
+    def discard_pending_speculation() -> float:
+        """Cancel code generation speculated on a plan the code node never took over; returns the seconds it cost"""
+        nonlocal speculation_wasted, pending_speculation
+        if pending_speculation is None:
+            return 0.0
+        wasted = _discard_speculation(pending_speculation.speculative_task, pending_speculation.speculation_started)
+        pending_speculation = None
+        speculation_wasted += wasted
+        print(f"⚡ Discarded speculative code generation ({wasted:.1f}s wasted)")
+        return wasted
+
     # Validate file exists and read input
     try:
         with open(file_path, 'r') as f:
             vibes_input = f.read().strip()
     except FileNotFoundError:
         print(f"\n⚠️ Error: File '{file_path}' not found")
-        return
+        return finish("error", f"File '{file_path}' not found")
     except Exception as e:
         print(f"\n⚠️ Error reading file: {str(e)}")
-        return
+        return finish("error", f"Error reading file: {str(e)}")
         
     if not vibes_input:
         print("\n⚠️ Error: Input file is empty")
-        return
+        return finish("error", "Input file is empty")
     
     print("\nProcessing input:")
     print(vibes_input)
     
-    input_items: list[TResponseInputItem] = [{"content": vibes_input, "role": "user"}]
+    # Every finished phase is journaled so an interrupted run can pick up where it stopped
+    journal = Journal(f"{file_path.rsplit('.', 1)[0]}_project.journal.jsonl", vibes_input, resume=options.resume)
+    if journal.resuming:
+        print(f"\n⏩ Resuming from {journal.path} ({len(journal.entries)} finished phase(s))")
+    
+    async def checkpointed(phase: str, attempt: int, output_type: type, run: Callable) -> AgentRunResult:
+        """Replay a journaled phase, or run it and journal the result"""
+        data = journal.replay(phase, attempt)
+        if data is not None:
+            print(f"\n⏩ Replayed {phase} (attempt {attempt}) from the journal")
+            return replayed_result(data, output_type)
+        result = await run()
+        journal.record(phase, attempt, journal_data(result, output_type))
+        return result
+    
+    async def prepare_env(dependencies: List[str]) -> Optional[PreparedEnv]:
+        """The cached environment for the dependencies, or None when the wheelhouse cannot provide them"""
+        with metrics.phase("environment") as record:
+            try:
+                env = await env_cache.prepare(dependencies)
+            except EnvBuildError as e:
+                record.outcome = "fail"
+                print(f"\n⚠️ No environment from wheelhouse {env_cache.wheelhouse}: {e}")
+                return None
+            record.outcome = "built" if env.built else "reused"
+        print(f"\n🐍 {env.summary()}")
+        return env
+    
+    spec_items: list[TResponseInputItem] = [{"content": vibes_input, "role": "user"}]
+    project_dir = f"{file_path.rsplit('.', 1)[0]}_project"
     
-    # First, validate the input
-    with trace("Input Validation"):
-        guardrail_result = await Runner.run(input_guardrail, input_items)
-        validation: ValidationResult = guardrail_result.final_output
+    # Look for the approved plan of a near-duplicate earlier spec
+    async def lookup_plan(inputs: Dict) -> Optional[PlanMatch]:
+        if not options.reuse_plans or journal.has("plan_generation", 1):
+            return None
+        with metrics.phase("plan_lookup") as record:
+            match = plan_index.lookup(vibes_input)
+            record.outcome = "hit" if match else "miss"
+        return match
+    
+    # Validate the input; a rejected input stops the whole graph
+    async def validate(inputs: Dict) -> ValidationResult:
+        with metrics.phase("guardrail") as record:
+            guardrail_result = await checkpointed(
+                "guardrail", 1, ValidationResult,
+                lambda: run_streamed_phase(get_agent("input_guardrail"), spec_items, stream),
+            )
+            validation: ValidationResult = guardrail_result.final_output
+            record.add_usage(guardrail_result)
+            record.outcome = "pass" if validation.is_valid else "fail"
         if not validation.is_valid:
             print(f"\n⚠️ Input validation failed: {validation.message}")
-            return
+            journal.complete()
+            raise PipelineStopped("rejected", validation.message)
+        return validation
     
-    # Main workflow trace
-    with trace("Vibes Coding Workflow"):
-        # Planning phase
+    # Generate and refine the plan until it is approved or the plan loop stops
+    async def plan(inputs: Dict) -> PlanStage:
+        nonlocal speculation_wasted, pending_speculation
+        reused_plan: Optional[PlanMatch] = inputs["plan_lookup"]
+        input_items = list(spec_items)
         current_plan = None
         plan_approved = False
-        plan_attempts = 0
-        max_attempts = 3
+        evaluator_passed = False
+        plan_loop = policy.loop("plan", metrics)
+        speculative_task = None
+        speculation_started = 0.0
+        plan_eval_duration = 0.0
         
-        while not plan_approved and plan_attempts < max_attempts:
-            plan_attempts += 1
-            print(f"\n📝 Attempt {plan_attempts}/{max_attempts} for plan generation:")
-            
-            # Generate or update the plan
-            planning_result = await Runner.run(planning_agent, input_items)
-            current_plan = ItemHelpers.text_message_outputs(planning_result.new_items)
+        while not plan_approved:
+            plan_attempts = plan_loop.begin_attempt()
+            print(f"\n📝 Attempt {plan_attempts}/{policy.plan.max_attempts} for plan generation:")
             
-            print("\n📝 Plan Generated:")
-            print(current_plan)
+            # Start from the plan of a near-duplicate spec, and only evaluate it against this one
+            reviewing_reused_plan = False
+            replayed_plan = journal.replay("plan_generation", plan_attempts)
+            if replayed_plan is not None:
+                current_plan = replayed_plan["text_output"]
+                reviewing_reused_plan = replayed_plan.get("reused", False)
+                print(f"\n⏩ Replayed plan (attempt {plan_attempts}) from the journal:")
+                print(current_plan)
+                input_items = list(replayed_plan["input_list"])
+            elif reused_plan is not None and plan_attempts == 1:
+                current_plan = reused_plan.entry.plan
+                reviewing_reused_plan = True
+                print(f"\n♻️ Reusing the approved plan of a similar spec (similarity {reused_plan.similarity:.2f}):")
+                print(current_plan)
+                input_items = input_items + [{"content": current_plan, "role": "assistant"}]
+                journal.record("plan_generation", plan_attempts, {
+                    "text_output": current_plan, "input_list": input_items, "reused": True,
+                })
+            else:
+                # Generate or update the plan
+                with metrics.phase("plan_generation", plan_attempts) as record:
+                    if stream:
+                        print("\n📝 Plan Generated:")
+                        planning_result = await run_streamed_phase(
+                            get_agent("planning_agent"), compact("planning_agent", input_items), stream, "print"
+                        )
+                        current_plan = planning_result.text_output
+                        print()
+                    else:
+                        planning_result = await run_agent(get_agent("planning_agent"), compact("planning_agent", input_items))
+                        current_plan = planning_result.text_output
+                        
+                        print("\n📝 Plan Generated:")
+                        print(current_plan)
+                    record.add_usage(planning_result)
+                journal.record("plan_generation", plan_attempts, journal_data(planning_result))
+                
+                # Add the current plan to the conversation history
+                input_items = planning_result.to_input_list()
             
-            # Add the current plan to the conversation history
-            input_items = planning_result.to_input_list()
+            # Speculatively start code generation on this plan while it is evaluated,
+            # unless the evaluation is replayed from the journal and there is nothing to overlap with
+            if options.speculative and not journal.has("plan_evaluation", plan_attempts):
+                speculation_started = time.perf_counter()
+                speculative_task = asyncio.create_task(
+                    _timed(generate_code(compact("code_generator", input_items), options))
+                )
             
             # Evaluate the plan
-            evaluator_result = await Runner.run(plan_evaluator, input_items)
-            plan_evaluation: EvaluationResult = evaluator_result.final_output
+            try:
+                with metrics.phase("plan_evaluation", plan_attempts) as record:
+                    eval_items = compact("plan_evaluator", input_items)
+                    if reviewing_reused_plan:
+                        eval_items = eval_items + [{"content": REUSED_PLAN_NOTE, "role": "user"}]
+                    evaluator_result, plan_eval_duration = await _timed(checkpointed(
+                        "plan_evaluation", plan_attempts, EvaluationResult,
+                        lambda: run_streamed_phase(get_agent("plan_evaluator"), eval_items, stream),
+                    ))
+                    plan_evaluation: EvaluationResult = evaluator_result.final_output
+                    record.add_usage(evaluator_result)
+                    record.outcome = plan_evaluation.score
+            except BaseException:
+                _discard_speculation(speculative_task, speculation_started)
+                raise
             
             print(f"\n🔍 Plan Evaluation: {plan_evaluation.score}")
             print(f"Feedback: {plan_evaluation.feedback}")
             
             if plan_evaluation.score == "pass":
-                plan_approved = True
+                plan_loop.approve()
+                plan_approved = evaluator_passed = True
                 print("\n✅ Plan approved! Moving to code generation.")
-            elif plan_attempts >= max_attempts:
-                print("\n⚠️ Maximum plan refinement attempts reached. Proceeding with current plan.")
+            elif plan_loop.after_rejection(plan_evaluation.feedback):
+                print(f"\n⚠️ Stopping plan refinement: {plan_loop.reason}. Proceeding with current plan.")
                 plan_approved = True
             else:
                 print("\n🔄 Updating plan based on feedback...")
+                if speculative_task is not None:
+                    wasted = _discard_speculation(speculative_task, speculation_started)
+                    speculation_wasted += wasted
+                    speculative_task = None
+                    print(f"⚡ Discarded speculative code generation ({wasted:.1f}s wasted)")
                 # Add both the current plan and its feedback to the input for the next iteration
                 input_items.extend([
                     {"content": f"Previous plan:\n{current_plan}", "role": "assistant"},
                     {"content": f"Plan feedback: {plan_evaluation.feedback}", "role": "user"}
                 ])
         
-        # After plan is approved, extract project type from the plan
+        planned = PlanStage(
+            plan=current_plan,
+            input_items=input_items,
+            loop=plan_loop,
+            approved=evaluator_passed,
+            speculative_task=speculative_task,
+            speculation_started=speculation_started,
+            plan_eval_duration=plan_eval_duration,
+        )
+        if speculative_task is not None:
+            # Until the code node takes it over, a stopped graph must cancel it (e.g. a late input rejection)
+            pending_speculation = planned
+        return planned
+    
+    # Create the project directory structure for the planned project type
+    async def prepare_project(inputs: Dict) -> Optional[str]:
+        current_plan = inputs["plan"].plan
         project_type = None
         if current_plan and "project type" in current_plan.lower():
             # Simple extraction - you might want to make this more robust
@@ -290,13 +1050,8 @@ async def vibes_coding_workflow() -> None:
                 project_type = "cli"
             elif "library" in current_plan.lower():
                 project_type = "library"
-
-        # Create project directory structure based on type
-        input_basename = file_path.rsplit('.', 1)[0]
-        project_dir = f"{input_basename}_project"  # More generic name
+        
         project_structure = create_project_structure(project_dir, project_type)
-
-        # Create necessary directories
         try:
             os.makedirs(project_structure.root_dir, exist_ok=True)
             if project_structure.subdirs:
@@ -304,70 +1059,207 @@ async def vibes_coding_workflow() -> None:
                     os.makedirs(dir_path, exist_ok=True)
         except Exception as e:
             print(f"\n⚠️ Error creating project structure: {str(e)}")
-            return
-        
-        # Code generation phase
+            raise PipelineStopped("error", f"Error creating project structure: {str(e)}", project_dir)
+        return project_type
+    
+    # Generate, check and refine the code until it is approved or the code loop stops
+    async def code(inputs: Dict) -> CodeStage:
+        nonlocal speculation_saved, speculation_wasted, pending_speculation
+        planned: PlanStage = inputs["plan"]
+        pending_speculation = None  # From here on this node cancels the speculative run if it fails
+        if options.reuse_plans and planned.approved:
+            # Only now is the input known to be valid: with optimistic validation the plan may be approved first
+            plan_index.add(vibes_input, planned.plan)
+        input_items = list(planned.input_items)
+        speculative_task = planned.speculative_task
         code_approved = False
         final_files = None
-        code_attempts = 0
+        code_loop = policy.loop("code", metrics)
+        plan_input_items = list(input_items)
+        refinement_verdicts: List[FileVerdict] = []
+        refinement_feedback = ""
+        previous_output: Optional[CodeGenerationResult] = None  # The rejected attempt the flagged files belong to
         
-        while not code_approved and code_attempts < max_attempts:
-            code_attempts += 1
-            print(f"\n💻 Attempt {code_attempts}/{max_attempts} for code generation:")
-            
-            # Generate code based on the approved plan
-            code_gen_result = await Runner.run(code_generator, input_items)
-            code_output: CodeGenerationResult = code_gen_result.final_output
-            
-            print("\n💻 Files Generated:")
-            for file in code_output.files:
-                print(f"- {file.path}")
-            print(f"\nExplanation: {code_output.explanation}")
-            
-            if code_output.dependencies:
-                print("\nDependencies:")
-                for dep in code_output.dependencies:
-                    print(f"- {dep}")
-            
-            # Add the generated code to the conversation
-            input_items = code_gen_result.to_input_list()
-            
-            # Evaluate the code
-            code_eval_result = await Runner.run(code_evaluator, input_items)
-            code_evaluation: EvaluationResult = code_eval_result.final_output
-            
-            print(f"\n🔍 Code Evaluation: {code_evaluation.score}")
-            print(f"Feedback: {code_evaluation.feedback}")
-            
-            if code_evaluation.score == "pass":
-                code_approved = True
-                final_files = code_output.files
-                print("\n✅ Code approved!")
-            elif code_attempts >= max_attempts:
-                print("\n⚠️ Maximum code refinement attempts reached. Proceeding with current code.")
-                final_files = code_output.files
-                code_approved = True
-            else:
-                print("\n🔄 Updating code based on feedback...")
-                input_items.append({"content": f"Code Feedback: {code_evaluation.feedback}", "role": "user"})
+        try:
+            while not code_approved:
+                code_attempts = code_loop.begin_attempt()
+                print(f"\n💻 Attempt {code_attempts}/{policy.code.max_attempts} for code generation:")
+                
+                # Generate code based on the approved plan, reusing the speculative run if there is one
+                with metrics.phase("code_generation", code_attempts) as record:
+                    code_gen_result = None
+                    replayed_code = journal.replay("code_generation", code_attempts)
+                    if replayed_code is not None:
+                        code_gen_result = replayed_result(replayed_code, CodeGenerationResult)
+                        print(f"\n⏩ Replayed code_generation (attempt {code_attempts}) from the journal")
+                    elif speculative_task is not None:
+                        task, speculative_task = speculative_task, None
+                        try:
+                            code_gen_result, gen_duration = await task
+                        except Exception as e:
+                            print(f"\n⚠️ Speculative code generation failed ({e}), regenerating")
+                            speculation_wasted += time.perf_counter() - planned.speculation_started
+                        else:
+                            # The overlap with plan evaluation is the time we did not have to wait
+                            saved = min(planned.plan_eval_duration, gen_duration)
+                            speculation_saved += saved
+                            print(f"⚡ Using speculative code generation ({saved:.1f}s saved)")
+                    if code_gen_result is None and refinement_verdicts:
+                        print(f"🩹 Regenerating {len(refinement_verdicts)} flagged file(s) only")
+                        code_gen_result = await refine_flagged_files(
+                            compact("file_refiner", plan_input_items), previous_output, refinement_verdicts, stream,
+                            refinement_feedback,
+                        )
+                    if code_gen_result is None:
+                        code_gen_result = await generate_code(compact("code_generator", input_items), options, stream)
+                    code_output: CodeGenerationResult = code_gen_result.final_output
+                    record.add_usage(code_gen_result)
+                if replayed_code is None:
+                    journal.record("code_generation", code_attempts, journal_data(code_gen_result, CodeGenerationResult))
+                symbols.update(code_output.files)
+                
+                print("\n💻 Files Generated:")
+                for file in code_output.files:
+                    print(f"- {file.path}")
+                print(f"\nExplanation: {code_output.explanation}")
+                
+                if code_output.dependencies:
+                    print("\nDependencies:")
+                    for dep in code_output.dependencies:
+                        print(f"- {dep}")
+                
+                # Add the generated code to the conversation
+                input_items = code_gen_result.to_input_list()
+                
+                # Check the files locally first; a plainly broken attempt does not need the code evaluator
+                static_report = None
+                if options.static_checks:
+                    with metrics.phase("static_check", code_attempts) as record:
+                        static_report = check_files(code_output.files)
+                        record.outcome = "fail" if static_report.errors else "pass"
+                    print(
+                        f"\n🔎 Static checks: {len(static_report.errors)} error(s), {len(static_report.warnings)} warning(s) "
+                        f"in {static_report.files_checked} file(s) ({static_report.duration * 1000:.0f}ms)"
+                    )
+                    for issue in static_report.warnings:
+                        print(f"  - warning: {issue}")
+                
+                # Evaluate the code
+                if static_report is not None and static_report.errors:
+                    print("⏭️ Skipping the code evaluator and sending the static report back to the code generator")
+                    code_evaluation = static_evaluation(static_report)
+                else:
+                    async def smoke_test() -> SmokeReport:
+                        env = await prepare_env(code_output.dependencies) if options.env_cache else None
+                        with metrics.phase("smoke_test", code_attempts) as record:
+                            report = await smoke_runner.run(
+                                code_output.files, code_output.dependencies, python=env.python if env else None,
+                            )
+                            record.outcome = "fail" if report.failures else "pass"
+                            return report
+                    
+                    async def evaluate_code() -> AgentRunResult:
+                        with metrics.phase("code_evaluation", code_attempts) as record:
+                            result = await checkpointed(
+                                "code_evaluation", code_attempts, CodeEvaluationResult,
+                                lambda: run_streamed_phase(get_agent("code_evaluator"), compact("code_evaluator", input_items), stream),
+                            )
+                            record.add_usage(result)
+                            record.outcome = result.final_output.score
+                            return result
+                    
+                    async def check_output() -> AgentRunResult:
+                        with metrics.phase("output_guardrail", code_attempts) as record:
+                            result = await checkpointed(
+                                "output_guardrail", code_attempts, ValidationResult,
+                                lambda: run_streamed_phase(get_agent("output_guardrail"), compact("output_guardrail", input_items), stream),
+                            )
+                            record.add_usage(result)
+                            record.outcome = "pass" if result.final_output.is_valid else "fail"
+                            return result
+                    
+                    # The reviews and the smoke tests run at once, so together they take only as long as the slowest
+                    smoke_task = asyncio.create_task(smoke_test()) if options.smoke_tests else None
+                    output_validation = None
+                    try:
+                        if options.output_guardrail:
+                            code_eval_result, guardrail_result = await gather_or_cancel(evaluate_code(), check_output())
+                            output_validation = guardrail_result.final_output
+                            print(f"\n🛡️ Output guardrail: {'pass' if output_validation.is_valid else 'fail'} - {output_validation.message}")
+                        else:
+                            code_eval_result = await evaluate_code()
+                    except BaseException:
+                        if smoke_task is not None:
+                            smoke_task.cancel()
+                        raise
+                    code_evaluation: CodeEvaluationResult = combine_verdicts(code_eval_result.final_output, output_validation)
+                    if smoke_task is not None:
+                        smoke_report = await smoke_task
+                        print(f"\n🧪 Smoke tests: {smoke_report.summary()}")
+                        for failure in smoke_report.failures:
+                            print(f"  - {failure}")
+                        code_evaluation = combine_smoke_report(code_evaluation, smoke_report)
+                
+                print(f"\n🔍 Code Evaluation: {code_evaluation.score}")
+                print(f"Feedback: {code_evaluation.feedback}")
+                for verdict in code_evaluation.file_verdicts or []:
+                    print(f"  - {verdict.path}: {verdict.score} - {verdict.feedback}")
+                
+                if code_evaluation.score == "pass":
+                    code_loop.approve()
+                    code_approved = True
+                    final_files = code_output.files
+                    print("\n✅ Code approved!")
+                elif code_loop.after_rejection(code_evaluation.feedback):
+                    print(f"\n⚠️ Stopping code refinement: {code_loop.reason}. Proceeding with current code.")
+                    final_files = code_output.files
+                    code_approved = True
+                else:
+                    print("\n🔄 Updating code based on feedback...")
+                    refinement_verdicts = flagged_files(code_evaluation, code_output) if options.incremental else []
+                    refinement_feedback = code_evaluation.feedback
+                    previous_output = code_output
+                    input_items.append({"content": f"Code Feedback: {code_evaluation.feedback}", "role": "user"})
+        except BaseException:
+            speculation_wasted += _discard_speculation(speculative_task, planned.speculation_started)
+            raise
         
-        # Save all generated files
+        return CodeStage(output=code_output, files=final_files, loop=code_loop)
+    
+    # Save all generated files, writing only what changed and swapping it in atomically
+    async def save(inputs: Dict) -> None:
+        coded: CodeStage = inputs["code"]
+        project_type = inputs["project_structure"]
         try:
-            for file in final_files:
-                file_path = os.path.join(project_dir, file.path)
-                os.makedirs(os.path.dirname(file_path), exist_ok=True)
-                with open(file_path, 'w') as f:
-                    f.write(file.content)
+            with metrics.phase("file_save"):
+                project_files = {file.path: file.content for file in coded.files}
+                if coded.output.dependencies:
+                    project_files["requirements.txt"] = '\n'.join(coded.output.dependencies)
+                store = artifact_store if options.artifact_store else None
+                write_report = await asyncio.to_thread(write_project, project_dir, project_files, store=store)
+            print(f"\n💾 Saved project: {write_report.summary()}")
+            journal.complete()
+            
+            venv = None
+            if options.env_cache:
+                env = await prepare_env(coded.output.dependencies)
+                if env is not None:
+                    try:
+                        venv = env_cache.link(project_dir, env)
+                    except FileExistsError as e:
+                        print(f"\n⚠️ {e}")
             
-            if code_output.dependencies:
-                with open(os.path.join(project_dir, 'requirements.txt'), 'w') as f:
-                    f.write('\n'.join(code_output.dependencies))
+            # The project directory now holds the final files, so the staged copies are obsolete
+            if stream:
+                shutil.rmtree(staging_dir, ignore_errors=True)
             
             print(f"\n🎉 Project generated successfully!")
             print(f"Project created at: {project_dir}")
             print("\nTo run the project:")
             print(f"1. cd {project_dir}")
-            if code_output.dependencies:
+            if venv is not None:
+                print(f"2. source {os.path.basename(venv)}/bin/activate")
+            elif coded.output.dependencies:
                 print("2. pip install -r requirements.txt")
             
             # Project-specific run instructions
@@ -379,16 +1271,281 @@ async def vibes_coding_workflow() -> None:
                 print("3. See README.md for usage instructions")
         except Exception as e:
             print(f"\n⚠️ Error saving project files: {str(e)}")
-            return
+            raise PipelineStopped("error", f"Error saving project files: {str(e)}", project_dir)
+    
+    # The pipeline graph: every node starts as soon as the nodes it depends on are done.
+    # With optimistic validation planning does not wait for the input guardrail, but code generation
+    # and saving always do, so a rejected input costs at most the planning that overlapped validation.
+    timeouts = options.node_timeouts or {}
+    dag = Dag([
+        Node(name, run, deps, timeouts.get(name)) for name, run, deps in [
+            ("validate", validate, ()),
+            ("plan_lookup", lookup_plan, ()),
+            ("plan", plan, ("plan_lookup",) if options.optimistic_guardrail else ("plan_lookup", "validate")),
+            ("project_structure", prepare_project, ("plan",)),
+            ("code", code, ("plan", "validate")),
+            ("save", save, ("validate", "code", "project_structure")),
+        ]
+    ])
     
+    with trace("Vibes Coding Workflow"):
+        try:
+            outputs = await dag.run()
+        except PipelineStopped as stop:
+            planning = dag.runs["plan"]
+            speculated = discard_pending_speculation()
+            if stop.status == "rejected" and options.optimistic_guardrail and planning.started is not None:
+                guardrail_wasted = planning.duration + speculated
+                print(f"🛡️ Cancelled optimistic planning ({guardrail_wasted:.1f}s wasted)")
+            return finish(stop.status, stop.message, stop.project_dir)
+        except NodeTimeout as e:
+            print(f"\n⚠️ Pipeline stopped: {e}")
+            return finish("error", str(e), project_dir)
+        except Exception as e:
+            # Still record and export the failed run's metrics before the error propagates
+            finish("error", f"{type(e).__name__}: {e}", project_dir)
+            raise
+        finally:
+            discard_pending_speculation()
+            metrics.critical_path = [run.name for run in dag.critical_path()]
+    
+    if options.optimistic_guardrail:
+        # Planning time that overlapped input validation is time we did not have to wait
+        validating, planning = dag.runs["validate"], dag.runs["plan"]
+        guardrail_saved = max(0.0, min(validating.ended, planning.ended) - max(validating.started, planning.started))
+
+    print("\n📈 Phase metrics:")
+    print(metrics.report())
+    print("\n🤖 Agent latency, tokens and estimated cost:")
+    print(metrics.agent_report())
+    print("\n🕸️ Pipeline graph (* = critical path):")
+    print(dag.report())
+    print(f"\n🧭 {outputs['plan'].loop.summary()}")
+    print(f"🧭 {outputs['code'].loop.summary()}")
+    if stream:
+        print("\n⏱️ Streaming latency per phase:")
+        print(stream.report())
+    if history and history.report():
+        print("\n🧹 History tokens sent per phase (before/after compaction):")
+        print(history.report())
+    if options.speculative:
+        print(f"\n⚡ Speculation: {speculation_saved:.1f}s saved, {speculation_wasted:.1f}s wasted")
+    if options.optimistic_guardrail:
+        print(f"\n🛡️ Optimistic validation: {guardrail_saved:.1f}s saved")
+    if options.reuse_plans:
+        print(f"\n♻️ {plan_index.summary()}")
+    print(f"\n🗂️ {symbols.summary()}")
+    if journal.replayed:
+        print(f"\n⏩ Resumed run: {journal.replayed} phase(s) replayed from {journal.path}")
+    return finish("success", "Project generated", project_dir)
+
+
+# Modify the workflow function to handle multiple files
+async def vibes_coding_workflow(options: PipelineOptions = None) -> None:
+    print("🌟 Welcome to Vibes Coding 🌟")
+    print("Please provide the path to your input file (.txt)")
+    file_path = input("\nInput file path: ").strip()
+
+    await run_vibes_pipeline(file_path, options)
+
+    print(f"\n🗄️ {response_cache.summary()}")
+    print(f"🚦 {rate_limiter.summary()}")
     print("\nThank you for using Vibes Coding!")
 
 
+def find_spec_files(spec_source: str) -> List[str]:
+    """Expand a directory or glob pattern into a sorted list of spec files"""
+    if os.path.isdir(spec_source):
+        pattern = os.path.join(spec_source, "*.txt")
+    else:
+        pattern = spec_source
+    return sorted(path for path in glob.glob(pattern) if os.path.isfile(path))
+
+
+# Run many specs concurrently with a bounded number of pipelines in flight
+async def run_batch(spec_source: str, concurrency: int = 4, options: PipelineOptions = None) -> List[PipelineResult]:
+    spec_files = find_spec_files(spec_source)
+    if not spec_files:
+        print(f"\n⚠️ No spec files found for '{spec_source}'")
+        return []
+
+    print(f"🌟 Vibes Coding batch: {len(spec_files)} specs, concurrency {concurrency} 🌟")
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def run_one(spec_path: str) -> PipelineResult:
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                return await run_vibes_pipeline(spec_path, options)
+            except Exception as e:
+                # One failing spec must not stop the rest of the batch
+                print(f"\n⚠️ {spec_path} failed: {type(e).__name__}: {e}")
+                return PipelineResult(
+                    spec_path=spec_path,
+                    status="error",
+                    message=f"{type(e).__name__}: {e}",
+                    duration=time.perf_counter() - started,
+                )
+
+    batch_started = time.perf_counter()
+    results = await asyncio.gather(*(run_one(path) for path in spec_files))
+    print_batch_summary(results, time.perf_counter() - batch_started)
+    return results
+
+
+def print_batch_summary(results: List[PipelineResult], wall_clock: float) -> None:
+    """Print one row per spec plus batch totals"""
+    spec_width = max([len("Spec")] + [len(r.spec_path) for r in results])
+    print("\n📊 Batch Summary")
+    print(f"{'Spec':<{spec_width}}  {'Status':<8}  {'Time':>8}  Details")
+    print(f"{'-' * spec_width}  {'-' * 8}  {'-' * 8}  {'-' * 7}")
+    for r in results:
+        details = r.project_dir if r.status == "success" else r.message
+        print(f"{r.spec_path:<{spec_width}}  {r.status:<8}  {r.duration:>7.1f}s  {details}")
+
+    succeeded = sum(1 for r in results if r.status == "success")
+    print(f"\n{succeeded}/{len(results)} succeeded in {wall_clock:.1f}s wall-clock")
+    saved = sum(r.speculation_saved for r in results)
+    wasted = sum(r.speculation_wasted for r in results)
+    if saved or wasted:
+        print(f"⚡ Speculation: {saved:.1f}s saved, {wasted:.1f}s wasted")
+    saved = sum(r.guardrail_saved for r in results)
+    wasted = sum(r.guardrail_wasted for r in results)
+    if saved or wasted:
+        print(f"🛡️ Optimistic validation: {saved:.1f}s saved, {wasted:.1f}s of planning wasted on rejected inputs")
+    print(f"🗄️ {response_cache.summary()}")
+    print(f"🚦 {rate_limiter.summary()}")
+
+
+def node_timeout(value: str) -> tuple[str, float]:
+    """Parse a NODE=SECONDS command line value"""
+    name, sep, seconds = value.partition("=")
+    try:
+        if not sep or not name.strip():
+            raise ValueError
+        return name.strip(), float(seconds)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected NODE=SECONDS, got {value!r}") from None
+
+
+def build_parser(description: str = "Vibes Coding - natural language to code") -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--no-cache", action="store_true", help="Bypass the persistent response cache")
+    parser.add_argument("--clear-cache", action="store_true", help="Empty the response cache before running")
+    parser.add_argument("--batch", metavar="DIR_OR_GLOB", help="Run every spec in a directory or glob pattern without prompting")
+    parser.add_argument("--speculative", action="store_true", help="Generate code while the plan is being evaluated")
+    parser.add_argument("--optimistic-guardrail", action="store_true",
+                        help="Start planning while the input guardrail runs; the plan is discarded if the input is rejected")
+    parser.add_argument("--per-file", action="store_true", help="Generate each planned file with its own concurrent agent call")
+    parser.add_argument("--file-concurrency", type=int, default=4, help="Maximum concurrent per-file generation calls")
+    parser.add_argument("--incremental", action="store_true", help="Only regenerate the files the code evaluator flagged")
+    parser.add_argument("--history-budget", type=int, default=0, metavar="TOKENS",
+                        help="Compact the conversation history to this many tokens per agent call")
+    parser.add_argument("--stream", action="store_true",
+                        help="Print plans as they are generated and stage files as soon as they are complete")
+    parser.add_argument("--metrics-dir", metavar="DIR",
+                        help="Write a JSON run report and a Prometheus text file per spec to this directory")
+    parser.add_argument("--no-static-checks", action="store_true",
+                        help="Always send generated code to the code evaluator, without local static checks first")
+    parser.add_argument("--no-output-guardrail", action="store_true",
+                        help="Skip the output guardrail's security and quality review of generated code")
+    parser.add_argument("--smoke-tests", action="store_true",
+                        help="Compile, import, start and test each generated project in subprocesses (resource-limited, "
+                             "without network where possible; not a security sandbox) "
+                             "and send failures back to the code generator")
+    parser.add_argument("--smoke-timeout", type=float, metavar="SECONDS",
+                        help="Timeout per smoke-test subprocess (default: VIBES_SMOKE_TIMEOUT or 20)")
+    parser.add_argument("--env-cache", action="store_true",
+                        help="Link a cached virtual environment with the project's dependencies into it as .venv, "
+                             "built offline from the wheelhouse (VIBES_WHEELHOUSE) on first use")
+    parser.add_argument("--reuse-plans", action="store_true",
+                        help="Reuse the approved plan of a near-duplicate earlier spec instead of planning from scratch")
+    parser.add_argument("--plan-similarity", type=float, metavar="0-1",
+                        help="Minimum estimated similarity for --reuse-plans (default: VIBES_PLAN_SIMILARITY or 0.8)")
+    parser.add_argument("--artifact-store", action="store_true",
+                        help="Store project files once per unique content and link them into the project directory")
+    parser.add_argument("--plan-attempts", type=int, default=3, help="Maximum plan refinement attempts")
+    parser.add_argument("--code-attempts", type=int, default=3, help="Maximum code refinement attempts")
+    parser.add_argument("--time-budget", type=float, metavar="SECONDS",
+                        help="Stop refining once another attempt would push a spec's run past this wall-clock time")
+    parser.add_argument("--token-budget", type=int, metavar="TOKENS",
+                        help="Stop refining once another attempt would push a spec's run past this many tokens")
+    parser.add_argument("--phase-time-budget", type=float, metavar="SECONDS",
+                        help="Wall-clock budget for each of the plan and code refinement loops")
+    parser.add_argument("--phase-token-budget", type=int, metavar="TOKENS",
+                        help="Token budget for each of the plan and code refinement loops")
+    parser.add_argument("--resume", action="store_true",
+                        help="Continue an interrupted run from its journal instead of starting over")
+    parser.add_argument("--rpm", type=float, metavar="N",
+                        help="Requests per minute shared by all agent calls (default: VIBES_RPM or unlimited)")
+    parser.add_argument("--tpm", type=float, metavar="N",
+                        help="Tokens per minute shared by all agent calls (default: VIBES_TPM or unlimited)")
+    parser.add_argument("--routing", metavar="PATH",
+                        help="JSON file assigning a model, settings, fallback and price to each agent "
+                             "(default: VIBES_ROUTING or vibes_routing.json)")
+    parser.add_argument("--node-timeout", type=node_timeout, action="append", default=[], metavar="NODE=SECONDS",
+                        help="Stop the run when a pipeline graph node (validate, plan, code, save, ...) runs longer "
+                             "than this; repeatable")
+    parser.add_argument("--concurrency", type=int, default=4, help="Maximum number of specs processed at once in batch mode")
+    return parser
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    return build_parser().parse_args(argv)
+
+
+def configure(args: argparse.Namespace) -> PipelineOptions:
+    """Apply the process-wide settings of the command line and return the pipeline options"""
+    global _model_router
+    options = PipelineOptions(
+        speculative=args.speculative,
+        optimistic_guardrail=args.optimistic_guardrail,
+        per_file=args.per_file,
+        file_concurrency=args.file_concurrency,
+        incremental=args.incremental,
+        history_budget=args.history_budget,
+        stream=args.stream,
+        metrics_dir=args.metrics_dir,
+        static_checks=not args.no_static_checks,
+        output_guardrail=not args.no_output_guardrail,
+        smoke_tests=args.smoke_tests,
+        env_cache=args.env_cache,
+        reuse_plans=args.reuse_plans,
+        artifact_store=args.artifact_store,
+        resume=args.resume,
+        node_timeouts=dict(args.node_timeout) or None,
+        policy=RefinementPolicy(
+            plan=PhaseBudget(args.plan_attempts, args.phase_time_budget, args.phase_token_budget),
+            code=PhaseBudget(args.code_attempts, args.phase_time_budget, args.phase_token_budget),
+            max_seconds=args.time_budget,
+            max_tokens=args.token_budget,
+        ),
+    )
+    if args.smoke_timeout is not None:
+        smoke_runner.timeout = args.smoke_timeout
+    if args.plan_similarity is not None:
+        plan_index.threshold = args.plan_similarity
+    rate_limiter.set_limits(args.rpm, args.tpm)
+    if args.routing:
+        _model_router = ModelRouter.from_file(args.routing)
+    if args.no_cache:
+        response_cache.enabled = False
+    if args.clear_cache:
+        response_cache.clear()
+    return options
+
+
 async def main():
-    await vibes_coding_workflow()
+    args = parse_args()
+    options = configure(args)
+    if args.batch:
+        results = await run_batch(args.batch, args.concurrency, options)
+        return 0 if results and all(r.status == "success" for r in results) else 1
+    await vibes_coding_workflow(options)
+    return 0
     # agentops.end_session('Success')
 
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    sys.exit(asyncio.run(main()))
\ No newline at end of file
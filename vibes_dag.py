@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Literal, Optional, Tuple
+
+"""
+Vibes Coding - Pipeline Graph Scheduler
+
+Runs a pipeline declared as a graph of nodes. Each node names the nodes whose
+outputs it needs and receives those outputs when it starts; the scheduler
+starts every node as soon as all of its dependencies have finished, so
+independent nodes run concurrently and a new node only lengthens the pipeline
+if it lands on the critical path.
+
+A node that fails or exceeds its timeout cancels every other running node and
+its exception is raised from Dag.run (as does cancelling Dag.run itself).
+Afterwards the graph reports when each node ran and which chain of nodes
+determined the end-to-end latency.
+"""
+
+NodeStatus = Literal["pending", "running", "done", "failed", "timeout", "cancelled", "skipped"]
+
+
+class NodeTimeout(Exception):
+    """A node ran longer than its timeout"""
+
+    def __init__(self, node: str, timeout: float):
+        super().__init__(f"{node} timed out after {timeout:g}s")
+        self.node = node
+        self.timeout = timeout
+
+
+@dataclass
+class Node:
+    name: str
+    run: Callable[[Dict[str, Any]], Awaitable[Any]]  # Called with the outputs of its dependencies, by name
+    deps: Tuple[str, ...] = ()
+    timeout: Optional[float] = None
+
+
+@dataclass
+class NodeRun:
+    name: str
+    deps: Tuple[str, ...]
+    status: NodeStatus = "pending"
+    started: Optional[float] = None  # Seconds since the graph started
+    ended: Optional[float] = None
+
+    @property
+    def duration(self) -> float:
+        if self.started is None or self.ended is None:
+            return 0.0
+        return self.ended - self.started
+
+
+@dataclass
+class Dag:
+    nodes: List[Node]
+    runs: Dict[str, NodeRun] = field(default_factory=dict)
+    outputs: Dict[str, Any] = field(default_factory=dict)
+
+    def __post_init__(self):
+        names = [node.name for node in self.nodes]
+        if len(set(names)) != len(names):
+            raise ValueError(f"Duplicate node names in pipeline graph: {names}")
+        for node in self.nodes:
+            missing = [dep for dep in node.deps if dep not in names]
+            if missing:
+                raise ValueError(f"Node {node.name} depends on unknown node(s): {', '.join(missing)}")
+        self._check_acyclic()
+        self.runs = {node.name: NodeRun(node.name, node.deps) for node in self.nodes}
+
+    def _check_acyclic(self) -> None:
+        remaining = {node.name: set(node.deps) for node in self.nodes}
+        while remaining:
+            ready = [name for name, deps in remaining.items() if not deps]
+            if not ready:
+                raise ValueError(f"Pipeline graph has a cycle among: {', '.join(sorted(remaining))}")
+            for name in ready:
+                del remaining[name]
+            for deps in remaining.values():
+                deps.difference_update(ready)
+
+    async def _run_node(self, node: Node, origin: float) -> Any:
+        run = self.runs[node.name]
+        run.status = "running"
+        run.started = time.perf_counter() - origin
+        inputs = {dep: self.outputs[dep] for dep in node.deps}
+        try:
+            if node.timeout is None:
+                output = await node.run(inputs)
+            else:
+                started = time.perf_counter()
+                try:
+                    output = await asyncio.wait_for(node.run(inputs), node.timeout)
+                except asyncio.TimeoutError:
+                    # A TimeoutError from inside the node (e.g. a model call's own timeout) is the node failing
+                    if time.perf_counter() - started < node.timeout:
+                        raise
+                    run.status = "timeout"
+                    raise NodeTimeout(node.name, node.timeout) from None
+            run.status = "done"
+            return output
+        except asyncio.CancelledError:
+            run.status = "cancelled"
+            raise
+        except BaseException:
+            if run.status == "running":
+                run.status = "failed"
+            raise
+        finally:
+            run.ended = time.perf_counter() - origin
+
+    async def run(self) -> Dict[str, Any]:
+        """Run every node once its dependencies are done; return the outputs by node name"""
+        origin = time.perf_counter()
+        pending = {node.name: node for node in self.nodes}
+        running: Dict[asyncio.Task, str] = {}
+        try:
+            while pending or running:
+                for name, node in list(pending.items()):
+                    if all(self.runs[dep].status == "done" for dep in node.deps):
+                        del pending[name]
+                        running[asyncio.create_task(self._run_node(node, origin))] = name
+                finished, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in finished:
+                    name = running.pop(task)
+                    self.outputs[name] = task.result()  # Re-raises a node's failure
+        finally:
+            for task in running:
+                task.cancel()
+            if running:
+                await asyncio.gather(*running, return_exceptions=True)
+            for name in pending:
+                self.runs[name].status = "skipped"
+        return self.outputs
+
+    def critical_path(self) -> List[NodeRun]:
+        """The chain of nodes, each waiting on the previous one, that ended last"""
+        finished = [run for run in self.runs.values() if run.ended is not None]
+        if not finished:
+            return []
+        # On ties prefer the node that finished over one that was cancelled when it did
+        path = [max(finished, key=lambda run: (run.ended, run.status != "cancelled"))]
+        while True:
+            deps = [self.runs[dep] for dep in path[-1].deps if self.runs[dep].ended is not None]
+            if not deps:
+                break
+            path.append(max(deps, key=lambda run: run.ended))
+        return list(reversed(path))
+
+    def report(self) -> str:
+        critical = {run.name for run in self.critical_path()}
+        lines = [f"  {'Node':<18}  {'Start':>7}  {'Time':>8}  {'Status':<9}  Depends on"]
+        ordered = sorted(self.runs.values(), key=lambda run: (run.started is None, run.started or 0.0))
+        for run in ordered:
+            start = f"{run.started:>6.2f}s" if run.started is not None else f"{'-':>7}"
+            marker = "*" if run.name in critical else " "
+            lines.append(
+                f"{marker} {run.name:<18}  {start}  {run.duration:>7.2f}s  {run.status:<9}  {', '.join(run.deps) or '-'}"
+            )
+        path = self.critical_path()
+        if path:
+            total = path[-1].ended
+            chain = " → ".join(f"{run.name} ({run.duration:.2f}s)" for run in path)
+            lines.append(f"Critical path ({total:.2f}s): {chain}")
+        return "\n".join(lines)
@@ -0,0 +1,330 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import platform
+import re
+import shutil
+import subprocess
+import sys
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: builds are not locked across processes
+    fcntl = None
+
+"""
+Vibes Coding - Environment Cache
+
+Prepared virtual environments for generated projects, shared between every
+project with the same dependencies. An environment is keyed by a hash of the
+normalized dependency set (names lowercased and PEP 503 normalized, extras and
+version specifiers sorted, duplicates and comments dropped, then sorted) and
+the base interpreter, so "Flask>=2.0\\nredis" and "redis\\nflask >= 2.0" share
+one environment.
+
+A missing environment is built once from a local wheelhouse with
+`pip install --no-index`, so it needs no network; afterwards every project
+with the same dependency set gets it in milliseconds as a `.venv` symlink.
+Builds are locked per key, so concurrent pipelines (e.g. in server mode) wait
+for one build instead of racing. Environments that have not been used for a
+while, or beyond the configured number, are evicted least recently used first.
+
+    python vibes_envs.py prepare snake_vibe_project   # Link an environment for requirements.txt
+    python vibes_envs.py list
+    python vibes_envs.py prune
+"""
+
+DEFAULT_ENV_DIR = ".vibes_envs"
+DEFAULT_WHEELHOUSE = "wheelhouse"
+DEFAULT_MAX_ENVS = 8
+DEFAULT_MAX_AGE_SECONDS = 30 * 24 * 60 * 60
+MARKER_NAME = ".vibes-env.json"  # Written last, so an environment without it is an interrupted build
+LINK_NAME = ".venv"
+
+_REQUIREMENT = re.compile(r"^([A-Za-z0-9][A-Za-z0-9._-]*)\s*(\[[^\]]*\])?\s*(.*)$")
+
+
+class EnvBuildError(Exception):
+    """An environment could not be built from the wheelhouse"""
+
+
+@dataclass
+class PreparedEnv:
+    key: str
+    path: str
+    requirements: List[str]
+    built: bool = False  # False when an existing environment was reused
+    seconds: float = 0.0
+
+    @property
+    def python(self) -> str:
+        if os.name == "nt":
+            return os.path.join(self.path, "Scripts", "python.exe")
+        return os.path.join(self.path, "bin", "python")
+
+    def summary(self) -> str:
+        what = f"built in {self.seconds:.1f}s" if self.built else "reused"
+        return f"Environment {self.key} ({len(self.requirements)} requirements) {what}"
+
+
+@dataclass
+class EnvStats:
+    hits: int = 0
+    builds: int = 0
+    failures: int = 0
+    evictions: int = 0
+
+
+def normalize_requirement(line: str) -> Optional[str]:
+    """Canonical form of one requirement line, or None for blanks, comments and pip options"""
+    line = line.split("#", 1)[0].strip()
+    if not line or line.startswith("-"):
+        return None
+    requirement, _, marker = line.partition(";")
+    match = _REQUIREMENT.match(requirement.strip())
+    if match is None:
+        return re.sub(r"\s+", "", requirement)
+    name, extras, specifiers = match.groups()
+    name = re.sub(r"[-_.]+", "-", name).lower()
+    if extras:
+        extras = "[" + ",".join(sorted({e.strip().lower() for e in extras[1:-1].split(",") if e.strip()})) + "]"
+    specifiers = ",".join(sorted(s for s in re.sub(r"\s+", "", specifiers).split(",") if s))
+    normalized = f"{name}{extras or ''}{specifiers}"
+    marker = " ".join(marker.split())
+    return f"{normalized}; {marker}" if marker else normalized
+
+
+def normalize_requirements(dependencies: List[str]) -> List[str]:
+    """Sorted, deduplicated canonical requirements (a dependency entry may hold several lines)"""
+    normalized = {
+        requirement
+        for dependency in dependencies
+        for requirement in map(normalize_requirement, dependency.splitlines())
+        if requirement
+    }
+    return sorted(normalized)
+
+
+class EnvCache:
+    """Virtual environments keyed by dependency set, built offline from a wheelhouse"""
+
+    def __init__(
+        self,
+        env_dir: str = DEFAULT_ENV_DIR,
+        wheelhouse: str = DEFAULT_WHEELHOUSE,
+        max_envs: int = DEFAULT_MAX_ENVS,
+        max_age_seconds: float = DEFAULT_MAX_AGE_SECONDS,
+        python: Optional[str] = None,
+    ):
+        self.env_dir = env_dir
+        self.wheelhouse = wheelhouse
+        self.max_envs = max_envs
+        self.max_age_seconds = max_age_seconds
+        self.python = python or sys.executable
+        self.stats = EnvStats()
+        self._in_use: Dict[str, int] = {}  # Keys this process has handed out, never evicted while in use
+
+    @classmethod
+    def from_env(cls) -> "EnvCache":
+        """Build a cache from VIBES_ENV_* environment variables"""
+        return cls(
+            env_dir=os.getenv("VIBES_ENV_DIR", DEFAULT_ENV_DIR),
+            wheelhouse=os.getenv("VIBES_WHEELHOUSE", DEFAULT_WHEELHOUSE),
+            max_envs=int(os.getenv("VIBES_ENV_MAX", DEFAULT_MAX_ENVS)),
+            max_age_seconds=float(os.getenv("VIBES_ENV_MAX_AGE_DAYS", DEFAULT_MAX_AGE_SECONDS / 86400)) * 86400,
+            python=os.getenv("VIBES_ENV_PYTHON") or None,
+        )
+
+    def key(self, requirements: List[str]) -> str:
+        """Content address of a normalized dependency set on this cache's interpreter"""
+        interpreter = {"python": os.path.realpath(self.python), "machine": platform.machine()}
+        data = json.dumps({"interpreter": interpreter, "requirements": requirements}, sort_keys=True)
+        return hashlib.sha256(data.encode("utf-8")).hexdigest()[:16]
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.env_dir, key)
+
+    def _ready(self, key: str) -> bool:
+        return os.path.exists(os.path.join(self._path(key), MARKER_NAME))
+
+    def _touch(self, key: str) -> None:
+        try:
+            os.utime(os.path.join(self._path(key), MARKER_NAME))
+        except OSError:
+            pass
+
+    def _lock(self, key: str, blocking: bool = True):
+        """Open and lock the key's lock file; returns the file (close it to unlock) or None if it is held"""
+        os.makedirs(self.env_dir, exist_ok=True)
+        handle = open(os.path.join(self.env_dir, f"{key}.lock"), "w")
+        if fcntl is not None:
+            try:
+                fcntl.flock(handle, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                handle.close()
+                return None
+        return handle
+
+    def _build(self, key: str, requirements: List[str]) -> bool:
+        """Build the environment unless another process finished it first; returns whether it was built"""
+        with self._lock(key):
+            if self._ready(key):
+                return False
+            path = self._path(key)
+            shutil.rmtree(path, ignore_errors=True)  # Left over from an interrupted build
+            try:
+                self._run([self.python, "-m", "venv", "--without-pip", path])
+                if requirements:
+                    requirements_file = os.path.join(path, "requirements.txt")
+                    with open(requirements_file, "w") as f:
+                        f.write("\n".join(requirements) + "\n")
+                    # The host's pip installs into the new environment, so it needs no pip of its own
+                    self._run([
+                        sys.executable, "-m", "pip", "--python", PreparedEnv(key, path, requirements).python,
+                        "install", "--no-index", "--find-links", self.wheelhouse,
+                        "--disable-pip-version-check", "--no-input", "-q", "-r", requirements_file,
+                    ])
+            except BaseException:
+                shutil.rmtree(path, ignore_errors=True)
+                raise
+            with open(os.path.join(path, MARKER_NAME), "w") as f:
+                json.dump({"key": key, "requirements": requirements, "python": self.python, "created": time.time()}, f, indent=2)
+            return True
+
+    @staticmethod
+    def _run(args: List[str]) -> None:
+        result = subprocess.run(args, capture_output=True, text=True, stdin=subprocess.DEVNULL)
+        if result.returncode != 0:
+            lines = [line for line in (result.stderr or result.stdout).strip().splitlines() if line.strip()]
+            raise EnvBuildError(lines[-1] if lines else f"{' '.join(args[:3])} exited with status {result.returncode}")
+
+    async def prepare(self, dependencies: List[str]) -> PreparedEnv:
+        """The environment for a dependency set, built from the wheelhouse on first use"""
+        started = time.perf_counter()
+        requirements = normalize_requirements(dependencies)
+        key = self.key(requirements)
+        env = PreparedEnv(key=key, path=self._path(key), requirements=requirements)
+        self._in_use[key] = self._in_use.get(key, 0) + 1
+        try:
+            if self._ready(key):
+                self.stats.hits += 1
+                self._touch(key)
+            else:
+                try:
+                    env.built = await asyncio.to_thread(self._build, key, requirements)
+                except EnvBuildError:
+                    self.stats.failures += 1
+                    raise
+                if env.built:
+                    self.stats.builds += 1
+                    await asyncio.to_thread(self.evict)
+                else:
+                    self.stats.hits += 1
+                    self._touch(key)
+        finally:
+            self._in_use[key] -= 1
+            if not self._in_use[key]:
+                del self._in_use[key]
+        env.seconds = time.perf_counter() - started
+        return env
+
+    def link(self, project_dir: str, env: PreparedEnv) -> str:
+        """Point the project's .venv at the environment; an existing real .venv is left alone"""
+        link = os.path.join(project_dir, LINK_NAME)
+        target = os.path.abspath(env.path)
+        if os.path.islink(link):
+            if os.readlink(link) == target:
+                return link
+            os.remove(link)
+        elif os.path.exists(link):
+            raise FileExistsError(f"{link} already exists and is not a link to a cached environment")
+        os.symlink(target, link, target_is_directory=True)
+        return link
+
+    def entries(self) -> List[Dict]:
+        """Ready environments, most recently used first"""
+        if not os.path.isdir(self.env_dir):
+            return []
+        entries = []
+        for key in os.listdir(self.env_dir):
+            marker = os.path.join(self._path(key), MARKER_NAME)
+            try:
+                with open(marker) as f:
+                    entry = json.load(f)
+                entry["last_used"] = os.path.getmtime(marker)
+            except (OSError, ValueError):
+                continue
+            entries.append(entry)
+        entries.sort(key=lambda entry: entry["last_used"], reverse=True)
+        return entries
+
+    def evict(self) -> int:
+        """Remove environments past the maximum age, then the least recently used beyond max_envs"""
+        now = time.time()
+        evicted = 0
+        for position, entry in enumerate(self.entries()):
+            key = entry["key"]
+            if position < self.max_envs and now - entry["last_used"] <= self.max_age_seconds:
+                continue
+            if key in self._in_use:
+                continue
+            lock = self._lock(key, blocking=False)
+            if lock is None:  # Being built or refreshed by another process
+                continue
+            with lock:
+                shutil.rmtree(self._path(key), ignore_errors=True)
+            evicted += 1
+        self.stats.evictions += evicted
+        return evicted
+
+    def summary(self) -> str:
+        s = self.stats
+        return f"Environment cache: {s.hits} reused, {s.builds} built, {s.failures} failed, {s.evictions} evicted"
+
+
+def read_requirements(project_dir: str) -> List[str]:
+    path = os.path.join(project_dir, "requirements.txt")
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return f.read().splitlines()
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Manage the Vibes Coding environment cache")
+    commands = parser.add_subparsers(dest="command", required=True)
+    prepare = commands.add_parser("prepare", help="Link a cached environment for each project's requirements.txt")
+    prepare.add_argument("projects", nargs="+", metavar="PROJECT_DIR")
+    commands.add_parser("list", help="List the cached environments")
+    commands.add_parser("prune", help="Evict unused environments now")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    cache = EnvCache.from_env()
+    if args.command == "prepare":
+        for project_dir in args.projects:
+            try:
+                env = asyncio.run(cache.prepare(read_requirements(project_dir)))
+            except EnvBuildError as e:
+                print(f"❌ {project_dir}: {e}")
+                continue
+            print(f"🐍 {project_dir}: {env.summary()}, linked at {cache.link(project_dir, env)}")
+    elif args.command == "list":
+        for entry in cache.entries():
+            age = (time.time() - entry["last_used"]) / 86400
+            print(f"{entry['key']}  used {age:.1f} days ago  {', '.join(entry['requirements']) or '(no requirements)'}")
+    else:
+        print(f"🧹 Evicted {cache.evict()} environment(s)")
+
+
+if __name__ == "__main__":
+    main()
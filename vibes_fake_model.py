@@ -0,0 +1,268 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Union
+
+from agents import Model, ModelProvider, ModelResponse, ModelSettings, Usage
+from agents.agent_output import AgentOutputSchemaBase
+from openai.types.responses import (
+    Response,
+    ResponseCompletedEvent,
+    ResponseCreatedEvent,
+    ResponseOutputMessage,
+    ResponseOutputText,
+    ResponseTextDeltaEvent,
+    ResponseUsage,
+)
+from openai.types.responses.response_usage import InputTokensDetails, OutputTokensDetails
+
+from vibes_history import count_tokens, item_text
+
+"""
+Vibes Coding - Offline Fake Model
+
+A deterministic stand-in for the hosted model so the pipeline can be driven,
+benchmarked and regression-tested without network access. Responses are looked
+up by the agent's output type name ("EvaluationResult", "CodeGenerationResult",
+"ValidationResult", ...) or "text" for plain-text agents, and each canned
+response carries its own simulated latency and optional fixed token counts.
+To exercise rate limiting, the model can also reject calls with a 429, either
+at random or whenever more calls are in flight than a simulated provider
+concurrency limit allows.
+
+Plug it in with vibes_coding.use_model_provider(FakeModelProvider(model)); give
+the provider several named models to exercise per-agent model routing.
+"""
+
+# A canned output is either JSON-compatible data / text, or a function of the input items
+CannedOutput = Union[Any, Callable[[List[Any]], Any]]
+
+
+def _zero_details(details_type: Any) -> Any:
+    """Build a token-details model with every count set to zero, whatever fields this SDK version has"""
+    return details_type(**{name: 0 for name in details_type.model_fields})
+
+
+@dataclass
+class FakeResponse:
+    output: CannedOutput
+    latency: float = 0.05  # Simulated seconds per call
+    input_tokens: Optional[int] = None  # Fixed token counts; estimated from the text when None
+    output_tokens: Optional[int] = None
+
+
+class FakeRateLimitError(Exception):
+    """What the fake provider raises instead of answering a throttled call"""
+
+    status_code = 429
+
+    def __init__(self, retry_after: Optional[float] = None):
+        super().__init__("Rate limit exceeded (fake model)")
+        self.headers = {"retry-after": str(retry_after)} if retry_after is not None else {}
+
+
+@dataclass
+class FakeCall:
+    response_key: str
+    system_instructions: str
+    input_tokens: int
+    output_tokens: int
+    started: float
+    ended: float
+    streamed: bool
+
+
+class FakeModel(Model):
+    """Deterministic local model that replays canned outputs with simulated latency"""
+
+    def __init__(
+        self,
+        responses: Dict[str, FakeResponse],
+        stream_chunk_chars: int = 64,
+        throttle_rate: float = 0.0,
+        concurrency_limit: Optional[int] = None,
+        seed: int = 0,
+    ):
+        self.responses = responses
+        self.stream_chunk_chars = stream_chunk_chars
+        self.throttle_rate = throttle_rate  # Fraction of calls rejected with a 429 at random
+        self.concurrency_limit = concurrency_limit  # Calls beyond this many in flight are rejected with a 429
+        self.calls: List[FakeCall] = []
+        self.throttled = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self._random = random.Random(seed)
+
+    def _enter(self) -> None:
+        """Start a call, or reject it the way a throttling provider would"""
+        over_limit = self.concurrency_limit is not None and self.in_flight >= self.concurrency_limit
+        if over_limit or (self.throttle_rate and self._random.random() < self.throttle_rate):
+            self.throttled += 1
+            raise FakeRateLimitError()
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+    def _response_key(self, output_schema: Optional[AgentOutputSchemaBase]) -> str:
+        if output_schema is None or output_schema.is_plain_text():
+            return "text"
+        return output_schema.name()
+
+    def _render(self, output_schema: Optional[AgentOutputSchemaBase], input_items: List[Any]) -> tuple[str, FakeResponse]:
+        key = self._response_key(output_schema)
+        if key not in self.responses:
+            raise KeyError(f"FakeModel has no canned response for '{key}'")
+        canned = self.responses[key]
+        output = canned.output(input_items) if callable(canned.output) else canned.output
+        if key == "text":
+            return str(output), canned
+
+        # Structured outputs are wrapped as {"response": ...} for non-object output types
+        text = json.dumps(output)
+        try:
+            output_schema.validate_json(text)
+        except Exception:
+            text = json.dumps({"response": output})
+            output_schema.validate_json(text)
+        return text, canned
+
+    def _usage(self, canned: FakeResponse, input_items: List[Any], system_instructions: Optional[str], text: str) -> Usage:
+        input_tokens = canned.input_tokens
+        if input_tokens is None:
+            input_tokens = count_tokens(system_instructions or "") + sum(count_tokens(item_text(i)) for i in input_items)
+        output_tokens = canned.output_tokens if canned.output_tokens is not None else count_tokens(text)
+        return Usage(
+            requests=1,
+            input_tokens=input_tokens,
+            output_tokens=output_tokens,
+            total_tokens=input_tokens + output_tokens,
+        )
+
+    def _record(self, key: str, system_instructions: Optional[str], usage: Usage, started: float, streamed: bool) -> None:
+        self.calls.append(FakeCall(
+            response_key=key,
+            system_instructions=system_instructions or "",
+            input_tokens=usage.input_tokens,
+            output_tokens=usage.output_tokens,
+            started=started,
+            ended=time.perf_counter(),
+            streamed=streamed,
+        ))
+
+    @staticmethod
+    def _message(text: str) -> ResponseOutputMessage:
+        return ResponseOutputMessage(
+            id="fake-message",
+            type="message",
+            role="assistant",
+            status="completed",
+            content=[ResponseOutputText(text=text, type="output_text", annotations=[])],
+        )
+
+    @staticmethod
+    def _as_items(input: Union[str, List[Any]]) -> List[Any]:
+        return [{"content": input, "role": "user"}] if isinstance(input, str) else list(input)
+
+    async def get_response(
+        self,
+        system_instructions,
+        input,
+        model_settings: ModelSettings,
+        tools,
+        output_schema,
+        handoffs,
+        tracing,
+        *,
+        previous_response_id=None,
+        conversation_id=None,
+        prompt=None,
+        **kwargs,
+    ) -> ModelResponse:
+        self._enter()
+        try:
+            started = time.perf_counter()
+            input_items = self._as_items(input)
+            text, canned = self._render(output_schema, input_items)
+            usage = self._usage(canned, input_items, system_instructions, text)
+            await asyncio.sleep(canned.latency)
+            self._record(self._response_key(output_schema), system_instructions, usage, started, streamed=False)
+            return ModelResponse(output=[self._message(text)], usage=usage, response_id=None)
+        finally:
+            self.in_flight -= 1
+
+    async def stream_response(
+        self,
+        system_instructions,
+        input,
+        model_settings: ModelSettings,
+        tools,
+        output_schema,
+        handoffs,
+        tracing,
+        *,
+        previous_response_id=None,
+        conversation_id=None,
+        prompt=None,
+        **kwargs,
+    ) -> AsyncIterator[Any]:
+        self._enter()
+        try:
+            started = time.perf_counter()
+            input_items = self._as_items(input)
+            text, canned = self._render(output_schema, input_items)
+            usage = self._usage(canned, input_items, system_instructions, text)
+            chunks = [text[i:i + self.stream_chunk_chars] for i in range(0, len(text), self.stream_chunk_chars)] or [""]
+
+            response = Response(
+                id="fake-response",
+                created_at=time.time(),
+                model="fake-model",
+                object="response",
+                output=[],
+                parallel_tool_calls=False,
+                tool_choice="auto",
+                tools=[],
+            )
+            yield ResponseCreatedEvent(type="response.created", response=response, sequence_number=0)
+
+            # Spread the simulated latency evenly over the streamed chunks
+            delay = canned.latency / len(chunks)
+            for index, chunk in enumerate(chunks):
+                await asyncio.sleep(delay)
+                yield ResponseTextDeltaEvent(
+                    type="response.output_text.delta",
+                    content_index=0,
+                    delta=chunk,
+                    item_id="fake-message",
+                    output_index=0,
+                    sequence_number=index + 1,
+                    logprobs=[],
+                )
+
+            completed = response.model_copy(update={
+                "output": [self._message(text)],
+                "status": "completed",
+                "usage": ResponseUsage(
+                    input_tokens=usage.input_tokens,
+                    output_tokens=usage.output_tokens,
+                    total_tokens=usage.total_tokens,
+                    input_tokens_details=_zero_details(InputTokensDetails),
+                    output_tokens_details=_zero_details(OutputTokensDetails),
+                ),
+            })
+            self._record(self._response_key(output_schema), system_instructions, usage, started, streamed=True)
+            yield ResponseCompletedEvent(type="response.completed", response=completed, sequence_number=len(chunks) + 1)
+        finally:
+            self.in_flight -= 1
+
+
+@dataclass
+class FakeModelProvider(ModelProvider):
+    model: FakeModel
+    models: Dict[str, FakeModel] = field(default_factory=dict)  # Per-name models, to exercise model routing
+
+    def get_model(self, model_name: Optional[str]) -> Model:
+        return self.models.get(model_name, self.model)
@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+"""
+Vibes Coding - Conversation History Compaction
+
+The refinement loops keep appending to the conversation: every planning attempt
+adds the new plan twice (as model output and as "Previous plan") plus feedback,
+and every code attempt adds the complete file contents again. The history
+manager keeps the original spec, only the latest plan, the latest code and the
+latest feedback, and then collapses the largest remaining items until the
+conversation fits within a token budget.
+"""
+
+try:
+    import tiktoken
+
+    _encoding = tiktoken.get_encoding("o200k_base")
+except Exception:  # tiktoken is optional; fall back to a character estimate
+    _encoding = None
+
+
+def count_tokens(text: str) -> int:
+    """Count tokens with tiktoken when available, otherwise estimate ~4 characters per token"""
+    if _encoding is not None:
+        return len(_encoding.encode(text, disallowed_special=()))
+    return (len(text) + 3) // 4
+
+
+def item_text(item: Any) -> str:
+    """Extract the text of a conversation item, whatever shape the SDK gave it"""
+    if not isinstance(item, dict):
+        return str(item)
+    content = item.get("content")
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return "".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return json.dumps(item, default=str)
+
+
+def item_tokens(item: Any) -> int:
+    return count_tokens(item_text(item))
+
+
+def classify_item(item: Any) -> str:
+    """Label an item as user/plan/code/feedback/other so superseded versions can be dropped"""
+    if not isinstance(item, dict) or item.get("type") not in (None, "message"):
+        return "other"
+    text = item_text(item).strip()
+    role = item.get("role")
+    if role == "user":
+        if text.startswith(("Plan feedback:", "Code Feedback:")):
+            return "feedback"
+        return "user"
+    if role == "assistant":
+        if text.startswith("Previous plan:"):
+            return "plan"
+        if text.startswith("{"):
+            try:
+                data = json.loads(text)
+            except ValueError:
+                return "plan"
+            if isinstance(data, dict) and "files" in data:
+                return "code"
+            if isinstance(data, dict) and "score" in data:
+                return "feedback"
+        return "plan"
+    return "other"
+
+
+@dataclass
+class PhaseTokens:
+    calls: int = 0
+    before: int = 0
+    after: int = 0
+
+
+@dataclass
+class HistoryManager:
+    token_budget: int
+    phases: Dict[str, PhaseTokens] = field(default_factory=dict)
+
+    def compact(self, phase: str, input_items: List[Any]) -> List[Any]:
+        """Return a compacted copy of the conversation and record the token savings for a phase"""
+        before = sum(item_tokens(item) for item in input_items)
+        compacted = self._drop_superseded(input_items)
+        compacted = self._fit_budget(compacted)
+        after = sum(item_tokens(item) for item in compacted)
+
+        stats = self.phases.setdefault(phase, PhaseTokens())
+        stats.calls += 1
+        stats.before += before
+        stats.after += after
+        return compacted
+
+    def _drop_superseded(self, input_items: List[Any]) -> List[Any]:
+        # Group non-message items (e.g. reasoning) with the message that follows them
+        groups: List[List[Any]] = []
+        pending: List[Any] = []
+        for item in input_items:
+            pending.append(item)
+            if classify_item(item) != "other":
+                groups.append(pending)
+                pending = []
+        if pending:
+            groups.append(pending)
+
+        kinds = [classify_item(group[-1]) for group in groups]
+        latest: Dict[str, int] = {}
+        for index, kind in enumerate(kinds):
+            latest[kind] = index
+
+        kept = []
+        for index, (kind, group) in enumerate(zip(kinds, groups)):
+            # The first item is always the original spec
+            if index == 0 or kind in ("user", "other") or latest[kind] == index:
+                kept.extend(group)
+        return kept
+
+    def _fit_budget(self, items: List[Any]) -> List[Any]:
+        items = list(items)
+        total = sum(item_tokens(item) for item in items)
+        # Never collapse the spec or the most recent item; they are what the agent acts on
+        candidates = [i for i in range(1, len(items) - 1) if classify_item(items[i]) != "other"]
+        candidates.sort(key=lambda i: item_tokens(items[i]), reverse=True)
+        for index in candidates:
+            if total <= self.token_budget:
+                break
+            original = items[index]
+            tokens = item_tokens(original)
+            text = item_text(original)
+            keep_chars = max(0, (self.token_budget // max(1, len(items))) * 4)
+            collapsed_text = f"{text[:keep_chars]}\n[... {tokens} tokens of earlier context omitted ...]"
+            items[index] = {"content": collapsed_text, "role": original.get("role", "user")}
+            total -= tokens - count_tokens(collapsed_text)
+        return items
+
+    def report(self) -> Optional[str]:
+        if not self.phases:
+            return None
+        lines = ["Phase                 Calls    Before     After   Saved"]
+        for phase, stats in self.phases.items():
+            saved = stats.before - stats.after
+            lines.append(f"{phase:<20}  {stats.calls:>5}  {stats.before:>8}  {stats.after:>8}  {saved:>6}")
+        return "\n".join(lines)
@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+"""
+Vibes Coding - Checkpoint Journal
+
+An append-only, per-spec journal of every finished phase of a pipeline run:
+the input validation, each plan and its evaluation, each code attempt and its
+evaluation. Each record is one JSON line, flushed and fsynced before the
+pipeline moves on, so a crash, a network drop or a KeyboardInterrupt loses at
+most the phase that was running. A torn last line is ignored on replay.
+
+With --resume, the pipeline replays the journaled phases instead of calling
+the models again and continues from the first phase that did not finish.
+A journal is only resumed for the exact spec text it was written for, and a
+run that completed starts a fresh journal.
+"""
+
+
+def spec_fingerprint(spec_text: str) -> str:
+    return hashlib.sha256(spec_text.encode("utf-8")).hexdigest()
+
+
+def read_records(path: str) -> List[Dict[str, Any]]:
+    """Read every intact record; stop at the first torn or corrupt line"""
+    records = []
+    try:
+        with open(path, "r") as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    break
+    except FileNotFoundError:
+        pass
+    return records
+
+
+class Journal:
+    """Append-only phase log for one spec, with replay of an interrupted run"""
+
+    def __init__(self, path: str, spec_text: str, resume: bool = False):
+        self.path = path
+        self.fingerprint = spec_fingerprint(spec_text)
+        self.entries: Dict[Tuple[str, int], Dict[str, Any]] = {}
+        self.replayed = 0
+
+        records = read_records(path) if resume else []
+        header = records[0] if records else {}
+        resumable = (
+            header.get("phase") == "run_start"
+            and header.get("spec") == self.fingerprint
+            and not any(r.get("phase") == "complete" for r in records)
+        )
+        if resumable:
+            for record in records[1:]:
+                self.entries[(record["phase"], record.get("attempt", 1))] = record.get("data", {})
+            self._truncate_to(records)
+        else:
+            self._start()
+
+    def _start(self) -> None:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._rewrite([{"phase": "run_start", "spec": self.fingerprint, "time": time.time()}])
+
+    def _truncate_to(self, records: List[Dict[str, Any]]) -> None:
+        # Drop a torn tail so new records start on a clean line
+        self._rewrite(records)
+
+    def _rewrite(self, records: List[Dict[str, Any]]) -> None:
+        """Replace the journal atomically, so a crash mid-write leaves the old one intact"""
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    @property
+    def resuming(self) -> bool:
+        return bool(self.entries)
+
+    def has(self, phase: str, attempt: int = 1) -> bool:
+        return (phase, attempt) in self.entries
+
+    def replay(self, phase: str, attempt: int = 1) -> Optional[Dict[str, Any]]:
+        """Return the journaled data of a finished phase, if any"""
+        data = self.entries.get((phase, attempt))
+        if data is not None:
+            self.replayed += 1
+        return data
+
+    def record(self, phase: str, attempt: int, data: Dict[str, Any]) -> None:
+        """Durably append a finished phase"""
+        line = json.dumps({"phase": phase, "attempt": attempt, "time": time.time(), "data": data}, default=str)
+        with open(self.path, "a") as f:
+            f.write(line + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def complete(self) -> None:
+        self.record("complete", 1, {})
@@ -0,0 +1,249 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import re
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, Iterator, List, Optional
+
+"""
+Vibes Coding - Run Metrics
+
+Records every phase of a pipeline run (guardrail, each plan attempt, plan
+evaluation, each code attempt, code evaluation, file save) with its wall time,
+input/output tokens, retries and outcome, plus the latency, tokens and
+estimated cost of every agent, and exports the run as a JSON report and as a
+Prometheus text-format file that a local scraper (e.g. the node exporter's
+textfile collector) can read.
+"""
+
+
+@dataclass
+class PhaseRecord:
+    phase: str
+    attempt: int
+    started_at: float  # Unix timestamp
+    duration: float = 0.0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    model_calls: int = 0
+    cached_calls: int = 0
+    retries: int = 0  # Transport-level retries inside this phase
+    rate_wait: float = 0.0  # Seconds queued in the shared rate limiter
+    outcome: str = "ok"  # ok / pass / needs_improvement / fail / error / ...
+
+    def add_usage(self, result: Any) -> None:
+        """Add the token usage of an AgentRunResult to this phase"""
+        self.input_tokens += getattr(result, "input_tokens", 0)
+        self.output_tokens += getattr(result, "output_tokens", 0)
+        self.model_calls += getattr(result, "model_calls", 0)
+        self.retries += getattr(result, "retries", 0)
+        self.rate_wait += getattr(result, "rate_wait", 0.0)
+        if getattr(result, "cached", False):
+            self.cached_calls += 1
+
+
+@dataclass
+class AgentStats:
+    agent: str
+    calls: int = 0
+    cached_calls: int = 0
+    fallbacks: int = 0  # Calls answered by the route's fallback model
+    duration: float = 0.0  # Summed call latency, including rate limiter waits and retries
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cost: float = 0.0  # Estimated dollars
+    models: Dict[str, int] = field(default_factory=dict)  # Model -> calls it answered
+
+
+@dataclass
+class RunMetrics:
+    spec_path: str
+    started_at: float = field(default_factory=time.time)
+    duration: float = 0.0
+    status: str = "running"
+    phases: List[PhaseRecord] = field(default_factory=list)
+    stop_reasons: Dict[str, str] = field(default_factory=dict)  # Refinement loop -> why it ended
+    agents: Dict[str, AgentStats] = field(default_factory=dict)
+    critical_path: List[str] = field(default_factory=list)  # Pipeline graph nodes that set the run's latency
+
+    @contextmanager
+    def phase(self, name: str, attempt: int = 1) -> Iterator[PhaseRecord]:
+        """Time a phase; an exception marks it as an error (or cancelled) and is re-raised"""
+        record = PhaseRecord(phase=name, attempt=attempt, started_at=time.time())
+        self.phases.append(record)
+        started = time.perf_counter()
+        try:
+            yield record
+        except asyncio.CancelledError:
+            record.outcome = "cancelled"
+            raise
+        except BaseException:
+            record.outcome = "error"
+            raise
+        finally:
+            record.duration = time.perf_counter() - started
+
+    def record_agent_call(
+        self,
+        agent: str,
+        model: str,
+        duration: float,
+        input_tokens: int = 0,
+        output_tokens: int = 0,
+        cost: float = 0.0,
+        cached: bool = False,
+        fallback: bool = False,
+    ) -> None:
+        stats = self.agents.setdefault(agent, AgentStats(agent=agent))
+        stats.calls += 1
+        stats.cached_calls += int(cached)
+        stats.fallbacks += int(fallback)
+        stats.duration += duration
+        stats.input_tokens += input_tokens
+        stats.output_tokens += output_tokens
+        stats.cost += cost
+        stats.models[model] = stats.models.get(model, 0) + 1
+
+    def finish(self, status: str) -> None:
+        self.status = status
+        self.duration = time.time() - self.started_at
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Totals per phase name, so the dominant phase is easy to spot"""
+        totals: Dict[str, Dict[str, float]] = {}
+        for record in self.phases:
+            t = totals.setdefault(record.phase, {
+                "attempts": 0, "duration": 0.0, "input_tokens": 0, "output_tokens": 0, "retries": 0,
+            })
+            t["attempts"] += 1
+            t["duration"] += record.duration
+            t["input_tokens"] += record.input_tokens
+            t["output_tokens"] += record.output_tokens
+            t["retries"] += record.retries
+        return totals
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "spec_path": self.spec_path,
+            "started_at": self.started_at,
+            "duration": self.duration,
+            "status": self.status,
+            "phases": [asdict(record) for record in self.phases],
+            "stop_reasons": dict(self.stop_reasons),
+            "agents": {name: asdict(stats) for name, stats in self.agents.items()},
+            "critical_path": list(self.critical_path),
+            "summary": self.summary(),
+        }
+
+    def report(self) -> str:
+        lines = [f"{'Phase':<18}  {'Attempts':>8}  {'Time':>8}  {'Share':>6}  {'Tokens in':>9}  {'Tokens out':>10}"]
+        total = sum(t["duration"] for t in self.summary().values()) or 1.0
+        for name, t in self.summary().items():
+            lines.append(
+                f"{name:<18}  {t['attempts']:>8}  {t['duration']:>7.2f}s  {t['duration'] / total:>6.0%}  "
+                f"{t['input_tokens']:>9}  {t['output_tokens']:>10}"
+            )
+        return "\n".join(lines)
+
+    def agent_report(self) -> str:
+        lines = [f"{'Agent':<18}  {'Calls':>5}  {'Time':>8}  {'Tokens in':>9}  {'Tokens out':>10}  {'Cost':>9}  Models"]
+        for name, a in sorted(self.agents.items()):
+            models = ", ".join(f"{model} x{calls}" for model, calls in sorted(a.models.items()))
+            if a.fallbacks:
+                models += f" ({a.fallbacks} fallback)"
+            lines.append(
+                f"{name:<18}  {a.calls:>5}  {a.duration:>7.2f}s  {a.input_tokens:>9}  {a.output_tokens:>10}  "
+                f"{'$' + format(a.cost, '.4f'):>9}  {models}"
+            )
+        return "\n".join(lines)
+
+
+# The run whose agent calls are being accounted; each pipeline task sets its own
+active_run: ContextVar[Optional[RunMetrics]] = ContextVar("active_run", default=None)
+
+
+PASSED_OUTCOMES = {"ok", "pass"}
+FAILED_OUTCOMES = {"fail", "needs_improvement", "error", "cancelled"}
+
+
+def _slug(spec_path: str) -> str:
+    name = os.path.splitext(os.path.basename(spec_path))[0]
+    return re.sub(r"[^A-Za-z0-9_.-]+", "_", name) or "spec"
+
+
+def _label(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _atomic_write(path: str, content: str) -> None:
+    # Scrapers must never see a half-written file
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+
+def to_prometheus(metrics: RunMetrics) -> str:
+    """Render a run in the Prometheus text exposition format"""
+    spec = metrics.spec_path  # metric() escapes every label value
+    lines: List[str] = []
+
+    def metric(name: str, kind: str, help_text: str, samples: List[tuple[Dict[str, Any], float]]) -> None:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, value in samples:
+            label_text = ",".join(f'{key}="{_label(val)}"' for key, val in labels.items())
+            lines.append(f"{name}{{{label_text}}} {value}")
+
+    phase_samples = lambda attr: [
+        ({"spec": spec, "phase": r.phase, "attempt": r.attempt}, getattr(r, attr)) for r in metrics.phases
+    ]
+    metric("vibes_run_duration_seconds", "gauge", "Wall time of the last pipeline run.",
+           [({"spec": spec, "status": metrics.status}, round(metrics.duration, 6))])
+    metric("vibes_run_success", "gauge", "1 if the last pipeline run generated a project.",
+           [({"spec": spec}, 1 if metrics.status == "success" else 0)])
+    metric("vibes_phase_duration_seconds", "gauge", "Wall time of each phase attempt.",
+           [(labels, round(value, 6)) for labels, value in phase_samples("duration")])
+    metric("vibes_phase_input_tokens", "gauge", "Input tokens sent by each phase attempt.", phase_samples("input_tokens"))
+    metric("vibes_phase_output_tokens", "gauge", "Output tokens received by each phase attempt.", phase_samples("output_tokens"))
+    metric("vibes_phase_retries", "gauge", "Transport retries inside each phase attempt.", phase_samples("retries"))
+    metric("vibes_phase_rate_wait_seconds", "gauge", "Seconds each phase attempt queued in the rate limiter.",
+           [(labels, round(value, 6)) for labels, value in phase_samples("rate_wait")])
+    metric("vibes_phase_outcome", "gauge", "1 for each phase attempt, labelled with its outcome.",
+           [({"spec": spec, "phase": r.phase, "attempt": r.attempt, "outcome": r.outcome}, 1) for r in metrics.phases])
+    # Lookups (hit/miss, built/reused) neither pass nor fail, so only verdicts count here
+    metric("vibes_phase_passed", "gauge", "1 if the phase attempt passed or completed, 0 if it failed.",
+           [({"spec": spec, "phase": r.phase, "attempt": r.attempt, "outcome": r.outcome},
+             1 if r.outcome in PASSED_OUTCOMES else 0)
+            for r in metrics.phases if r.outcome in PASSED_OUTCOMES | FAILED_OUTCOMES])
+    agent_samples = lambda attr: [
+        ({"spec": spec, "agent": name}, getattr(a, attr)) for name, a in metrics.agents.items()
+    ]
+    metric("vibes_agent_calls", "gauge", "Model calls made by each agent.", agent_samples("calls"))
+    metric("vibes_agent_duration_seconds", "gauge", "Summed call latency of each agent.",
+           [(labels, round(value, 6)) for labels, value in agent_samples("duration")])
+    metric("vibes_agent_input_tokens", "gauge", "Input tokens sent by each agent.", agent_samples("input_tokens"))
+    metric("vibes_agent_output_tokens", "gauge", "Output tokens received by each agent.", agent_samples("output_tokens"))
+    metric("vibes_agent_cost_dollars", "gauge", "Estimated cost of each agent's calls.",
+           [(labels, round(value, 6)) for labels, value in agent_samples("cost")])
+    metric("vibes_agent_fallbacks", "gauge", "Calls answered by each agent's fallback model.", agent_samples("fallbacks"))
+    metric("vibes_phase_attempts", "gauge", "Number of attempts per phase in the last run.",
+           [({"spec": spec, "phase": name}, t["attempts"]) for name, t in metrics.summary().items()])
+    return "\n".join(lines) + "\n"
+
+
+def export_metrics(metrics: RunMetrics, metrics_dir: str) -> Dict[str, str]:
+    """Write the JSON run report and the Prometheus text file; return their paths"""
+    os.makedirs(metrics_dir, exist_ok=True)
+    slug = _slug(metrics.spec_path)
+    stamp = time.strftime("%Y%m%dT%H%M%S", time.localtime(metrics.started_at))
+    json_path = os.path.join(metrics_dir, f"{slug}-{stamp}.json")
+    prom_path = os.path.join(metrics_dir, f"vibes_{slug}.prom")
+    _atomic_write(json_path, json.dumps(metrics.to_dict(), indent=2))
+    _atomic_write(prom_path, to_prometheus(metrics))
+    return {"json": json_path, "prometheus": prom_path}
@@ -0,0 +1,180 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import random
+import re
+import time
+from dataclasses import asdict, dataclass
+from typing import Dict, List, Optional
+
+"""
+Vibes Coding - Approved Plan Index
+
+A local similarity index over past vibes inputs and the plans that were
+approved for them. Each spec is reduced to a MinHash signature of its word
+shingles (numbers are normalized, so "a 20x20 board" and "a 30x30 board" look
+the same); a new spec whose estimated Jaccard similarity to a stored one
+reaches the threshold gets the stored plan back, so the pipeline can go
+straight to evaluating it against the new spec instead of planning from
+scratch.
+
+The index is a single JSON file, written atomically, and is evicted by age and
+by entry count (least recently used first). Lookups scan every signature,
+which is cheap at the few hundred entries the index keeps.
+"""
+
+DEFAULT_INDEX_PATH = ".vibes_plans.json"
+DEFAULT_THRESHOLD = 0.8
+DEFAULT_MAX_ENTRIES = 500
+DEFAULT_MAX_AGE_SECONDS = 90 * 24 * 60 * 60
+
+NUM_PERMUTATIONS = 128
+SHINGLE_SIZE = 3
+_PRIME = (1 << 61) - 1
+_rng = random.Random(1337)  # Fixed seed: signatures must be comparable across runs
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERMUTATIONS)]
+
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> List[str]:
+    """Overlapping word n-grams of the normalized spec"""
+    words = re.findall(r"[a-z]+|\d+", text.lower())
+    words = ["#" if word.isdigit() else word for word in words]
+    if len(words) <= size:
+        return [" ".join(words)] if words else []
+    return sorted({" ".join(words[i:i + size]) for i in range(len(words) - size + 1)})
+
+
+def minhash(text: str) -> List[int]:
+    hashes = [int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "big") for s in shingles(text)]
+    if not hashes:
+        return [_PRIME] * NUM_PERMUTATIONS
+    return [min((a * h + b) % _PRIME for h in hashes) for a, b in _PERMUTATIONS]
+
+
+def similarity(left: List[int], right: List[int]) -> float:
+    """Estimated Jaccard similarity of two MinHash signatures"""
+    return sum(1 for a, b in zip(left, right) if a == b) / NUM_PERMUTATIONS
+
+
+def spec_hash(text: str) -> str:
+    return hashlib.sha256(text.strip().encode("utf-8")).hexdigest()
+
+
+@dataclass
+class PlanEntry:
+    spec_hash: str
+    spec: str
+    plan: str
+    signature: List[int]
+    created_at: float
+    last_used: float
+    hits: int = 0
+
+
+@dataclass
+class PlanMatch:
+    entry: PlanEntry
+    similarity: float
+
+
+class PlanIndex:
+    """Persistent MinHash index of approved plans with threshold lookup and LRU eviction"""
+
+    def __init__(
+        self,
+        path: str = DEFAULT_INDEX_PATH,
+        threshold: float = DEFAULT_THRESHOLD,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        max_age_seconds: float = DEFAULT_MAX_AGE_SECONDS,
+    ):
+        self.path = path
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.max_age_seconds = max_age_seconds
+        self._entries: Optional[Dict[str, PlanEntry]] = None
+        self.lookups = 0
+        self.hits = 0
+
+    @classmethod
+    def from_env(cls) -> "PlanIndex":
+        """Build an index from VIBES_PLAN_* environment variables"""
+        return cls(
+            path=os.getenv("VIBES_PLAN_INDEX", DEFAULT_INDEX_PATH),
+            threshold=float(os.getenv("VIBES_PLAN_SIMILARITY", DEFAULT_THRESHOLD)),
+            max_entries=int(os.getenv("VIBES_PLAN_MAX_ENTRIES", DEFAULT_MAX_ENTRIES)),
+            max_age_seconds=float(os.getenv("VIBES_PLAN_MAX_AGE_DAYS", DEFAULT_MAX_AGE_SECONDS / 86400)) * 86400,
+        )
+
+    @property
+    def entries(self) -> Dict[str, PlanEntry]:
+        # Loaded on first use so importing the pipeline never touches the disk
+        if self._entries is None:
+            try:
+                with open(self.path, "r") as f:
+                    data = json.load(f)
+                self._entries = {e["spec_hash"]: PlanEntry(**e) for e in data.get("entries", [])}
+            except (FileNotFoundError, json.JSONDecodeError, TypeError, KeyError):
+                self._entries = {}
+        return self._entries
+
+    def lookup(self, spec: str) -> Optional[PlanMatch]:
+        """Return the most similar stored plan at or above the threshold"""
+        self.lookups += 1
+        self.evict()
+        exact = self.entries.get(spec_hash(spec))
+        if exact is not None:
+            best = PlanMatch(exact, 1.0)
+        else:
+            signature = minhash(spec)
+            best = None
+            for entry in self.entries.values():
+                score = similarity(signature, entry.signature)
+                if score >= self.threshold and (best is None or score > best.similarity):
+                    best = PlanMatch(entry, score)
+        if best is not None:
+            self.hits += 1
+            best.entry.hits += 1
+            best.entry.last_used = time.time()
+            self.save()
+        return best
+
+    def add(self, spec: str, plan: str) -> None:
+        """Remember the plan approved for a spec"""
+        now = time.time()
+        key = spec_hash(spec)
+        previous = self.entries.get(key)
+        self.entries[key] = PlanEntry(
+            spec_hash=key,
+            spec=spec,
+            plan=plan,
+            signature=minhash(spec),
+            created_at=now,
+            last_used=now,
+            hits=previous.hits if previous else 0,
+        )
+        self.evict()
+        self.save()
+
+    def evict(self) -> None:
+        """Drop expired entries, then least recently used ones until under max_entries"""
+        now = time.time()
+        for key in [k for k, e in self.entries.items() if now - e.last_used > self.max_age_seconds]:
+            del self.entries[key]
+        if len(self.entries) > self.max_entries:
+            by_use = sorted(self.entries.values(), key=lambda e: e.last_used)
+            for entry in by_use[:len(self.entries) - self.max_entries]:
+                del self.entries[entry.spec_hash]
+
+    def save(self) -> None:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"entries": [asdict(e) for e in self.entries.values()]}, f)
+        os.replace(tmp_path, self.path)
+
+    def summary(self) -> str:
+        return f"Plan index: {self.hits}/{self.lookups} specs reused a plan, {len(self.entries)} plans stored"
@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import difflib
+import time
+from dataclasses import dataclass, field
+from typing import Optional, Tuple
+
+from vibes_metrics import RunMetrics
+
+"""
+Vibes Coding - Refinement Policy
+
+Decides when the plan and code refinement loops stop. Each loop has its own
+attempt limit, wall-clock budget and token budget, and the whole run can have
+a wall-clock and token budget on top. After every rejected attempt the loop
+stops early when another attempt would not fit in what is left of a budget
+(estimated from the previous attempt) or when the evaluator's feedback has
+stopped changing between rounds. Every loop records why it ended.
+
+Token and time usage are read from the run's RunMetrics, so the pipeline does
+not need any extra bookkeeping.
+"""
+
+PLAN_PHASES = ("plan_generation", "plan_evaluation")
+CODE_PHASES = ("code_generation", "static_check", "code_evaluation", "output_guardrail", "smoke_test")
+
+
+@dataclass
+class PhaseBudget:
+    max_attempts: int = 3
+    max_seconds: Optional[float] = None  # Wall-clock budget for the whole loop
+    max_tokens: Optional[int] = None  # Input + output tokens for the whole loop
+
+
+@dataclass
+class RefinementPolicy:
+    plan: PhaseBudget = field(default_factory=PhaseBudget)
+    code: PhaseBudget = field(default_factory=PhaseBudget)
+    max_seconds: Optional[float] = None  # Wall-clock budget for the whole run
+    max_tokens: Optional[int] = None  # Input + output tokens for the whole run
+    convergence: float = 0.9  # Feedback at least this similar to the previous round counts as unchanged
+
+    def loop(self, name: str, metrics: RunMetrics) -> "RefinementLoop":
+        budget = self.plan if name == "plan" else self.code
+        return RefinementLoop(name, budget, self, metrics, PLAN_PHASES if name == "plan" else CODE_PHASES)
+
+
+def feedback_similarity(previous: str, current: str) -> float:
+    return difflib.SequenceMatcher(None, previous.strip(), current.strip()).ratio()
+
+
+class RefinementLoop:
+    """Budget bookkeeping and stop decisions for one refinement loop"""
+
+    def __init__(self, name: str, budget: PhaseBudget, policy: RefinementPolicy, metrics: RunMetrics,
+                 phases: Tuple[str, ...]):
+        self.name = name
+        self.budget = budget
+        self.policy = policy
+        self.metrics = metrics
+        self.phases = phases
+        self.started = time.perf_counter()
+        self.first_record = len(metrics.phases)
+        self.attempts = 0
+        self.attempt_started = self.started
+        self.attempt_record = self.first_record
+        self.last_attempt_seconds = 0.0
+        self.last_attempt_tokens = 0
+        self.last_feedback: Optional[str] = None
+        self.reason: Optional[str] = None
+
+    def _tokens(self, since_record: int) -> int:
+        return sum(
+            record.input_tokens + record.output_tokens
+            for record in self.metrics.phases[since_record:] if record.phase in self.phases
+        )
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    @property
+    def tokens(self) -> int:
+        return self._tokens(self.first_record)
+
+    def begin_attempt(self) -> int:
+        self.attempts += 1
+        self.attempt_started = time.perf_counter()
+        self.attempt_record = len(self.metrics.phases)
+        return self.attempts
+
+    def approve(self) -> None:
+        self._end("approved")
+
+    def after_rejection(self, feedback: str) -> Optional[str]:
+        """Decide whether another attempt is worth it; returns the stop reason or None to continue"""
+        self.last_attempt_seconds = time.perf_counter() - self.attempt_started
+        self.last_attempt_tokens = self._tokens(self.attempt_record)
+        previous, self.last_feedback = self.last_feedback, feedback
+        # Assume the next attempt costs what the last one did
+        seconds, tokens = self.last_attempt_seconds, self.last_attempt_tokens
+        run_seconds = time.time() - self.metrics.started_at
+        run_tokens = sum(record.input_tokens + record.output_tokens for record in self.metrics.phases)
+
+        if self.attempts >= self.budget.max_attempts:
+            return self._end(f"attempt limit ({self.budget.max_attempts}) reached")
+        if previous is not None and feedback_similarity(previous, feedback) >= self.policy.convergence:
+            return self._end("feedback stopped changing between rounds")
+        if self.budget.max_seconds is not None and self.elapsed + seconds > self.budget.max_seconds:
+            return self._end(f"{self.name} time budget ({self.budget.max_seconds:g}s) would be exceeded")
+        if self.budget.max_tokens is not None and self.tokens + tokens > self.budget.max_tokens:
+            return self._end(f"{self.name} token budget ({self.budget.max_tokens}) would be exceeded")
+        if self.policy.max_seconds is not None and run_seconds + seconds > self.policy.max_seconds:
+            return self._end(f"run time budget ({self.policy.max_seconds:g}s) would be exceeded")
+        if self.policy.max_tokens is not None and run_tokens + tokens > self.policy.max_tokens:
+            return self._end(f"run token budget ({self.policy.max_tokens}) would be exceeded")
+        return None
+
+    def _end(self, reason: str) -> str:
+        self.reason = reason
+        self.metrics.stop_reasons[self.name] = reason
+        return reason
+
+    def summary(self) -> str:
+        return (
+            f"{self.name.capitalize()} loop ended after {self.attempts} attempt(s): {self.reason} "
+            f"({self.elapsed:.1f}s, {self.tokens} tokens)"
+        )
@@ -0,0 +1,286 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import random
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Deque, Optional, Tuple, TypeVar
+
+"""
+Vibes Coding - Shared Rate Limiter
+
+Every agent call in the process goes through one RateLimiter, so many
+pipelines running at once share the provider's limits instead of each one
+discovering them with a 429:
+
+- Token buckets for requests per minute and tokens per minute. A call
+  reserves one request and its estimated tokens up front, and once it has
+  finished the estimate is corrected with the real usage.
+- An adaptive concurrency limit (additive increase, multiplicative decrease):
+  it halves when the provider throttles and grows back by about one slot per
+  window of successful calls.
+- Retries with exponential backoff and full jitter for 429s, 5xx responses,
+  timeouts and connection errors, honouring Retry-After when the provider
+  sends one.
+
+The limiter keeps queue-depth, wait-time and retry statistics for reports.
+"""
+
+T = TypeVar("T")
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+THROTTLE_STATUS = {429, 503}  # Responses that mean "slow down", not just "try again"
+
+
+def status_code(error: BaseException) -> Optional[int]:
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def is_retryable(error: BaseException) -> bool:
+    if status_code(error) in RETRYABLE_STATUS:
+        return True
+    if isinstance(error, (asyncio.TimeoutError, TimeoutError, ConnectionError)):
+        return True
+    try:
+        from openai import APIConnectionError  # Also covers APITimeoutError
+    except ImportError:
+        return False
+    return isinstance(error, APIConnectionError)
+
+
+def retry_after(error: BaseException) -> Optional[float]:
+    """Seconds the provider asked us to wait, if it said so"""
+    headers = getattr(error, "headers", None) or getattr(getattr(error, "response", None), "headers", None)
+    if not headers:
+        return None
+    value = headers.get("retry-after-ms")
+    if value is not None:
+        try:
+            return float(value) / 1000
+        except ValueError:
+            pass
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """Refills at per_minute / 60 per second up to its capacity; reservations may go into debt"""
+
+    def __init__(self, per_minute: float, capacity: Optional[float] = None):
+        self.rate = per_minute / 60.0
+        self.capacity = capacity if capacity is not None else per_minute
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount: float) -> float:
+        """Take amount now and return how many seconds to wait before using it"""
+        self._refill()
+        # A single call larger than the whole bucket must still be able to run eventually
+        self.level -= min(amount, self.capacity)
+        return max(0.0, -self.level / self.rate)
+
+    def adjust(self, amount: float) -> None:
+        """Charge (or refund, when negative) the difference between an estimate and real usage"""
+        self._refill()
+        self.level = min(self.capacity, self.level - amount)
+
+
+class AdaptiveLimit:
+    """Concurrency limit that shrinks on throttling and grows back on success"""
+
+    def __init__(self, maximum: int, minimum: int = 1):
+        self.maximum = max(1, maximum)
+        self.minimum = max(1, min(minimum, self.maximum))
+        self.limit = float(self.maximum)
+        self.in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self) -> None:
+        if self.in_flight < int(self.limit) and not self._waiters:
+            self.in_flight += 1
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await waiter
+        except BaseException:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+            elif not waiter.cancelled():
+                # We were handed a slot but are not going to use it
+                self.release()
+            raise
+
+    def release(self) -> None:
+        self.in_flight -= 1
+        self._wake()
+
+    def _wake(self) -> None:
+        while self._waiters and self.in_flight < int(self.limit):
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+
+    def on_success(self) -> None:
+        self.limit = min(self.maximum, self.limit + 1.0 / self.limit)
+        self._wake()
+
+    def on_throttle(self) -> None:
+        self.limit = max(self.minimum, self.limit / 2)
+
+
+@dataclass
+class LimiterStats:
+    calls: int = 0
+    retries: int = 0
+    throttled: int = 0  # Responses that asked us to slow down
+    failures: int = 0  # Calls that gave up after the last retry
+    wait_seconds: float = 0.0  # Time spent queued for a slot or for bucket capacity
+    max_wait: float = 0.0
+    backoff_seconds: float = 0.0
+    max_queue_depth: int = 0
+    min_concurrency: float = 0.0  # Lowest concurrency limit the adaptive limit fell to
+
+
+@dataclass
+class CallReport:
+    retries: int = 0
+    waited: float = 0.0  # Seconds queued in the limiter, backoff excluded
+
+
+class RateLimiter:
+    """Process-wide RPM/TPM limits, adaptive concurrency and retry with backoff for agent calls"""
+
+    def __init__(
+        self,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+        max_concurrency: int = 16,
+        min_concurrency: int = 1,
+        max_retries: int = 5,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+    ):
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.concurrency = AdaptiveLimit(max_concurrency, min_concurrency)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.stats = LimiterStats(min_concurrency=float(self.concurrency.maximum))
+        self._random = random.Random()
+
+    @classmethod
+    def from_env(cls) -> "RateLimiter":
+        """Build a limiter from VIBES_* environment variables"""
+        rpm = os.getenv("VIBES_RPM")
+        tpm = os.getenv("VIBES_TPM")
+        return cls(
+            requests_per_minute=float(rpm) if rpm else None,
+            tokens_per_minute=float(tpm) if tpm else None,
+            max_concurrency=int(os.getenv("VIBES_MAX_CONCURRENCY", "16")),
+            max_retries=int(os.getenv("VIBES_MAX_RETRIES", "5")),
+            base_delay=float(os.getenv("VIBES_RETRY_BASE_DELAY", "1.0")),
+            max_delay=float(os.getenv("VIBES_RETRY_MAX_DELAY", "60.0")),
+        )
+
+    def set_limits(self, requests_per_minute: Optional[float] = None, tokens_per_minute: Optional[float] = None) -> None:
+        if requests_per_minute:
+            self.requests = TokenBucket(requests_per_minute)
+        if tokens_per_minute:
+            self.tokens = TokenBucket(tokens_per_minute)
+
+    @property
+    def queue_depth(self) -> int:
+        return self.concurrency.waiting
+
+    def backoff(self, attempt: int, error: BaseException) -> float:
+        """Full-jitter exponential backoff, but never shorter than the provider's Retry-After"""
+        delay = self._random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        return max(delay, retry_after(error) or 0.0)
+
+    async def _admit(self, estimated_tokens: int) -> float:
+        """Wait for a concurrency slot and for bucket capacity; return the seconds waited"""
+        started = time.perf_counter()
+        if self.queue_depth or self.concurrency.in_flight >= int(self.concurrency.limit):
+            self.stats.max_queue_depth = max(self.stats.max_queue_depth, self.queue_depth + 1)
+        await self.concurrency.acquire()
+        try:
+            delay = 0.0
+            if self.requests is not None:
+                delay = max(delay, self.requests.reserve(1))
+            if self.tokens is not None and estimated_tokens:
+                delay = max(delay, self.tokens.reserve(estimated_tokens))
+            if delay:
+                await asyncio.sleep(delay)
+        except BaseException:
+            self.concurrency.release()
+            raise
+        return time.perf_counter() - started
+
+    async def run(
+        self,
+        call: Callable[[], Awaitable[T]],
+        estimated_tokens: int = 0,
+        used_tokens: Callable[[T], int] = None,
+        can_retry: Callable[[], bool] = None,
+    ) -> Tuple[T, CallReport]:
+        """Run call under the limits, retrying retryable failures while can_retry() allows it"""
+        report = CallReport()
+        self.stats.calls += 1
+        attempt = 0
+        while True:
+            waited = await self._admit(estimated_tokens)
+            report.waited += waited
+            self.stats.wait_seconds += waited
+            self.stats.max_wait = max(self.stats.max_wait, waited)
+            try:
+                result = await call()
+            except Exception as e:
+                retryable = is_retryable(e) and (can_retry is None or can_retry())
+                if status_code(e) in THROTTLE_STATUS:
+                    self.stats.throttled += 1
+                    self.concurrency.on_throttle()
+                    self.stats.min_concurrency = min(self.stats.min_concurrency, self.concurrency.limit)
+                if not retryable or attempt >= self.max_retries:
+                    self.stats.failures += 1
+                    raise
+                delay = self.backoff(attempt, e)
+                attempt += 1
+                report.retries += 1
+                self.stats.retries += 1
+                self.stats.backoff_seconds += delay
+            else:
+                self.concurrency.on_success()
+                if self.tokens is not None and used_tokens is not None:
+                    self.tokens.adjust(used_tokens(result) - estimated_tokens)
+                return result, report
+            finally:
+                self.concurrency.release()
+            await asyncio.sleep(delay)
+
+    def summary(self) -> str:
+        s = self.stats
+        return (
+            f"Rate limiter: {s.calls} calls, {s.retries} retries ({s.throttled} throttled, {s.failures} gave up), "
+            f"{s.wait_seconds:.1f}s queued (max {s.max_wait:.1f}s, peak queue {s.max_queue_depth}), "
+            f"{s.backoff_seconds:.1f}s backing off, concurrency {self.concurrency.limit:.1f}"
+            f"/{self.concurrency.maximum} (low {s.min_concurrency:.1f})"
+        )
@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import json
+import os
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Dict, Optional
+
+if TYPE_CHECKING:
+    from agents import Agent
+
+"""
+Vibes Coding - Per-Agent Model Routing
+
+Assigns each agent its own model and model settings, so cheap classification
+work (guardrails, evaluators) can run on a faster model than planning and code
+generation. A route can name a fallback model that is used when the primary
+model errors out or takes longer than the route's timeout. Model prices turn
+the token counts of every call into an estimated cost for the per-agent report.
+
+The routing config is a JSON file (vibes_routing.json, or VIBES_ROUTING):
+
+    {
+      "default": {"model": "gpt-4.1"},
+      "agents": {
+        "input_guardrail": {"model": "gpt-4.1-mini", "fallback": "gpt-4.1", "timeout": 20,
+                            "settings": {"temperature": 0}}
+      },
+      "prices": {"gpt-4.1": {"input": 2.0, "output": 8.0}}
+    }
+
+Prices are per million tokens ("default" prices the SDK's default model).
+Agents without a route use the default route, and a route without a model
+keeps the SDK's default model.
+"""
+
+DEFAULT_ROUTING_PATH = "vibes_routing.json"
+
+
+@dataclass
+class AgentRoute:
+    model: Optional[str] = None  # None keeps the agent's / SDK's default model
+    fallback: Optional[str] = None  # Used when the primary model errors or exceeds the timeout
+    timeout: Optional[float] = None  # Seconds before giving up on the primary model
+    settings: Dict[str, Any] = field(default_factory=dict)  # ModelSettings fields, e.g. temperature
+
+
+@dataclass
+class ModelPrice:
+    input: float = 0.0  # Dollars per million input tokens
+    output: float = 0.0  # Dollars per million output tokens
+
+
+class ModelRouter:
+    """Per-agent model, settings, fallback and price lookup"""
+
+    def __init__(
+        self,
+        routes: Optional[Dict[str, AgentRoute]] = None,
+        default: Optional[AgentRoute] = None,
+        prices: Optional[Dict[str, ModelPrice]] = None,
+    ):
+        self.routes = routes or {}
+        self.default = default or AgentRoute()
+        self.prices = prices or {}
+        self._agents: Dict[tuple, Agent] = {}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ModelRouter":
+        return cls(
+            routes={name: AgentRoute(**route) for name, route in data.get("agents", {}).items()},
+            default=AgentRoute(**data.get("default", {})),
+            prices={model: ModelPrice(**price) for model, price in data.get("prices", {}).items()},
+        )
+
+    @classmethod
+    def from_file(cls, path: str) -> "ModelRouter":
+        with open(path, "r") as f:
+            return cls.from_dict(json.load(f))
+
+    @classmethod
+    def from_env(cls) -> "ModelRouter":
+        """Load VIBES_ROUTING (or vibes_routing.json when present); no config routes nothing"""
+        path = os.getenv("VIBES_ROUTING", DEFAULT_ROUTING_PATH)
+        if not os.path.exists(path):
+            return cls()
+        return cls.from_file(path)
+
+    def route(self, agent_name: str) -> AgentRoute:
+        return self.routes.get(agent_name, self.default)
+
+    def agent_for(self, agent: Agent, fallback: bool = False) -> Agent:
+        """The agent with its routed model and settings applied"""
+        route = self.route(agent.name)
+        model = route.fallback if fallback else route.model
+        if model is None and not route.settings:
+            return agent
+        key = (agent.name, id(agent), model, fallback)
+        if key not in self._agents:
+            from agents import ModelSettings
+
+            settings = agent.model_settings.resolve(ModelSettings(**route.settings)) if route.settings else agent.model_settings
+            self._agents[key] = agent.clone(model=model or agent.model, model_settings=settings)
+        return self._agents[key]
+
+    def cost(self, model: str, input_tokens: int, output_tokens: int) -> float:
+        """Estimated dollars for one call; models without a configured price cost nothing"""
+        price = self.prices.get(model)
+        if price is None:
+            return 0.0
+        return (input_tokens * price.input + output_tokens * price.output) / 1_000_000
+
+
+def model_name(agent: Agent) -> str:
+    """Printable model of an agent: its model name, or "default" for the SDK's default"""
+    if agent.model is None:
+        return "default"
+    return agent.model if isinstance(agent.model, str) else type(agent.model).__name__
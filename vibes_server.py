@@ -0,0 +1,601 @@
+from __future__ import annotations
+
+import asyncio
+import io
+import json
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+import zipfile
+from collections import OrderedDict
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Literal, Optional, Tuple
+
+import vibes_coding
+from vibes_coding import PipelineOptions, PipelineResult
+
+"""
+Vibes Coding - Pipeline Server
+
+Runs the pipeline as a long-lived local service instead of one process per
+spec. Clients submit specs over a small HTTP API and get a job ID back; a
+fixed pool of workers takes jobs off a bounded queue and runs them in the same
+process, so the SDK import, the agents, the model client's connections, the
+response cache and the shared rate limiter all stay warm between jobs.
+
+    POST   /jobs                 submit a spec (text/plain, or JSON {"spec": ..., "name": ...})
+    GET    /jobs                 every job the server remembers
+    GET    /jobs/<id>            status, timings and result of one job
+    GET    /jobs/<id>/events     server-sent events: status changes and log lines until the job ends
+    GET    /jobs/<id>/log        the job's console output
+    GET    /jobs/<id>/archive    the generated project as a zip file
+    DELETE /jobs/<id>            cancel a queued or running job
+    GET    /health               queue depth, latency percentiles and worker utilization as JSON
+    GET    /metrics              the same in Prometheus text format
+
+Usage:
+    python vibes_server.py --port 8765 --workers 4
+    python vibes_server.py --fake-model        # offline, against the benchmark's fake model
+    curl --data-binary @snake_vibe.txt http://127.0.0.1:8765/jobs
+
+The server binds to localhost by default and has no authentication.
+"""
+
+JobStatus = Literal["queued", "running", "success", "rejected", "error", "cancelled"]
+FINISHED: Tuple[str, ...] = ("success", "rejected", "error", "cancelled")
+
+MAX_BODY_BYTES = 1024 * 1024  # Largest spec a client may submit
+JOB_HISTORY = 1000  # Finished jobs kept in memory; their files stay in the jobs directory
+HTTP_REASONS = {
+    200: "OK", 202: "Accepted", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+    409: "Conflict", 413: "Payload Too Large", 500: "Internal Server Error", 503: "Service Unavailable",
+}
+
+
+@dataclass
+class Job:
+    id: str
+    name: str
+    spec_path: str
+    status: JobStatus = "queued"
+    submitted_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    worker: Optional[int] = None
+    message: str = ""
+    project_dir: Optional[str] = None
+    result: Optional[PipelineResult] = None
+    log: List[str] = field(default_factory=list)  # Complete console lines
+    _partial: str = field(default="", repr=False)
+    _changed: asyncio.Event = field(default_factory=asyncio.Event, repr=False)
+    _task: Optional[asyncio.Task] = field(default=None, repr=False)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED
+
+    @property
+    def queue_wait(self) -> Optional[float]:
+        end = self.started_at or self.finished_at
+        return end - self.submitted_at if end is not None else None
+
+    @property
+    def run_time(self) -> Optional[float]:
+        if self.started_at is None or self.finished_at is None:
+            return None
+        return self.finished_at - self.started_at
+
+    @property
+    def latency(self) -> Optional[float]:
+        """Submission to completion"""
+        return self.finished_at - self.submitted_at if self.finished_at is not None else None
+
+    def write(self, text: str) -> None:
+        lines = (self._partial + text).split("\n")
+        self._partial = lines.pop()
+        if lines:
+            self.log.extend(lines)
+            self.notify()
+
+    def notify(self) -> None:
+        """Wake everyone streaming this job's events"""
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def wait_changed(self) -> None:
+        await self._changed.wait()
+
+    def to_dict(self) -> Dict[str, Any]:
+        data: Dict[str, Any] = {
+            "id": self.id,
+            "name": self.name,
+            "status": self.status,
+            "message": self.message,
+            "worker": self.worker,
+            "submitted_at": self.submitted_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "queue_wait": self.queue_wait,
+            "run_time": self.run_time,
+            "latency": self.latency,
+            "log_lines": len(self.log),
+        }
+        metrics = self.result.metrics if self.result is not None else None
+        if metrics is not None:
+            data["input_tokens"] = sum(p.input_tokens for p in metrics.phases)
+            data["output_tokens"] = sum(p.output_tokens for p in metrics.phases)
+            data["cost"] = sum(a.cost for a in metrics.agents.values())
+            data["critical_path"] = list(metrics.critical_path)
+        if self.status == "success":
+            data["archive"] = f"/jobs/{self.id}/archive"
+        return data
+
+
+# The job whose pipeline is running in the current task; its console output goes to the job's log
+current_job: ContextVar[Optional[Job]] = ContextVar("vibes_current_job", default=None)
+
+
+class JobOutput(io.TextIOBase):
+    """Stand-in for sys.stdout that sends each job's prints to its own log"""
+
+    def __init__(self, console: Any, loop: asyncio.AbstractEventLoop):
+        self.console = console
+        self.loop = loop
+        self.loop_thread = threading.current_thread()
+
+    def write(self, text: str) -> int:
+        job = current_job.get()
+        if job is None:
+            return self.console.write(text)
+        if threading.current_thread() is self.loop_thread:
+            job.write(text)
+        else:
+            self.loop.call_soon_threadsafe(job.write, text)
+        return len(text)
+
+    def flush(self) -> None:
+        self.console.flush()
+
+
+@dataclass
+class WorkerStats:
+    jobs: int = 0
+    busy_seconds: float = 0.0
+    busy_since: Optional[float] = None  # perf_counter of the job in progress
+
+    def busy(self, now: float) -> float:
+        return self.busy_seconds + (now - self.busy_since if self.busy_since is not None else 0.0)
+
+
+class QueueFull(Exception):
+    """The job queue is at its limit"""
+
+
+def _percentile(values: List[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def _safe_name(name: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_-]+", "_", name).strip("_")[:64] or "spec"
+
+
+def archive_project(project_dir: str) -> bytes:
+    """Zip a generated project, with every path under the project directory's name"""
+    buffer = io.BytesIO()
+    root = os.path.basename(os.path.normpath(project_dir))
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        for dirpath, dirnames, filenames in os.walk(project_dir):
+            dirnames.sort()
+            for filename in sorted(filenames):
+                path = os.path.join(dirpath, filename)
+                archive.write(path, os.path.join(root, os.path.relpath(path, project_dir)))
+    return buffer.getvalue()
+
+
+class PipelineServer:
+    """A bounded job queue served by a fixed pool of pipeline workers"""
+
+    def __init__(
+        self,
+        jobs_dir: str = "vibes_jobs",
+        workers: int = 4,
+        options: Optional[PipelineOptions] = None,
+        max_queue: int = 100,
+    ):
+        self.jobs_dir = jobs_dir
+        self.worker_count = max(1, workers)
+        self.options = options or PipelineOptions()
+        self.queue: asyncio.Queue[Job] = asyncio.Queue(maxsize=max_queue)
+        self.jobs: OrderedDict[str, Job] = OrderedDict()
+        self.workers = [WorkerStats() for _ in range(self.worker_count)]
+        self.started = time.perf_counter()
+        self._tasks: List[asyncio.Task] = []
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._console = None
+        self._stopping = False  # Set by stop(), so a cancelled worker can tell shutdown from a cancelled job
+
+    # Job queue
+
+    async def start(self) -> None:
+        """Warm up the agents and the runtime, then start the workers"""
+        os.makedirs(self.jobs_dir, exist_ok=True)
+        vibes_coding.build_agents()
+        vibes_coding.ensure_runtime()
+        self._console = sys.stdout
+        sys.stdout = JobOutput(self._console, asyncio.get_running_loop())
+        self.started = time.perf_counter()
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.worker_count)]
+
+    async def stop(self) -> None:
+        self._stopping = True
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        for job in self.jobs.values():
+            if job._task is not None:
+                job._task.cancel()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, *(j._task for j in self.jobs.values() if j._task), return_exceptions=True)
+        for job in self.jobs.values():
+            if not job.finished:
+                self._finish(job, "cancelled", "Server stopped")
+        if self._console is not None:
+            sys.stdout = self._console
+
+    def submit(self, spec: str, name: str = "spec") -> Job:
+        if self.queue.full():
+            raise QueueFull(f"Job queue is full ({self.queue.maxsize} jobs waiting)")
+        job_id = uuid.uuid4().hex[:12]
+        name = _safe_name(name)
+        job_dir = os.path.join(self.jobs_dir, job_id)
+        os.makedirs(job_dir)
+        spec_path = os.path.join(job_dir, f"{name}.txt")
+        with open(spec_path, "w") as f:
+            f.write(spec)
+        job = Job(id=job_id, name=name, spec_path=spec_path)
+        self.jobs[job_id] = job
+        self.queue.put_nowait(job)
+        self._forget_old_jobs()
+        return job
+
+    def cancel(self, job: Job) -> None:
+        if job.finished:
+            return
+        if job._task is not None:
+            job._task.cancel()  # The worker records the cancellation
+            return
+        # Still queued: the worker that takes it off the queue skips it
+        self._finish(job, "cancelled", "Cancelled before it started")
+
+    def _forget_old_jobs(self) -> None:
+        finished = [job_id for job_id, job in self.jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(finished) - JOB_HISTORY)]:
+            del self.jobs[job_id]
+
+    def _finish(self, job: Job, status: str, message: str, result: Optional[PipelineResult] = None) -> None:
+        job.status = status
+        job.message = message
+        job.result = result
+        job.project_dir = result.project_dir if result is not None else None
+        job.finished_at = time.time()
+        if job._partial:
+            job.log.append(job._partial)
+            job._partial = ""
+        job.notify()
+
+    async def _run_job(self, job: Job) -> PipelineResult:
+        current_job.set(job)
+        return await vibes_coding.run_vibes_pipeline(job.spec_path, self.options)
+
+    async def _worker(self, index: int) -> None:
+        stats = self.workers[index]
+        while True:
+            job = await self.queue.get()
+            try:
+                if job.finished:
+                    continue
+                job.status = "running"
+                job.worker = index
+                job.started_at = time.time()
+                job.notify()
+                stats.busy_since = time.perf_counter()
+                job._task = asyncio.create_task(self._run_job(job))
+                try:
+                    result = await job._task
+                except asyncio.CancelledError:
+                    if self._stopping:
+                        raise  # The worker itself is being stopped, not just this job
+                    self._finish(job, "cancelled", "Cancelled while running")
+                except Exception as e:
+                    # A failing job must not take its worker down
+                    self._finish(job, "error", f"{type(e).__name__}: {e}")
+                else:
+                    self._finish(job, result.status, result.message, result)
+                finally:
+                    job._task = None
+                    stats.jobs += 1
+                    stats.busy_seconds += time.perf_counter() - stats.busy_since
+                    stats.busy_since = None
+            finally:
+                self.queue.task_done()
+
+    # Statistics
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.perf_counter()
+        uptime = max(now - self.started, 1e-9)
+        finished = [job for job in self.jobs.values() if job.finished and job.started_at is not None]
+        by_status: Dict[str, int] = {}
+        for job in self.jobs.values():
+            by_status[job.status] = by_status.get(job.status, 0) + 1
+        waits = [job.queue_wait for job in finished]
+        latencies = [job.latency for job in finished]
+        return {
+            "uptime": uptime,
+            "queue_depth": self.queue.qsize(),
+            "queue_limit": self.queue.maxsize,
+            "jobs": by_status,
+            "busy_workers": sum(1 for w in self.workers if w.busy_since is not None),
+            "workers": [
+                {"jobs": w.jobs, "busy_seconds": w.busy(now), "utilization": w.busy(now) / uptime}
+                for w in self.workers
+            ],
+            "utilization": sum(w.busy(now) for w in self.workers) / (uptime * self.worker_count),
+            "queue_wait": {"p50": _percentile(waits, 0.5), "p95": _percentile(waits, 0.95)},
+            "latency": {"p50": _percentile(latencies, 0.5), "p95": _percentile(latencies, 0.95)},
+            "response_cache": vibes_coding.response_cache.summary(),
+            "rate_limiter": vibes_coding.rate_limiter.summary(),
+        }
+
+    def prometheus(self) -> str:
+        s = self.stats()
+        finished = [job for job in self.jobs.values() if job.finished and job.started_at is not None]
+        lines = [
+            "# HELP vibes_server_queue_depth Jobs waiting for a worker",
+            "# TYPE vibes_server_queue_depth gauge",
+            f"vibes_server_queue_depth {s['queue_depth']}",
+            "# HELP vibes_server_busy_workers Workers running a job",
+            "# TYPE vibes_server_busy_workers gauge",
+            f"vibes_server_busy_workers {s['busy_workers']}",
+            "# HELP vibes_server_jobs Jobs the server remembers, by status",
+            "# TYPE vibes_server_jobs gauge",
+        ]
+        lines += [f'vibes_server_jobs{{status="{status}"}} {count}' for status, count in sorted(s["jobs"].items())]
+        lines += [
+            "# HELP vibes_server_worker_utilization Fraction of the uptime each worker spent running jobs",
+            "# TYPE vibes_server_worker_utilization gauge",
+        ]
+        lines += [f'vibes_server_worker_utilization{{worker="{i}"}} {w["utilization"]:.6f}' for i, w in enumerate(s["workers"])]
+        for name, values, help_text in (
+            ("vibes_server_job_queue_wait_seconds", [job.queue_wait for job in finished], "Time jobs waited for a worker"),
+            ("vibes_server_job_latency_seconds", [job.latency for job in finished], "Time from submission to completion"),
+        ):
+            lines += [
+                f"# HELP {name} {help_text}",
+                f"# TYPE {name} summary",
+                f'{name}{{quantile="0.5"}} {_percentile(values, 0.5):.6f}',
+                f'{name}{{quantile="0.95"}} {_percentile(values, 0.95):.6f}',
+                f"{name}_sum {sum(values):.6f}",
+                f"{name}_count {len(values)}",
+            ]
+        return "\n".join(lines) + "\n"
+
+    # HTTP API
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 8765) -> Tuple[str, int]:
+        """Start listening; returns the bound address (port 0 picks a free port)"""
+        self._server = await asyncio.start_server(self._handle, host, port)
+        return self._server.sockets[0].getsockname()[:2]
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            try:
+                method, path, headers, body = await _read_request(reader)
+            except ValueError as e:
+                status = 413 if "too large" in str(e) else 400
+                await _respond(writer, status, {"error": str(e)})
+                return
+            except (asyncio.IncompleteReadError, ConnectionError):
+                return
+            try:
+                await self._route(method, path, headers, body, writer)
+            except Exception as e:
+                await _respond(writer, 500, {"error": f"{type(e).__name__}: {e}"})
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _route(self, method: str, path: str, headers: Dict[str, str], body: bytes,
+                     writer: asyncio.StreamWriter) -> None:
+        parts = [part for part in path.split("?", 1)[0].split("/") if part]
+        if parts == ["health"] and method == "GET":
+            return await _respond(writer, 200, self.stats())
+        if parts == ["metrics"] and method == "GET":
+            return await _respond(writer, 200, self.prometheus(), "text/plain; version=0.0.4")
+        if parts == ["jobs"]:
+            if method == "GET":
+                return await _respond(writer, 200, [job.to_dict() for job in self.jobs.values()])
+            if method == "POST":
+                return await self._submit(headers, body, writer)
+            return await _respond(writer, 405, {"error": f"{method} not allowed"})
+        if len(parts) < 2 or parts[0] != "jobs":
+            return await _respond(writer, 404, {"error": f"No route for {path}"})
+
+        job = self.jobs.get(parts[1])
+        if job is None:
+            return await _respond(writer, 404, {"error": f"No job {parts[1]}"})
+        action = parts[2] if len(parts) > 2 else None
+        if action is None and method == "GET":
+            return await _respond(writer, 200, job.to_dict())
+        if action is None and method == "DELETE":
+            self.cancel(job)
+            return await _respond(writer, 200, job.to_dict())
+        if method != "GET":
+            return await _respond(writer, 405, {"error": f"{method} not allowed"})
+        if action == "log":
+            return await _respond(writer, 200, "\n".join(job.log) + "\n", "text/plain; charset=utf-8")
+        if action == "events":
+            return await self._stream_events(job, writer)
+        if action == "archive":
+            if job.status != "success" or not job.project_dir or not os.path.isdir(job.project_dir):
+                return await _respond(writer, 409, {"error": f"Job {job.id} has no project ({job.status})"})
+            data = await asyncio.to_thread(archive_project, job.project_dir)
+            return await _respond(writer, 200, data, "application/zip", {
+                "Content-Disposition": f'attachment; filename="{job.name}_project.zip"',
+            })
+        return await _respond(writer, 404, {"error": f"No route for {path}"})
+
+    async def _submit(self, headers: Dict[str, str], body: bytes, writer: asyncio.StreamWriter) -> None:
+        name = "spec"
+        text = body.decode("utf-8", errors="replace")
+        if headers.get("content-type", "").startswith("application/json"):
+            try:
+                data = json.loads(text)
+                text, name = data["spec"], data.get("name", name)
+            except (ValueError, KeyError, TypeError):
+                return await _respond(writer, 400, {"error": 'Expected JSON {"spec": "...", "name": "..."}'})
+        if not text.strip():
+            return await _respond(writer, 400, {"error": "Empty spec"})
+        try:
+            job = self.submit(text, name)
+        except QueueFull as e:
+            return await _respond(writer, 503, {"error": str(e)}, extra_headers={"Retry-After": "5"})
+        await _respond(writer, 202, {**job.to_dict(), "queue_position": self.queue.qsize()})
+
+    async def _stream_events(self, job: Job, writer: asyncio.StreamWriter) -> None:
+        """Server-sent events: the current status, then every change and log line until the job ends"""
+        writer.write(
+            b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nCache-Control: no-cache\r\nConnection: close\r\n\r\n"
+        )
+        sent_lines = 0
+        sent_status = None
+        while True:
+            if job.status != sent_status:
+                sent_status = job.status
+                writer.write(_event("status", job.to_dict()))
+            for line in job.log[sent_lines:]:
+                writer.write(_event("log", line))
+            sent_lines = len(job.log)
+            await writer.drain()
+            if job.finished:
+                return
+            await job.wait_changed()
+
+
+def _event(kind: str, data: Any) -> bytes:
+    payload = data if isinstance(data, str) else json.dumps(data)
+    text = f"event: {kind}\n" + "".join(f"data: {line}\n" for line in payload.split("\n")) + "\n"
+    return text.encode("utf-8")
+
+
+async def _read_request(reader: asyncio.StreamReader) -> Tuple[str, str, Dict[str, str], bytes]:
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    try:
+        method, path, _ = lines[0].split(" ", 2)
+    except ValueError:
+        raise ValueError(f"Malformed request line: {lines[0]!r}") from None
+    headers = {}
+    for line in lines[1:]:
+        if ":" in line:
+            key, value = line.split(":", 1)
+            headers[key.strip().lower()] = value.strip()
+    length = int(headers.get("content-length", "0") or 0)
+    if length > MAX_BODY_BYTES:
+        raise ValueError(f"Request body too large ({length} bytes, limit {MAX_BODY_BYTES})")
+    body = await reader.readexactly(length) if length else b""
+    return method.upper(), path, headers, body
+
+
+async def _respond(
+    writer: asyncio.StreamWriter,
+    status: int,
+    body: Any,
+    content_type: str = "application/json",
+    extra_headers: Optional[Dict[str, str]] = None,
+) -> None:
+    if isinstance(body, bytes):
+        payload = body
+    elif isinstance(body, str):
+        payload = body.encode("utf-8")
+    else:
+        payload = json.dumps(body, indent=2).encode("utf-8")
+    headers = {"Content-Type": content_type, "Content-Length": str(len(payload)), "Connection": "close"}
+    headers.update(extra_headers or {})
+    head = f"HTTP/1.1 {status} {HTTP_REASONS.get(status, 'Unknown')}\r\n"
+    head += "".join(f"{key}: {value}\r\n" for key, value in headers.items()) + "\r\n"
+    writer.write(head.encode("latin-1") + payload)
+    await writer.drain()
+
+
+async def http_request(
+    host: str, port: int, method: str, path: str, body: bytes = b"", content_type: str = "text/plain",
+) -> Tuple[int, Dict[str, str], bytes]:
+    """Minimal HTTP client for the server's API; returns (status, headers, body)"""
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        writer.write(
+            f"{method} {path} HTTP/1.1\r\nHost: {host}:{port}\r\nContent-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode("latin-1") + body
+        )
+        await writer.drain()
+        response = await reader.read()
+    finally:
+        writer.close()
+    head, _, payload = response.partition(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    headers = {}
+    for line in lines[1:]:
+        key, _, value = line.partition(":")
+        headers[key.strip().lower()] = value.strip()
+    return int(lines[0].split(" ", 2)[1]), headers, payload
+
+
+def use_fake_model(latency: float) -> None:
+    """Serve every agent from the offline fake model used by the benchmark"""
+    from vibes_benchmark import default_responses
+    from vibes_fake_model import FakeModel, FakeModelProvider
+
+    vibes_coding.use_model_provider(FakeModelProvider(FakeModel(default_responses(latency))))
+
+
+async def serve_forever(args) -> None:
+    options = vibes_coding.configure(args)
+    if args.fake_model:
+        use_fake_model(args.fake_latency)
+    server = PipelineServer(args.jobs_dir, args.workers, options, args.max_queue)
+    await server.start()
+    host, port = await server.serve(args.host, args.port)
+    print(f"🌐 Vibes Coding server on http://{host}:{port} with {args.workers} workers (jobs in {args.jobs_dir})")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.stop()
+
+
+def parse_args(argv: Optional[List[str]] = None):
+    parser = vibes_coding.build_parser("Vibes Coding - pipeline server")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on")
+    parser.add_argument("--port", type=int, default=8765, help="Port to listen on")
+    parser.add_argument("--workers", type=int, default=4, help="Pipelines run at once")
+    parser.add_argument("--max-queue", type=int, default=100, help="Jobs that may wait for a worker")
+    parser.add_argument("--jobs-dir", default="vibes_jobs", help="Directory for job specs and generated projects")
+    parser.add_argument("--fake-model", action="store_true", help="Answer every agent call with the offline fake model")
+    parser.add_argument("--fake-latency", type=float, default=0.05, help="Simulated seconds per fake model call")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(serve_forever(parse_args()))
+    except KeyboardInterrupt:
+        pass
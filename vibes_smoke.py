@@ -0,0 +1,500 @@
+from __future__ import annotations
+
+import ast
+import asyncio
+import json
+import os
+import re
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Literal, Optional, Tuple
+
+from vibes_writer import safe_join
+
+"""
+Vibes Coding - Smoke Tests
+
+Runs the generated project before it is accepted. The files of a code attempt
+are written to a throwaway scratch directory and checked by parallel
+subprocesses, each with a timeout and resource limits (address space, CPU
+time, file size) set by a small wrapper before it starts the check:
+
+- compile: byte-compile every Python file
+- import: import every module, which catches import-time crashes such as a
+  client that needs a live server
+- main: run every script with an `if __name__ == "__main__":` block for a few
+  seconds with headless SDL/matplotlib drivers; a script that is still running
+  when the time is up counts as started
+- tests: run the project's own tests with pytest (or unittest)
+- flask: create each Flask app and request its parameterless GET routes with
+  the test client
+
+The subprocesses get a clean environment (no API keys, no PYTHONPATH) and
+run in the scratch directory, which is also their home and temp directory.
+Where unprivileged network namespaces are available (`unshare -rn` on Linux)
+they have no network access either. This is isolation against accidents, not
+a security sandbox: the generated code still runs as the current user and can
+read and write that user's files. Failures are reported with the
+project file and line they point at, so they can go straight back into code
+refinement. An import of a declared dependency that the smoke-test
+environment does not have is skipped rather than failed; an import of an
+undeclared third-party module is a failure.
+"""
+
+CheckKind = Literal["compile", "import", "main", "tests", "flask"]
+CheckStatus = Literal["pass", "fail", "skip", "timeout"]
+
+# Distribution names whose import name differs from the normalized distribution name
+IMPORT_NAMES = {
+    "python-dotenv": "dotenv",
+    "pyyaml": "yaml",
+    "beautifulsoup4": "bs4",
+    "pillow": "PIL",
+    "scikit-learn": "sklearn",
+    "opencv-python": "cv2",
+    "opencv-python-headless": "cv2",
+    "psycopg2-binary": "psycopg2",
+    "pyjwt": "jwt",
+    "python-dateutil": "dateutil",
+    "typing-extensions": "typing_extensions",
+    "pymysql": "pymysql",
+    "mysql-connector-python": "mysql",
+    "protobuf": "google",
+}
+
+# Headless settings for GUI and plotting libraries, so scripts can start without a display
+HEADLESS_ENV = {"SDL_VIDEODRIVER": "dummy", "SDL_AUDIODRIVER": "dummy", "MPLBACKEND": "Agg", "QT_QPA_PLATFORM": "offscreen"}
+
+MAX_OUTPUT = 4000  # Characters of a failing check's output kept for the report
+MAX_ROUTES = 20  # Routes requested per Flask app
+
+_FRAME = re.compile(r'^\s*File "([^"]+)", line (\d+)', re.MULTILINE)
+_MISSING_MODULE = re.compile(r"No module named '([^']+)'")
+
+_COMPILE_SCRIPT = """
+import json, py_compile, sys
+errors = []
+for path in sys.argv[1:]:
+    try:
+        py_compile.compile(path, doraise=True)
+    except py_compile.PyCompileError as e:
+        error = e.exc_value
+        errors.append({"path": path, "line": getattr(error, "lineno", None), "message": f"{e.exc_type_name}: {getattr(error, 'msg', error)}"})
+print(json.dumps(errors))
+"""
+
+# Applies the resource limits and then replaces itself with the check; a wrapper instead of a
+# preexec_fn, which is not safe in a process that runs threads (such as the pipeline server)
+_LIMITS_SCRIPT = """
+import os, sys
+try:
+    import resource
+except ImportError:
+    resource = None
+if resource is not None:
+    for name, value in zip(("RLIMIT_AS", "RLIMIT_CPU", "RLIMIT_FSIZE"), map(int, sys.argv[1:4])):
+        try:
+            resource.setrlimit(getattr(resource, name), (value, value))
+        except (AttributeError, ValueError, OSError):
+            pass
+os.execv(sys.executable, [sys.executable, *sys.argv[4:]])
+"""
+
+_IMPORT_SCRIPT = """
+import importlib, sys
+sys.path[:0] = sys.argv[2:]
+importlib.import_module(sys.argv[1])
+"""
+
+_FLASK_SCRIPT = """
+import importlib, json, sys
+sys.path[:0] = sys.argv[3:]
+module = importlib.import_module(sys.argv[1])
+app = getattr(module, sys.argv[2])
+if not hasattr(app, "test_client"):
+    app = app()  # An application factory such as create_app
+app.config["TESTING"] = True
+results = []
+with app.test_client() as client:
+    for rule in list(app.url_map.iter_rules())[:%d]:
+        if "GET" not in rule.methods or rule.arguments or rule.endpoint == "static":
+            continue
+        response = client.get(rule.rule)
+        results.append({"route": rule.rule, "status": response.status_code})
+print(json.dumps(results))
+""" % MAX_ROUTES
+
+
+@dataclass
+class CheckResult:
+    kind: CheckKind
+    target: str  # Module, script or route the check ran
+    status: CheckStatus
+    duration: float = 0.0
+    message: str = ""
+    path: Optional[str] = None  # Project file the failure points at
+    line: Optional[int] = None
+    output: str = ""  # Tail of the subprocess output of a failure
+
+    def __str__(self) -> str:
+        location = f" ({self.path}:{self.line})" if self.path and self.line else f" ({self.path})" if self.path else ""
+        return f"{self.kind} {self.target}: {self.message}{location}"
+
+
+@dataclass
+class SmokeReport:
+    results: List[CheckResult] = field(default_factory=list)
+    duration: float = 0.0
+    network_isolated: bool = False
+
+    @property
+    def failures(self) -> List[CheckResult]:
+        return [r for r in self.results if r.status in ("fail", "timeout")]
+
+    def count(self, status: str) -> int:
+        return sum(1 for r in self.results if r.status == status)
+
+    def failures_by_file(self) -> Dict[str, List[CheckResult]]:
+        grouped: Dict[str, List[CheckResult]] = {}
+        for failure in self.failures:
+            if failure.path:
+                grouped.setdefault(failure.path, []).append(failure)
+        return grouped
+
+    def summary(self) -> str:
+        return (
+            f"{len(self.results)} checks: {self.count('pass')} passed, {len(self.failures)} failed, "
+            f"{self.count('skip')} skipped in {self.duration:.1f}s"
+            + ("" if self.network_isolated else " (network not isolated)")
+        )
+
+    def feedback(self) -> str:
+        """Deterministic report for the code generator"""
+        lines = [f"Running the generated project failed {len(self.failures)} smoke test(s):"]
+        # Checks that failed at the same place for the same reason (e.g. every import of a broken package) are listed once
+        grouped: Dict[Tuple, List[CheckResult]] = {}
+        for failure in self.failures:
+            grouped.setdefault((failure.message, failure.path, failure.line), []).append(failure)
+        for group in grouped.values():
+            first = group[0]
+            lines.append(f"- {first}")
+            if len(group) > 1:
+                lines.append(f"  also: {', '.join(f'{f.kind} {f.target}' for f in group[1:])}")
+            if first.output:
+                lines.append("  " + "\n  ".join(first.output.strip().splitlines()[-8:]))
+        lines.append("Fix these problems so the project imports, starts and passes its tests without external services.")
+        return "\n".join(lines)
+
+
+def import_name(requirement: str) -> str:
+    """Top-level module a requirement line provides, e.g. "python-dotenv>=1.0" -> "dotenv" """
+    name = re.split(r"[<>=!~\[;@\s]", requirement.strip(), maxsplit=1)[0].lower()
+    return IMPORT_NAMES.get(name, name.replace("-", "_").replace(".", "_"))
+
+
+def _source_root(path: str, packages: set) -> str:
+    """Directory a file's imports are relative to: the first ancestor that is not a package"""
+    directory = os.path.dirname(path)
+    while directory and directory in packages:
+        directory = os.path.dirname(directory)
+    return directory
+
+
+@dataclass
+class _Module:
+    path: str  # Relative to the scratch directory
+    name: str
+    root: str  # Source root, relative to the scratch directory
+    tree: Optional[ast.Module]
+
+    @property
+    def has_main(self) -> bool:
+        return self.tree is not None and any(
+            isinstance(node, ast.If) and "__main__" in ast.unparse(node.test) for node in self.tree.body
+        )
+
+    def imports(self, top_level: str) -> bool:
+        if self.tree is None:
+            return False
+        for node in ast.walk(self.tree):
+            if isinstance(node, ast.Import) and any(a.name.split(".")[0] == top_level for a in node.names):
+                return True
+            if isinstance(node, ast.ImportFrom) and node.level == 0 and (node.module or "").split(".")[0] == top_level:
+                return True
+        return False
+
+    def flask_apps(self) -> List[str]:
+        """Module-level Flask() objects and create_app factories"""
+        if self.tree is None:
+            return []
+        apps = []
+        for node in self.tree.body:
+            if isinstance(node, ast.Assign) and isinstance(node.value, ast.Call) and ast.unparse(node.value.func).endswith("Flask"):
+                apps.extend(t.id for t in node.targets if isinstance(t, ast.Name))
+            elif isinstance(node, ast.FunctionDef) and node.name == "create_app":
+                apps.append(node.name)
+        return apps
+
+
+class SmokeRunner:
+    """Runs the smoke checks of a generated project in parallel, isolated subprocesses"""
+
+    def __init__(
+        self,
+        timeout: float = 20.0,
+        main_timeout: float = 3.0,
+        test_timeout: float = 120.0,
+        concurrency: int = 0,
+        memory_mb: int = 2048,
+        python: Optional[str] = None,
+        network: bool = False,
+    ):
+        self.timeout = timeout  # Per compile, import and Flask check
+        self.main_timeout = main_timeout  # A script still running after this long counts as started
+        self.test_timeout = test_timeout
+        self.concurrency = concurrency or min(8, os.cpu_count() or 2)
+        self.memory_mb = memory_mb
+        self.python = python or sys.executable
+        self.network = network  # Allow network access instead of isolating it where possible
+        self._unshare: Optional[str] = None  # unshare binary, once it has been shown to work here
+        self._probed = False
+
+    @classmethod
+    def from_env(cls) -> "SmokeRunner":
+        """Build a runner from VIBES_SMOKE_* environment variables"""
+        return cls(
+            timeout=float(os.getenv("VIBES_SMOKE_TIMEOUT", "20")),
+            main_timeout=float(os.getenv("VIBES_SMOKE_MAIN_TIMEOUT", "3")),
+            test_timeout=float(os.getenv("VIBES_SMOKE_TEST_TIMEOUT", "120")),
+            concurrency=int(os.getenv("VIBES_SMOKE_CONCURRENCY", "0")),
+            memory_mb=int(os.getenv("VIBES_SMOKE_MEMORY_MB", "2048")),
+            python=os.getenv("VIBES_SMOKE_PYTHON") or None,
+            network=os.getenv("VIBES_SMOKE_NETWORK", "").lower() in ("1", "true", "yes"),
+        )
+
+    @property
+    def isolates_network(self) -> bool:
+        """Whether checks run without network access (probed once: needs unprivileged user namespaces)"""
+        if self.network:
+            return False
+        if not self._probed:
+            self._probed = True
+            unshare = shutil.which("unshare")
+            if unshare is not None:
+                try:
+                    works = subprocess.run(
+                        [unshare, "-rn", "true"], stdin=subprocess.DEVNULL,
+                        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=5,
+                    ).returncode == 0
+                except (OSError, subprocess.SubprocessError):
+                    works = False
+                self._unshare = unshare if works else None
+        return self._unshare is not None
+
+    def _command(self, python: str, args: List[str], cpu_seconds: float) -> List[str]:
+        limits = [str(self.memory_mb * 1024 * 1024), str(int(cpu_seconds) + 1), str(64 * 1024 * 1024)]
+        command = [python, "-c", _LIMITS_SCRIPT, *limits, "-s", *args]
+        return [self._unshare, "-rn", *command] if self.isolates_network else command
+
+    async def _exec(
+        self, args: List[str], cwd: str, env: Dict[str, str], timeout: float, semaphore: asyncio.Semaphore, python: str,
+    ) -> Tuple[Optional[int], str, str, float]:
+        """Run python with args; returns (exit code or None on timeout, stdout, stderr, seconds)"""
+        async with semaphore:
+            started = time.perf_counter()
+            process = await asyncio.create_subprocess_exec(
+                *self._command(python, args, timeout),
+                cwd=cwd,
+                env=env,
+                stdin=asyncio.subprocess.DEVNULL,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                start_new_session=True,  # Lets a timeout kill the whole process group
+            )
+            try:
+                stdout, stderr = await asyncio.wait_for(process.communicate(), timeout)
+                code = process.returncode
+            except asyncio.TimeoutError:
+                stdout, stderr, code = b"", b"", None
+            finally:
+                if process.returncode is None:
+                    try:
+                        os.killpg(process.pid, signal.SIGKILL)
+                    except (ProcessLookupError, PermissionError):
+                        process.kill()
+                    await process.wait()
+            return code, stdout.decode("utf-8", "replace"), stderr.decode("utf-8", "replace"), time.perf_counter() - started
+
+    async def run(
+        self, files: List[Any], dependencies: Optional[List[str]] = None, python: Optional[str] = None,
+    ) -> SmokeReport:
+        """Write the files (FileStructure objects) to a scratch directory and run every applicable check on them
+
+        python overrides the runner's interpreter, e.g. with one from an environment holding the dependencies.
+        """
+        started = time.perf_counter()
+        scratch = tempfile.mkdtemp(prefix="vibes-smoke-")
+        try:
+            results = await self._run_in(scratch, files, dependencies or [], python or self.python)
+        finally:
+            shutil.rmtree(scratch, ignore_errors=True)
+        order = {"compile": 0, "import": 1, "flask": 2, "main": 3, "tests": 4}
+        results.sort(key=lambda r: (order[r.kind], r.target))
+        return SmokeReport(results=results, duration=time.perf_counter() - started, network_isolated=self.isolates_network)
+
+    async def _run_in(self, scratch: str, files: List[Any], dependencies: List[str], python: str) -> List[CheckResult]:
+        for file in files:
+            target = safe_join(scratch, file.path)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with open(target, "w") as f:
+                f.write(file.content)
+
+        python_paths = sorted(file.path for file in files if file.path.endswith(".py"))
+        packages = {os.path.dirname(path) for path in python_paths if os.path.basename(path) == "__init__.py"}
+        modules = []
+        for path in python_paths:
+            root = _source_root(path, packages)
+            relative = os.path.relpath(path, root or ".")[:-3].replace(os.sep, ".")
+            name = relative[:-len(".__init__")] if relative.endswith(".__init__") else relative
+            if name == "__init__" or not all(part.isidentifier() for part in name.split(".")):
+                continue
+            with open(safe_join(scratch, path)) as f:
+                try:
+                    tree = ast.parse(f.read(), filename=path)
+                except SyntaxError:
+                    tree = None
+            modules.append(_Module(path=path, name=name, root=root, tree=tree))
+
+        roots = sorted({m.root for m in modules})
+        search_path = [os.path.join(scratch, root) if root else scratch for root in roots]
+        project_modules = {m.name.split(".")[0] for m in modules}
+        declared = {import_name(dep) for dep in dependencies if dep.strip() and not dep.strip().startswith("#")}
+        env = {
+            "PATH": os.environ.get("PATH", "/usr/bin:/bin"),
+            "HOME": scratch,
+            "TMPDIR": scratch,
+            "LANG": "C.UTF-8",
+            "PYTHONHASHSEED": "0",
+            "PYTHONIOENCODING": "utf-8",
+            **HEADLESS_ENV,
+        }
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        def cwd_of(module: _Module) -> str:
+            return os.path.join(scratch, module.root) if module.root else scratch
+
+        def relative(output: str) -> str:
+            # Sandbox paths are random; the report should only name project files
+            return output.replace(scratch + os.sep, "")
+
+        def failure(kind: CheckKind, target: str, code: Optional[int], stderr: str, seconds: float,
+                    default_path: Optional[str] = None) -> CheckResult:
+            """Classify a failed subprocess and point it at the project file it failed in"""
+            if code is None:
+                return CheckResult(kind, target, "timeout", seconds, f"did not finish within {seconds:.0f}s", default_path)
+            lines = [line for line in stderr.strip().splitlines() if line.strip()]
+            message = lines[-1].strip() if lines else f"exited with status {code}"
+            path, line = default_path, None
+            for frame_path, frame_line in _FRAME.findall(stderr):
+                if frame_path.startswith(scratch + os.sep):
+                    path, line = os.path.relpath(frame_path, scratch), int(frame_line)
+            missing = _MISSING_MODULE.search(message)
+            if missing and message.startswith("ModuleNotFoundError"):
+                top = missing.group(1).split(".")[0]
+                if top in declared and top not in project_modules:
+                    return CheckResult(kind, target, "skip", seconds, f"dependency {top} is not installed in the smoke-test environment")
+                if top not in project_modules:
+                    message = f"{message} (not a project module and not in the dependencies)"
+            return CheckResult(kind, target, "fail", seconds, message, path, line, relative(stderr)[-MAX_OUTPUT:])
+
+        async def compile_all() -> List[CheckResult]:
+            if not python_paths:
+                return []
+            code, stdout, stderr, seconds = await self._exec(
+                ["-c", _COMPILE_SCRIPT, *python_paths], scratch, env, self.timeout, semaphore, python,
+            )
+            if code != 0:
+                return [failure("compile", "project", code, stderr, seconds)]
+            errors = json.loads(stdout or "[]")
+            failed = {error["path"] for error in errors}
+            results = [CheckResult("compile", e["path"], "fail", seconds, e["message"], e["path"], e["line"]) for e in errors]
+            results.extend(CheckResult("compile", path, "pass", seconds) for path in python_paths if path not in failed)
+            return results
+
+        async def import_module(module: _Module) -> CheckResult:
+            code, _, stderr, seconds = await self._exec(
+                ["-c", _IMPORT_SCRIPT, module.name, *search_path], cwd_of(module), env, self.timeout, semaphore, python,
+            )
+            if code == 0:
+                return CheckResult("import", module.name, "pass", seconds)
+            return failure("import", module.name, code, stderr, seconds, module.path)
+
+        async def run_main(module: _Module) -> CheckResult:
+            code, _, stderr, seconds = await self._exec(
+                [os.path.join(scratch, module.path)], cwd_of(module), env, self.main_timeout, semaphore, python,
+            )
+            if code is None:
+                return CheckResult("main", module.path, "pass", seconds, f"still running after {self.main_timeout:g}s")
+            # Interactive programs stop at the closed stdin, which is as far as a smoke test can take them
+            last_line = stderr.strip().splitlines()[-1] if stderr.strip() else ""
+            if code == 0 or last_line.startswith(("EOFError", "KeyboardInterrupt")):
+                return CheckResult("main", module.path, "pass", seconds)
+            return failure("main", module.path, code, stderr, seconds, module.path)
+
+        async def boot_flask(module: _Module, app: str) -> List[CheckResult]:
+            target = f"{module.name}:{app}"
+            code, stdout, stderr, seconds = await self._exec(
+                ["-c", _FLASK_SCRIPT, module.name, app, *search_path], cwd_of(module), env, self.timeout, semaphore, python,
+            )
+            if code != 0:
+                return [failure("flask", target, code, stderr, seconds, module.path)]
+            routes = json.loads(stdout.strip().splitlines()[-1] if stdout.strip() else "[]")
+            results = [
+                CheckResult("flask", f"{target} GET {r['route']}", "pass" if r["status"] < 500 else "fail", seconds,
+                            "" if r["status"] < 500 else f"responded {r['status']}", module.path)
+                for r in routes
+            ]
+            return results or [CheckResult("flask", target, "pass", seconds, "app created, no parameterless GET routes")]
+
+        async def run_tests() -> List[CheckResult]:
+            tests = [m for m in modules if m.path.rsplit("/", 1)[-1].startswith("test_") or m.path.endswith("_test.py")]
+            if not tests:
+                return []
+            root = tests[0].root
+            cwd = os.path.join(scratch, root) if root else scratch
+            uses_pytest = any(m.imports("pytest") for m in tests)
+            probe, _, _, _ = await self._exec(["-c", "import pytest"], cwd, env, self.timeout, semaphore, python)
+            if probe == 0:
+                args = ["-m", "pytest", "-q", "-x", "-p", "no:cacheprovider"]
+            elif uses_pytest:
+                return [CheckResult("tests", "pytest", "skip", 0.0, "pytest is not installed in the smoke-test environment")]
+            else:
+                args = ["-m", "unittest", "discover", "-p", "*test*.py"]
+            env_with_path = {**env, "PYTHONPATH": os.pathsep.join(search_path)}
+            code, stdout, stderr, seconds = await self._exec(args, cwd, env_with_path, self.test_timeout, semaphore, python)
+            if code == 0:
+                return [CheckResult("tests", f"{len(tests)} test file(s)", "pass", seconds)]
+            if code == 5 and probe == 0:  # pytest: no tests collected
+                return [CheckResult("tests", f"{len(tests)} test file(s)", "skip", seconds, "no tests collected")]
+            result = failure("tests", f"{len(tests)} test file(s)", code, stderr or stdout, seconds, tests[0].path)
+            result.output = relative(stdout + stderr)[-MAX_OUTPUT:]
+            return [result]
+
+        jobs = [compile_all(), run_tests()]
+        jobs += [self._one(import_module(m)) for m in modules if m.tree is not None]
+        jobs += [boot_flask(m, app) for m in modules for app in m.flask_apps()]
+        # Flask apps are booted with the test client instead of app.run(), which would block on a port
+        jobs += [self._one(run_main(m)) for m in modules if m.has_main and not m.imports("flask")]
+        results: List[CheckResult] = []
+        for group in await asyncio.gather(*jobs):
+            results.extend(group)
+        return results
+
+    @staticmethod
+    async def _one(check) -> List[CheckResult]:
+        return [await check]
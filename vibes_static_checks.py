@@ -0,0 +1,729 @@
+from __future__ import annotations
+
+import ast
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Literal, Optional, Set, Tuple
+
+"""
+Vibes Coding - Static Pre-checks
+
+A local analysis pass over the generated files that runs before the code
+evaluator. Every Python file is parsed, imports between the generated files
+are resolved, and the calls and attribute accesses whose target can be seen
+(project classes, their instances and project functions) are checked against
+the definitions. Errors produce a deterministic report that goes straight back
+to the code generator, so a plainly broken attempt never pays for an evaluator
+round-trip.
+
+The checks are deliberately conservative: anything whose target is outside the
+generated project, dynamically built, or decorated is skipped.
+"""
+
+# Call targets that take a dotted "module.attr" import string
+IMPORT_STRING_CALLS = ("from_object", "import_string", "import_module")
+
+# Decorators that keep a method's signature predictable
+KNOWN_DECORATORS = ("staticmethod", "classmethod", "property")
+
+
+@dataclass
+class StaticIssue:
+    path: str
+    line: int
+    severity: Literal["error", "warning"]
+    message: str
+
+    def __str__(self) -> str:
+        return f"{self.path}:{self.line}: {self.message}"
+
+
+@dataclass
+class StaticReport:
+    issues: List[StaticIssue] = field(default_factory=list)
+    files_checked: int = 0
+    duration: float = 0.0
+
+    @property
+    def errors(self) -> List[StaticIssue]:
+        return [issue for issue in self.issues if issue.severity == "error"]
+
+    @property
+    def warnings(self) -> List[StaticIssue]:
+        return [issue for issue in self.issues if issue.severity == "warning"]
+
+    def errors_by_file(self) -> Dict[str, List[StaticIssue]]:
+        grouped: Dict[str, List[StaticIssue]] = {}
+        for issue in self.errors:
+            grouped.setdefault(issue.path, []).append(issue)
+        return grouped
+
+    def feedback(self) -> str:
+        """Deterministic report for the code generator"""
+        lines = [f"Static analysis found {len(self.errors)} error(s) in the generated files:"]
+        lines.extend(f"- {issue}" for issue in self.errors)
+        if self.warnings:
+            lines.append("Warnings:")
+            lines.extend(f"- {issue}" for issue in self.warnings)
+        lines.append("Fix these problems and return the complete corrected project.")
+        return "\n".join(lines)
+
+
+@dataclass
+class Signature:
+    params: List[str]  # Positional-or-keyword parameters, in order
+    defaults: int  # How many trailing params have defaults
+    vararg: bool
+    kwonly: List[str]
+    kwonly_required: List[str]
+    kwarg: bool
+
+    @classmethod
+    def from_args(cls, args: ast.arguments) -> "Signature":
+        return cls(
+            params=[a.arg for a in args.posonlyargs + args.args],
+            defaults=len(args.defaults),
+            vararg=args.vararg is not None,
+            kwonly=[a.arg for a in args.kwonlyargs],
+            kwonly_required=[a.arg for a, d in zip(args.kwonlyargs, args.kw_defaults) if d is None],
+            kwarg=args.kwarg is not None,
+        )
+
+    def bound(self) -> "Signature":
+        """The signature with its first parameter (self / cls) already supplied"""
+        if not self.params:
+            return self
+        return Signature(self.params[1:], min(self.defaults, len(self.params) - 1), self.vararg,
+                         self.kwonly, self.kwonly_required, self.kwarg)
+
+    def check(self, call: ast.Call) -> Optional[str]:
+        """Return why the call cannot bind to this signature, or None"""
+        if any(isinstance(arg, ast.Starred) for arg in call.args):
+            return None
+        positional = len(call.args)
+        keywords = [kw.arg for kw in call.keywords if kw.arg is not None]
+        spread_kwargs = any(kw.arg is None for kw in call.keywords)
+
+        if positional > len(self.params) and not self.vararg:
+            return f"takes {len(self.params)} positional argument(s) but {positional} were given"
+        for name in keywords:
+            if name in self.params[:positional]:
+                return f"got multiple values for argument '{name}'"
+            if name not in self.params and name not in self.kwonly and not self.kwarg:
+                return f"got an unexpected keyword argument '{name}'"
+        if spread_kwargs:
+            return None
+        required = self.params[:len(self.params) - self.defaults]
+        missing = [name for name in required[positional:] if name not in keywords]
+        if missing:
+            names = ", ".join(f"'{name}'" for name in missing)
+            return f"missing {len(missing)} required positional argument(s): {names}"
+        missing = [name for name in self.kwonly_required if name not in keywords]
+        if missing:
+            names = ", ".join(f"'{name}'" for name in missing)
+            return f"missing {len(missing)} required keyword-only argument(s): {names}"
+        return None
+
+
+@dataclass
+class FunctionInfo:
+    name: str
+    signature: Optional[Signature]  # None when a decorator may have changed it
+    kind: Literal["function", "method", "staticmethod", "classmethod", "property"] = "function"
+
+
+@dataclass
+class ClassInfo:
+    name: str
+    module: "ModuleInfo"
+    node: ast.ClassDef
+    methods: Dict[str, FunctionInfo] = field(default_factory=dict)
+    attributes: Set[str] = field(default_factory=set)
+    attribute_types: Dict[str, "ClassInfo"] = field(default_factory=dict)
+    bases: List["ClassInfo"] = field(default_factory=list)
+    open: bool = False  # Unknown bases, metaclasses, decorators or __getattr__: attributes cannot be checked
+
+    def lookup(self, name: str, seen: Optional[Set[int]] = None) -> Tuple[bool, Optional[FunctionInfo]]:
+        """Find a method or attribute along the project MRO; returns (found, method)"""
+        seen = seen if seen is not None else set()
+        if id(self) in seen:
+            return False, None
+        seen.add(id(self))
+        if name in self.methods:
+            return True, self.methods[name]
+        if name in self.attributes:
+            return True, None
+        for base in self.bases:
+            found, method = base.lookup(name, seen)
+            if found:
+                return found, method
+        return False, None
+
+    def is_open(self, seen: Optional[Set[int]] = None) -> bool:
+        seen = seen if seen is not None else set()
+        if self.open or id(self) in seen:
+            return self.open
+        seen.add(id(self))
+        return any(base.is_open(seen) for base in self.bases)
+
+    def attribute_type(self, name: str) -> Optional["ClassInfo"]:
+        if name in self.attribute_types:
+            return self.attribute_types[name]
+        for base in self.bases:
+            found = base.attribute_type(name)
+            if found is not None:
+                return found
+        return None
+
+
+@dataclass
+class ModuleInfo:
+    name: str
+    path: str
+    tree: Optional[ast.Module]  # None when the file does not parse
+    is_package: bool = False
+    bindings: Dict[str, List[ast.AST]] = field(default_factory=dict)  # Module-level name -> binding nodes
+    classes: Dict[str, ClassInfo] = field(default_factory=dict)
+    functions: Dict[str, FunctionInfo] = field(default_factory=dict)
+    imports: Dict[str, Tuple[str, Optional[str]]] = field(default_factory=dict)  # name -> (module, attr)
+    assigned_calls: Dict[str, ast.expr] = field(default_factory=dict)  # name -> callee of `name = callee(...)`
+    open: bool = False  # Star imports or a module __getattr__
+
+    def defines(self, name: str) -> bool:
+        return name in self.bindings
+
+
+Ref = Tuple[str, Any]  # ("module" | "class" | "instance" | "function" | "method" | "unbound", target)
+
+
+def module_name(path: str) -> str:
+    parts = path.replace("\\", "/").lstrip("./").split("/")
+    parts[-1] = parts[-1][:-3]
+    if parts[-1] == "__init__":
+        parts.pop()
+    return ".".join(part for part in parts if part)
+
+
+def _is_python(file: Any) -> bool:
+    return file.path.endswith(".py") or (file.file_type == "python" and "." not in file.path.rsplit("/", 1)[-1])
+
+
+def _bound_names(target: ast.AST) -> List[str]:
+    return [node.id for node in ast.walk(target) if isinstance(node, ast.Name) and isinstance(node.ctx, ast.Store)]
+
+
+def _scope_nodes(body: List[ast.stmt]):
+    """Walk the statements of one scope without entering nested functions, classes or lambdas"""
+    stack = list(reversed(body))
+    while stack:
+        node = stack.pop()
+        yield node
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            # Decorators, defaults and bases are evaluated in the enclosing scope
+            stack.extend(reversed(node.decorator_list))
+            if not isinstance(node, ast.ClassDef):
+                stack.extend(reversed(node.args.defaults + [d for d in node.args.kw_defaults if d]))
+            else:
+                stack.extend(reversed(node.bases))
+            continue
+        if isinstance(node, ast.Lambda):
+            continue
+        stack.extend(reversed(list(ast.iter_child_nodes(node))))
+
+
+def _decorator_name(node: ast.expr) -> str:
+    if isinstance(node, ast.Call):
+        node = node.func
+    if isinstance(node, ast.Attribute):
+        return node.attr
+    return node.id if isinstance(node, ast.Name) else ""
+
+
+def _function_info(node: Any, in_class: bool) -> FunctionInfo:
+    decorators = [_decorator_name(d) for d in node.decorator_list]
+    signature = Signature.from_args(node.args)
+    kind = "method" if in_class else "function"
+    for name in ("staticmethod", "classmethod", "property"):
+        if name in decorators:
+            kind = name
+    if any(d not in KNOWN_DECORATORS for d in decorators) or any(d.endswith(("setter", "deleter")) for d in decorators):
+        signature = None
+    return FunctionInfo(name=node.name, signature=signature, kind=kind)
+
+
+class ProjectIndex:
+    """Definitions of every generated Python module, keyed by every name it can be imported as"""
+
+    def __init__(self, files: List[Any]):
+        self.modules: List[ModuleInfo] = []
+        self.by_name: Dict[str, Optional[ModuleInfo]] = {}
+        self.issues: List[StaticIssue] = []
+        # Attribute names assigned anywhere (obj.x = ...), which may be set from outside the class
+        self.assigned_attributes: Set[str] = set()
+        self._resolving: Set[Tuple[str, str]] = set()
+
+        for file in files:
+            if not _is_python(file):
+                continue
+            try:
+                tree = ast.parse(file.content, filename=file.path)
+            except SyntaxError as e:
+                self.issues.append(StaticIssue(file.path, e.lineno or 1, "error", f"SyntaxError: {e.msg}"))
+                tree = None
+            name = module_name(file.path if file.path.endswith(".py") else f"{file.path}.py")
+            module = ModuleInfo(name=name, path=file.path, tree=tree, is_package=file.path.endswith("__init__.py"))
+            self.modules.append(module)
+
+        self._register_names()
+        self._add_namespace_packages()
+        self.roots = {name.split(".")[0] for name in self.by_name}
+        for module in self.modules:
+            if module.tree is not None:
+                self._collect(module)
+        for module in self.modules:
+            for cls in module.classes.values():
+                self._link_class(cls)
+
+    def _register_names(self) -> None:
+        # A module at MovieMingle/app/models.py imports as app.models when run from MovieMingle/,
+        # so every directory that is not itself a package is a possible import root.
+        # Names that more than one file could claim are not resolved.
+        packages = {module.name for module in self.modules if module.is_package}
+        exact = {module.name: module for module in self.modules}
+        for module in self.modules:
+            parts = module.name.split(".")
+            for start in range(1, len(parts)):
+                if ".".join(parts[:start]) in packages:
+                    continue
+                suffix = ".".join(parts[start:])
+                if suffix in exact:
+                    continue
+                if suffix in self.by_name and self.by_name[suffix] is not module:
+                    self.by_name[suffix] = None
+                else:
+                    self.by_name[suffix] = module
+        self.by_name.update(exact)
+
+    def _add_namespace_packages(self) -> None:
+        # Directories without an __init__.py still import as namespace packages
+        for name, module in list(self.by_name.items()):
+            if module is None:
+                continue
+            parts = name.split(".")
+            for end in range(1, len(parts)):
+                prefix = ".".join(parts[:end])
+                if prefix not in self.by_name:
+                    self.by_name[prefix] = ModuleInfo(
+                        name=prefix, path=prefix.replace(".", "/") + "/",
+                        tree=ast.Module(body=[], type_ignores=[]), is_package=True,
+                    )
+
+    def module(self, name: str) -> Optional[ModuleInfo]:
+        return self.by_name.get(name)
+
+    def is_project_root(self, name: str) -> bool:
+        """Whether an absolute import name starts with a generated module or package"""
+        return name.split(".")[0] in self.roots
+
+    def resolve_import(self, module: ModuleInfo, target: Optional[str], level: int) -> Optional[str]:
+        """Absolute dotted name of an import target as seen from a module"""
+        if level == 0:
+            return target
+        package = module.name.split(".") if module.is_package else module.name.split(".")[:-1]
+        if level > 1:
+            package = package[:len(package) - (level - 1)]
+        return ".".join(package + ([target] if target else []))
+
+    def _collect(self, module: ModuleInfo) -> None:
+        globals_declared: Set[str] = set()
+        for node in ast.walk(module.tree):
+            if isinstance(node, ast.Global):
+                globals_declared.update(node.names)
+            elif isinstance(node, ast.Attribute) and isinstance(node.ctx, ast.Store):
+                self.assigned_attributes.add(node.attr)
+
+        for node in _scope_nodes(module.tree.body):
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                module.bindings.setdefault(node.name, []).append(node)
+                module.functions[node.name] = _function_info(node, in_class=False)
+                if node.name == "__getattr__":
+                    module.open = True
+            elif isinstance(node, ast.ClassDef):
+                module.bindings.setdefault(node.name, []).append(node)
+                module.classes[node.name] = self._class_info(node, module)
+            elif isinstance(node, ast.Import):
+                for alias in node.names:
+                    bound = alias.asname or alias.name.split(".")[0]
+                    module.bindings.setdefault(bound, []).append(node)
+                    target = alias.name if alias.asname else alias.name.split(".")[0]
+                    module.imports[bound] = (target, None)
+            elif isinstance(node, ast.ImportFrom):
+                source = self.resolve_import(module, node.module, node.level)
+                for alias in node.names:
+                    if alias.name == "*":
+                        module.open = True
+                        continue
+                    bound = alias.asname or alias.name
+                    module.bindings.setdefault(bound, []).append(node)
+                    module.imports[bound] = (source, alias.name)
+            elif isinstance(node, ast.Name) and isinstance(node.ctx, ast.Store):
+                module.bindings.setdefault(node.id, []).append(node)
+            if (isinstance(node, ast.Assign) and len(node.targets) == 1
+                    and isinstance(node.targets[0], ast.Name) and isinstance(node.value, ast.Call)):
+                module.assigned_calls[node.targets[0].id] = node.value.func
+        for name in globals_declared:
+            module.bindings.setdefault(name, []).append(module.tree)
+
+    def _class_info(self, node: ast.ClassDef, module: ModuleInfo) -> ClassInfo:
+        cls = ClassInfo(name=node.name, module=module, node=node)
+        cls.open = bool(node.decorator_list) or any(kw.arg == "metaclass" for kw in node.keywords)
+        for stmt in node.body:
+            if isinstance(stmt, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                info = _function_info(stmt, in_class=True)
+                cls.methods[stmt.name] = info
+                if stmt.name in ("__getattr__", "__getattribute__", "__new__"):
+                    cls.open = True
+                for sub in ast.walk(stmt):
+                    if (isinstance(sub, ast.Attribute) and isinstance(sub.ctx, ast.Store)
+                            and isinstance(sub.value, ast.Name) and sub.value.id == "self"):
+                        cls.attributes.add(sub.attr)
+            elif isinstance(stmt, ast.ClassDef):
+                cls.attributes.add(stmt.name)
+            else:
+                for sub in _scope_nodes([stmt]):
+                    if isinstance(sub, ast.Name) and isinstance(sub.ctx, ast.Store):
+                        cls.attributes.add(sub.id)
+                        if sub.id == "__slots__":
+                            cls.open = True
+        return cls
+
+    def _link_class(self, cls: ClassInfo) -> None:
+        resolver = ScopeResolver(self, cls.module)
+        for base in cls.node.bases:
+            ref = resolver.resolve(base)
+            if ref is not None and ref[0] == "class":
+                cls.bases.append(ref[1])
+            elif not (isinstance(base, ast.Name) and base.id == "object"):
+                cls.open = True
+        # Remember attributes whose type is a project class, e.g. self.snake = Snake()
+        init = next((s for s in cls.node.body if isinstance(s, ast.FunctionDef) and s.name == "__init__"), None)
+        if init is None:
+            return
+        candidates: Dict[str, Set[int]] = {}
+        types: Dict[str, ClassInfo] = {}
+        for sub in ast.walk(init):
+            if isinstance(sub, ast.Assign) and isinstance(sub.value, ast.Call):
+                ref = resolver.resolve(sub.value.func)
+                for target in sub.targets:
+                    if (isinstance(target, ast.Attribute) and isinstance(target.value, ast.Name)
+                            and target.value.id == "self" and ref is not None and ref[0] == "class"):
+                        candidates.setdefault(target.attr, set()).add(id(ref[1]))
+                        types[target.attr] = ref[1]
+        cls.attribute_types = {name: types[name] for name, ids in candidates.items() if len(ids) == 1}
+
+    def lookup_module_attr(self, module: ModuleInfo, name: str) -> Tuple[bool, Optional[Ref]]:
+        """Resolve module.name; returns (exists, reference)"""
+        submodule = self.module(f"{module.name}.{name}") if module.is_package else None
+        if not module.defines(name):
+            if submodule is not None:
+                return True, ("module", submodule)
+            return module.open or module.tree is None, None
+        bindings = module.bindings[name]
+        if len(bindings) != 1:
+            return True, None
+        if name in module.classes:
+            return True, ("class", module.classes[name])
+        if name in module.functions:
+            return True, ("function", module.functions[name])
+        if name in module.imports:
+            return True, self.import_ref(*module.imports[name])
+        if name in module.assigned_calls and (module.name, name) not in self._resolving:
+            # Module-level instances such as game = SnakeGame()
+            self._resolving.add((module.name, name))
+            try:
+                ref = ScopeResolver(self, module).resolve(module.assigned_calls[name])
+            finally:
+                self._resolving.discard((module.name, name))
+            return True, ("instance", ref[1]) if ref is not None and ref[0] == "class" else None
+        return True, None
+
+    def import_ref(self, source: Optional[str], attr: Optional[str], depth: int = 0) -> Optional[Ref]:
+        if source is None or depth > 10:
+            return None
+        target = self.module(source)
+        if target is None:
+            return None
+        if attr is None:
+            return "module", target
+        if not target.defines(attr):
+            submodule = self.module(f"{target.name}.{attr}")
+            return ("module", submodule) if submodule is not None else None
+        bindings = target.bindings[attr]
+        if len(bindings) != 1:
+            return None
+        if attr in target.classes:
+            return "class", target.classes[attr]
+        if attr in target.functions:
+            return "function", target.functions[attr]
+        if attr in target.imports:
+            return self.import_ref(*target.imports[attr], depth=depth + 1)
+        return None
+
+
+class ScopeResolver:
+    """Resolve expressions in one function (or module) scope to project definitions"""
+
+    def __init__(self, index: ProjectIndex, module: ModuleInfo, parent: Optional["ScopeResolver"] = None):
+        self.index = index
+        self.module = module
+        self.parent = parent
+        self.local_names: Set[str] = set()
+        self.local_types: Dict[str, Ref] = {}
+
+    @classmethod
+    def for_function(cls, index: ProjectIndex, module: ModuleInfo, node: Any,
+                     parent: "ScopeResolver", owner: Optional[ClassInfo]) -> "ScopeResolver":
+        scope = cls(index, module, parent)
+        args = node.args
+        params = args.posonlyargs + args.args + args.kwonlyargs
+        params += [a for a in (args.vararg, args.kwarg) if a is not None]
+        declared_global: Set[str] = set()
+        assignments: Dict[str, List[ast.AST]] = {}
+        for sub in _scope_nodes(node.body):
+            if isinstance(sub, (ast.Global, ast.Nonlocal)):
+                declared_global.update(sub.names)
+            elif isinstance(sub, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                assignments.setdefault(sub.name, []).append(sub)
+            elif isinstance(sub, (ast.Import, ast.ImportFrom)):
+                for alias in sub.names:
+                    assignments.setdefault(alias.asname or alias.name.split(".")[0], []).append(sub)
+            elif isinstance(sub, ast.Name) and isinstance(sub.ctx, ast.Store):
+                assignments.setdefault(sub.id, []).append(sub)
+            elif isinstance(sub, ast.Assign):
+                for target in sub.targets:
+                    if isinstance(target, ast.Name):
+                        assignments.setdefault(target.id, []).append(sub)
+        for param in params:
+            assignments.setdefault(param.arg, []).append(param)
+        scope.local_names = set(assignments) - declared_global
+
+        # Only names with a single kind of binding get a type
+        first_param = (args.posonlyargs + args.args)[0].arg if (args.posonlyargs + args.args) else None
+        method_kind = owner.methods.get(node.name).kind if owner is not None and node.name in owner.methods else None
+        for name, bindings in assignments.items():
+            if name in declared_global:
+                continue
+            if owner is not None and name == first_param and method_kind in ("method", "property", "classmethod"):
+                if len(bindings) == 1:
+                    scope.local_types[name] = ("class" if method_kind == "classmethod" else "instance", owner)
+                continue
+            scope.local_types[name] = scope._binding_type(bindings)
+        return scope
+
+    def _binding_type(self, bindings: List[ast.AST]) -> Optional[Ref]:
+        refs = []
+        for binding in bindings:
+            if isinstance(binding, ast.Name):
+                continue  # The matching ast.Assign carries the value
+            if isinstance(binding, ast.arg) and binding.annotation is not None:
+                ref = self.resolve(binding.annotation)
+                refs.append(("instance", ref[1]) if ref and ref[0] == "class" else None)
+            elif isinstance(binding, ast.Assign) and isinstance(binding.value, ast.Call) and len(binding.targets) == 1:
+                ref = self.resolve(binding.value.func)
+                refs.append(("instance", ref[1]) if ref and ref[0] == "class" else None)
+            else:
+                refs.append(None)
+        names = sum(1 for b in bindings if isinstance(b, ast.Name))
+        if not refs or names > sum(1 for b in bindings if isinstance(b, ast.Assign)) or None in refs:
+            return None
+        if any(ref[1] is not refs[0][1] for ref in refs):
+            return None
+        return refs[0]
+
+    def resolve_name(self, name: str) -> Optional[Ref]:
+        if name in self.local_names:
+            return self.local_types.get(name)
+        if self.parent is not None:
+            return self.parent.resolve_name(name)
+        return self.index.lookup_module_attr(self.module, name)[1] if self.module.defines(name) else None
+
+    def resolve(self, node: ast.AST) -> Optional[Ref]:
+        if isinstance(node, ast.Name):
+            return self.resolve_name(node.id)
+        if isinstance(node, ast.Attribute):
+            base = self.resolve(node.value)
+            return self.member(base, node.attr)[1] if base is not None else None
+        if isinstance(node, ast.Call):
+            ref = self.resolve(node.func)
+            if ref is not None and ref[0] == "class":
+                return "instance", ref[1]
+        return None
+
+    def member(self, base: Ref, name: str) -> Tuple[bool, Optional[Ref]]:
+        """Resolve base.name; returns (exists, reference)"""
+        kind, target = base
+        if kind == "module":
+            return self.index.lookup_module_attr(target, name)
+        if kind in ("class", "instance"):
+            if name.startswith("__") and name.endswith("__"):
+                return True, None  # Inherited from object / type
+            found, method = target.lookup(name)
+            if not found:
+                return target.is_open() or name in self.index.assigned_attributes, None
+            if method is not None:
+                if method.kind == "property":
+                    return True, None
+                if kind == "class" and method.kind == "method":
+                    return True, ("unbound", method)
+                return True, ("method", method)
+            attr_type = target.attribute_type(name) if kind == "instance" else None
+            return True, ("instance", attr_type) if attr_type is not None else None
+        return True, None
+
+
+class FileChecker:
+    """Walk one module and report imports, calls and attributes that cannot work"""
+
+    def __init__(self, index: ProjectIndex, module: ModuleInfo):
+        self.index = index
+        self.module = module
+        self.issues: List[StaticIssue] = []
+
+    def report(self, node: ast.AST, message: str, severity: Literal["error", "warning"] = "error") -> None:
+        self.issues.append(StaticIssue(self.module.path, getattr(node, "lineno", 1), severity, message))
+
+    def run(self) -> List[StaticIssue]:
+        self.check_imports()
+        self.check_scope(self.module.tree.body, ScopeResolver(self.index, self.module), owner=None)
+        return self.issues
+
+    def check_imports(self) -> None:
+        for node in ast.walk(self.module.tree):
+            if isinstance(node, ast.Import):
+                for alias in node.names:
+                    if self.index.is_project_root(alias.name) and self.index.module(alias.name) is None:
+                        self.report(node, f"No module named '{alias.name}' in the generated project")
+            elif isinstance(node, ast.ImportFrom):
+                source = self.index.resolve_import(self.module, node.module, node.level)
+                target = self.index.module(source) if source else None
+                if target is None:
+                    if node.level or (source and self.index.is_project_root(source)):
+                        shown = "." * node.level + (node.module or "")
+                        self.report(node, f"No module named '{shown}' in the generated project")
+                    continue
+                for alias in node.names:
+                    if alias.name == "*":
+                        continue
+                    exists, _ = self.index.lookup_module_attr(target, alias.name)
+                    if not exists:
+                        self.report(node, f"cannot import name '{alias.name}' from '{target.name}' ({target.path})")
+
+    def check_scope(self, body: List[ast.stmt], scope: ScopeResolver, owner: Optional[ClassInfo]) -> None:
+        for node in _scope_nodes(body):
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                inner = ScopeResolver.for_function(self.index, self.module, node, scope, owner)
+                self.check_scope(node.body, inner, owner=None)
+            elif isinstance(node, ast.ClassDef):
+                cls = self.module.classes.get(node.name) if scope.parent is None else None
+                for stmt in node.body:
+                    if isinstance(stmt, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                        inner = ScopeResolver.for_function(self.index, self.module, stmt, scope, cls)
+                        for decorator in stmt.decorator_list:
+                            self.check_expression(decorator, scope)
+                        self.check_scope(stmt.body, inner, owner=None)
+                    else:
+                        self.check_scope([stmt], scope, owner=None)
+            elif isinstance(node, ast.Call):
+                self.check_call(node, scope)
+            elif isinstance(node, ast.Attribute) and isinstance(node.ctx, ast.Load):
+                self.check_attribute(node, scope)
+
+    def check_expression(self, node: ast.AST, scope: ScopeResolver) -> None:
+        for sub in ast.walk(node):
+            if isinstance(sub, ast.Call):
+                self.check_call(sub, scope)
+            elif isinstance(sub, ast.Attribute) and isinstance(sub.ctx, ast.Load):
+                self.check_attribute(sub, scope)
+
+    def check_attribute(self, node: ast.Attribute, scope: ScopeResolver) -> None:
+        base = scope.resolve(node.value)
+        if base is None:
+            return
+        exists, _ = scope.member(base, node.attr)
+        if exists:
+            return
+        kind, target = base
+        if kind == "module":
+            self.report(node, f"module '{target.name}' ({target.path}) has no attribute '{node.attr}'")
+        elif kind == "class":
+            self.report(node, f"class '{target.name}' has no attribute '{node.attr}'")
+        else:
+            self.report(node, f"'{target.name}' object has no attribute '{node.attr}'")
+
+    def check_call(self, node: ast.Call, scope: ScopeResolver) -> None:
+        self.check_import_string(node)
+        ref = scope.resolve(node.func)
+        if ref is None:
+            return
+        kind, target = ref
+        signature = None
+        label = ast.unparse(node.func)
+        if kind == "class":
+            if target.is_open():
+                return
+            found, init = target.lookup("__init__")
+            if found and (init is None or init.signature is None):
+                return
+            signature = init.signature.bound() if found else Signature([], 0, False, [], [], False)
+            label = f"{target.name}()"
+        elif kind in ("function", "unbound") and target.signature is not None:
+            signature = target.signature
+        elif kind == "method" and target.signature is not None:
+            signature = target.signature if target.kind == "staticmethod" else target.signature.bound()
+        if signature is None:
+            return
+        problem = signature.check(node)
+        if problem:
+            if not label.endswith("()"):
+                label += "()"
+            self.report(node, f"{label} {problem}")
+
+    def check_import_string(self, node: ast.Call) -> None:
+        # e.g. app.config.from_object('config.Config') only works when the project root is on sys.path
+        name = node.func.attr if isinstance(node.func, ast.Attribute) else getattr(node.func, "id", "")
+        if name not in IMPORT_STRING_CALLS or not node.args:
+            return
+        arg = node.args[0]
+        if not isinstance(arg, ast.Constant) or not isinstance(arg.value, str) or not self.index.is_project_root(arg.value):
+            return
+        dotted = arg.value
+        if name == "import_module":
+            if self.index.module(dotted) is None:
+                self.report(node, f"import_module('{dotted}') does not match a generated module")
+            return
+        module_part, _, attr = dotted.rpartition(".")
+        target = self.index.module(module_part) if module_part else None
+        if target is None or not self.index.lookup_module_attr(target, attr)[0]:
+            self.report(node, f"import string '{dotted}' does not resolve to anything in the generated project")
+            return
+        self.report(
+            node,
+            f"'{dotted}' is loaded by import string, which only resolves when the project root is on "
+            f"sys.path; import the object and pass it directly",
+            severity="warning",
+        )
+
+
+def check_files(files: List[Any]) -> StaticReport:
+    """Statically check the generated FileStructure objects of one code attempt"""
+    started = time.perf_counter()
+    index = ProjectIndex(files)
+    issues = list(index.issues)
+    for module in index.modules:
+        if module.tree is not None:
+            issues.extend(FileChecker(index, module).run())
+
+    # One issue per location and message, in a stable order
+    unique = {(i.path, i.line, i.severity, i.message): i for i in issues}
+    ordered = sorted(unique.values(), key=lambda i: (i.severity != "error", i.path, i.line, i.message))
+    return StaticReport(issues=ordered, files_checked=len(index.modules), duration=time.perf_counter() - started)
@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+import json
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+"""
+Vibes Coding - Streaming Output
+
+Helpers for the streaming pipeline mode. Plans are printed as their tokens
+arrive, and generated files are written to a staging directory the moment
+their JSON object is complete in the code generator's structured output
+stream, instead of after the whole code loop finishes.
+
+Every streamed phase records its time-to-first-token and, for code
+generation, time-to-first-file.
+"""
+
+
+@dataclass
+class PhaseTiming:
+    phase: str
+    calls: int = 0
+    first_token: Optional[float] = None  # Seconds from call start to the first streamed token
+    first_file: Optional[float] = None  # Seconds from call start to the first complete file
+    total: float = 0.0
+
+
+class StreamingFileExtractor:
+    """Incrementally pull complete file objects out of a streamed CodeGenerationResult JSON"""
+
+    def __init__(self, on_file: Callable[[Dict[str, str]], None]):
+        self.on_file = on_file
+        self.buffer = ""
+        self.position: Optional[int] = None  # Index just inside the "files" array
+        self.done = False
+        self.decoder = json.JSONDecoder()
+
+    def feed(self, delta: str) -> None:
+        if self.done:
+            return
+        self.buffer += delta
+        if self.position is None:
+            key = self.buffer.find('"files"')
+            if key == -1:
+                return
+            bracket = self.buffer.find("[", key)
+            if bracket == -1:
+                return
+            self.position = bracket + 1
+
+        while True:
+            # Skip separators between objects
+            while self.position < len(self.buffer) and self.buffer[self.position] in " \t\r\n,":
+                self.position += 1
+            if self.position >= len(self.buffer):
+                return
+            if self.buffer[self.position] == "]":
+                self.done = True
+                return
+            try:
+                obj, end = self.decoder.raw_decode(self.buffer, self.position)
+            except json.JSONDecodeError:
+                return  # The current file object is not complete yet
+            self.position = end
+            if isinstance(obj, dict) and "path" in obj and "content" in obj:
+                self.on_file(obj)
+
+
+def write_staged_file(staging_dir: str, path: str, content: str) -> str:
+    """Write one generated file into the staging directory, refusing paths that escape it"""
+    root = os.path.abspath(staging_dir)
+    target = os.path.abspath(os.path.join(root, path))
+    if os.path.commonpath([root, target]) != root:
+        raise ValueError(f"Refusing to stage file outside the staging directory: {path}")
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    with open(target, "w") as f:
+        f.write(content)
+    return target
+
+
+@dataclass
+class StreamMonitor:
+    staging_dir: str
+    echo: bool = True
+    timings: Dict[str, PhaseTiming] = field(default_factory=dict)
+    staged_files: List[str] = field(default_factory=list)
+
+    def _timing(self, phase: str) -> PhaseTiming:
+        return self.timings.setdefault(phase, PhaseTiming(phase=phase))
+
+    def start(self, phase: str) -> "PhaseStream":
+        timing = self._timing(phase)
+        timing.calls += 1
+        return PhaseStream(self, timing)
+
+    def stage_file(self, stream: "PhaseStream", path: str, content: str) -> None:
+        write_staged_file(self.staging_dir, path, content)
+        self.staged_files.append(path)
+        stream.mark_file()
+        if self.echo:
+            print(f"\n📄 Staged {path} ({stream.elapsed():.1f}s)", flush=True)
+
+    def report(self) -> str:
+        lines = ["Phase                 Calls  First token  First file     Total"]
+        for t in self.timings.values():
+            first_token = f"{t.first_token:.2f}s" if t.first_token is not None else "-"
+            first_file = f"{t.first_file:.2f}s" if t.first_file is not None else "-"
+            lines.append(f"{t.phase:<20}  {t.calls:>5}  {first_token:>11}  {first_file:>10}  {t.total:>7.2f}s")
+        return "\n".join(lines)
+
+
+class PhaseStream:
+    """Callbacks for one streamed agent call"""
+
+    def __init__(self, monitor: StreamMonitor, timing: PhaseTiming):
+        self.monitor = monitor
+        self.timing = timing
+        self.started = time.perf_counter()
+        self.seen_token = False
+        self.seen_file = False
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def mark_token(self) -> None:
+        if not self.seen_token:
+            self.seen_token = True
+            elapsed = self.elapsed()
+            if self.timing.first_token is None or elapsed < self.timing.first_token:
+                self.timing.first_token = elapsed
+
+    def mark_file(self) -> None:
+        if not self.seen_file:
+            self.seen_file = True
+            elapsed = self.elapsed()
+            if self.timing.first_file is None or elapsed < self.timing.first_file:
+                self.timing.first_file = elapsed
+
+    def finish(self) -> None:
+        self.timing.total += self.elapsed()
+
+    def timer(self) -> Callable[[str], None]:
+        """Only record time-to-first-token"""
+        return lambda delta: self.mark_token()
+
+    def printer(self) -> Callable[[str], None]:
+        """Print text deltas as they arrive"""
+        def on_text(delta: str) -> None:
+            self.mark_token()
+            print(delta, end="", flush=True)
+        return on_text
+
+    def file_stager(self) -> Callable[[str], None]:
+        """Write each file to the staging area as soon as its JSON object is complete"""
+        extractor = StreamingFileExtractor(
+            lambda file: self.monitor.stage_file(self, file["path"], file["content"])
+        )
+
+        def on_text(delta: str) -> None:
+            self.mark_token()
+            extractor.feed(delta)
+        return on_text
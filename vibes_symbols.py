@@ -0,0 +1,275 @@
+from __future__ import annotations
+
+import ast
+import hashlib
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from vibes_static_checks import module_name
+
+"""
+Vibes Coding - Project Symbol Index
+
+A local index of the generated project: for every file its module name,
+imports, classes (with bases and method signatures), functions, module-level
+names and web routes. It is built from the FileStructure list the code
+generator returns and updated incrementally: only files whose content changed
+since the last update are parsed again, and files that are gone are dropped.
+
+The code generator, code evaluator and file refiner query it through function
+tools (project_outline, file_outline, find_symbol), so questions about the
+project's structure are answered from the actual files in microseconds and
+cost no tokens.
+"""
+
+MAX_FIND_RESULTS = 20  # Definitions (and importers) listed per find_symbol call
+
+# HTTP route decorators: @app.route("/x"), @bp.get("/x"), @router.post("/x"), ...
+ROUTE_DECORATORS = {"route", "get", "post", "put", "patch", "delete", "websocket", "api_route"}
+
+
+@dataclass
+class Symbol:
+    name: str  # Qualified within its module, e.g. "User.save"
+    kind: str  # class / function / method / variable / route
+    path: str
+    line: int
+    signature: str = ""  # "(self, name: str) -> None", "(Base)" for classes, "GET /users" for routes
+
+    def __str__(self) -> str:
+        return f"{self.kind} {self.name}{self.signature} ({self.path}:{self.line})"
+
+
+@dataclass
+class FileSymbols:
+    path: str
+    module: Optional[str]  # None for non-Python files
+    sha256: str
+    symbols: List[Symbol] = field(default_factory=list)
+    imports: List[str] = field(default_factory=list)  # Imported modules, plus module.name for from-imports
+    error: Optional[str] = None  # Syntax error that stopped parsing
+
+
+@dataclass
+class IndexStats:
+    parsed: int = 0  # Files (re)parsed
+    reused: int = 0  # Files skipped because their content was unchanged
+    removed: int = 0
+    lookups: int = 0
+    lookup_seconds: float = 0.0
+
+
+def _signature(node: Any) -> str:
+    returns = f" -> {ast.unparse(node.returns)}" if node.returns is not None else ""
+    return f"({ast.unparse(node.args)}){returns}"
+
+
+def _routes(node: Any) -> List[str]:
+    routes = []
+    for decorator in node.decorator_list:
+        if not (isinstance(decorator, ast.Call) and isinstance(decorator.func, ast.Attribute)):
+            continue
+        verb = decorator.func.attr
+        if verb not in ROUTE_DECORATORS or not decorator.args:
+            continue
+        if not (isinstance(decorator.args[0], ast.Constant) and isinstance(decorator.args[0].value, str)):
+            continue
+        methods = [verb.upper()] if verb not in ("route", "api_route", "websocket") else ["GET"]
+        for keyword in decorator.keywords:
+            if keyword.arg == "methods" and isinstance(keyword.value, (ast.List, ast.Tuple)):
+                methods = [e.value.upper() for e in keyword.value.elts if isinstance(e, ast.Constant)]
+        routes.append(f"{'|'.join(methods)} {decorator.args[0].value}")
+    return routes
+
+
+def parse_file(path: str, content: str) -> FileSymbols:
+    """Extract the symbols of one generated file"""
+    digest = hashlib.sha256(content.encode("utf-8")).hexdigest()
+    if not path.endswith(".py"):
+        return FileSymbols(path=path, module=None, sha256=digest)
+    entry = FileSymbols(path=path, module=module_name(path), sha256=digest)
+    try:
+        tree = ast.parse(content, filename=path)
+    except SyntaxError as e:
+        entry.error = f"line {e.lineno}: {e.msg}"
+        return entry
+
+    def add_function(node: Any, prefix: str = "") -> None:
+        kind = "method" if prefix else "function"
+        entry.symbols.append(Symbol(f"{prefix}{node.name}", kind, path, node.lineno, _signature(node)))
+        for route in _routes(node):
+            entry.symbols.append(Symbol(f"{prefix}{node.name}", "route", path, node.lineno, f" {route}"))
+
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            add_function(node)
+        elif isinstance(node, ast.ClassDef):
+            bases = ", ".join(ast.unparse(base) for base in node.bases)
+            entry.symbols.append(Symbol(node.name, "class", path, node.lineno, f"({bases})" if bases else ""))
+            for item in node.body:
+                if isinstance(item, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                    add_function(item, f"{node.name}.")
+        elif isinstance(node, (ast.Assign, ast.AnnAssign)):
+            targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+            for target in targets:
+                if isinstance(target, ast.Name):
+                    entry.symbols.append(Symbol(target.id, "variable", path, node.lineno))
+        elif isinstance(node, ast.Import):
+            entry.imports.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            source = "." * node.level + (node.module or "")
+            entry.imports.extend(f"{source}.{alias.name}" if source.strip(".") else f"{source}{alias.name}"
+                                 for alias in node.names)
+    return entry
+
+
+class SymbolIndex:
+    """Incrementally updated symbol table of the generated project"""
+
+    def __init__(self):
+        self.files: Dict[str, FileSymbols] = {}
+        self.stats = IndexStats()
+
+    def update(self, files: List[Any]) -> List[str]:
+        """Bring the index in line with the project's files; return the paths that were parsed"""
+        parsed = []
+        seen = set()
+        for file in files:
+            seen.add(file.path)
+            current = self.files.get(file.path)
+            if current is not None and current.sha256 == hashlib.sha256(file.content.encode("utf-8")).hexdigest():
+                self.stats.reused += 1
+                continue
+            self.files[file.path] = parse_file(file.path, file.content)
+            self.stats.parsed += 1
+            parsed.append(file.path)
+        for path in [path for path in self.files if path not in seen]:
+            del self.files[path]
+            self.stats.removed += 1
+        return parsed
+
+    @property
+    def symbol_count(self) -> int:
+        return sum(len(entry.symbols) for entry in self.files.values())
+
+    def _timed(self, answer) -> str:
+        started = time.perf_counter()
+        try:
+            return answer()
+        finally:
+            self.stats.lookups += 1
+            self.stats.lookup_seconds += time.perf_counter() - started
+
+    def _file_lines(self, entry: FileSymbols) -> List[str]:
+        header = entry.path if entry.module is None else f"{entry.path} (module {entry.module})"
+        lines = [header]
+        if entry.error:
+            lines.append(f"  syntax error at {entry.error}")
+        if entry.imports:
+            lines.append(f"  imports: {', '.join(entry.imports)}")
+        for symbol in entry.symbols:
+            indent = "    " if symbol.kind == "method" else "  "
+            lines.append(f"{indent}{symbol.kind} {symbol.name}{symbol.signature}  [line {symbol.line}]")
+        return lines
+
+    def outline(self) -> str:
+        """Every file with its imports and symbols"""
+        def answer() -> str:
+            if not self.files:
+                return "No project files have been generated yet."
+            lines = []
+            for path in sorted(self.files):
+                lines.extend(self._file_lines(self.files[path]))
+            return "\n".join(lines)
+        return self._timed(answer)
+
+    def file_outline(self, path: str) -> str:
+        def answer() -> str:
+            entry = self.files.get(path.removeprefix("./"))
+            if entry is None:
+                return f"No generated file {path}. Files: {', '.join(sorted(self.files)) or 'none'}"
+            return "\n".join(self._file_lines(entry))
+        return self._timed(answer)
+
+    def find(self, name: str) -> str:
+        """Definitions of name (plain or qualified, e.g. "save", "User.save" or "app.models.User") and its importers
+
+        Exact names win; only when nothing matches exactly are methods with that short name, and then
+        names containing it, returned. Results are capped at MAX_FIND_RESULTS.
+        """
+        def answer() -> str:
+            symbols = [(entry, symbol) for entry in self.files.values() for symbol in entry.symbols]
+            lowered = name.lower()
+            tiers = [
+                lambda entry, symbol: symbol.name == name or f"{entry.module}.{symbol.name}" == name,
+                lambda entry, symbol: symbol.name.rsplit(".", 1)[-1] == name.rsplit(".", 1)[-1],
+                lambda entry, symbol: lowered in symbol.name.lower(),
+            ]
+            definitions: List[Symbol] = []
+            for matches in tiers:
+                definitions = [symbol for entry, symbol in symbols if matches(entry, symbol)]
+                if definitions:
+                    break
+            short = name.rsplit(".", 1)[-1]
+            importers = sorted(
+                entry.path for entry in self.files.values()
+                if any(imported == name or imported.rsplit(".", 1)[-1] == short for imported in entry.imports)
+            )
+            if not definitions and not importers:
+                return f"{name} is not defined or imported anywhere in the generated project."
+            definitions.sort(key=lambda s: (s.path, s.line))
+            lines = [str(symbol) for symbol in definitions[:MAX_FIND_RESULTS]]
+            if len(definitions) > MAX_FIND_RESULTS:
+                lines.append(f"... and {len(definitions) - MAX_FIND_RESULTS} more; use a qualified name such as Class.method")
+            if importers:
+                shown = ", ".join(importers[:MAX_FIND_RESULTS])
+                more = f" and {len(importers) - MAX_FIND_RESULTS} more" if len(importers) > MAX_FIND_RESULTS else ""
+                lines.append(f"imported by: {shown}{more}")
+            return "\n".join(lines)
+        return self._timed(answer)
+
+    def summary(self) -> str:
+        s = self.stats
+        return (
+            f"Symbol index: {len(self.files)} files, {self.symbol_count} symbols; {s.parsed} parsed, "
+            f"{s.reused} unchanged; {s.lookups} tool lookups in {s.lookup_seconds * 1000:.1f}ms"
+        )
+
+
+# The index of the pipeline run in progress; the agents' symbol tools answer from it
+active_index: ContextVar[Optional[SymbolIndex]] = ContextVar("vibes_active_index", default=None)
+
+
+def symbol_tools() -> List[Any]:
+    """Function tools that answer structure questions from the active run's symbol index"""
+    from agents import function_tool
+
+    def index() -> SymbolIndex:
+        return active_index.get() or SymbolIndex()
+
+    @function_tool
+    def project_outline() -> str:
+        """List every file of the generated project with its imports, classes, methods (with signatures), functions, module-level names and routes."""
+        return index().outline()
+
+    @function_tool
+    def file_outline(path: str) -> str:
+        """List the imports and symbols of one generated file.
+
+        Args:
+            path: The file's path relative to the project root, e.g. "app/models.py".
+        """
+        return index().file_outline(path)
+
+    @function_tool
+    def find_symbol(name: str) -> str:
+        """Find where a class, function, method or variable is defined, with its signature, and which files import it.
+
+        Args:
+            name: A plain or qualified name, e.g. "create_app" or "User.save".
+        """
+        return index().find(name)
+
+    return [project_outline, file_outline, find_symbol]
@@ -0,0 +1,305 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from vibes_artifacts import ArtifactStore
+
+"""
+Vibes Coding - Project Writer
+
+Writes a generated project to disk in one change-aware, all-or-nothing step.
+Every file is compared by content hash with what is already on disk and only
+changed files are written, so unchanged files keep their mtime and file
+watchers / auto-reloaders are not triggered. Changed files are first written
+to a staging directory next to the project; only when all of them are staged
+are they moved into place with atomic renames. The renames are one
+transaction: the files they replace or remove are kept as hardlinks in the
+staging directory, with a record of the swap, until the new manifest is in
+place. A failure partway through rolls the swapped files back, and a swap
+interrupted by a crash is rolled back by the next write to the project, so
+the project is never left as a mix of old and new files. The project
+directory itself stays put, so processes running in it keep working. A
+brand-new project directory is moved into place as a whole.
+
+Each project gets a manifest (.vibes_manifest.json) with the hash and size of
+every generated file. It lets the next run skip re-hashing files whose size
+and mtime are unchanged, and remove files that an earlier run generated but
+this one no longer does (unless they were edited since).
+
+With an ArtifactStore, file contents are kept as deduplicated blobs and the
+project files are linked to them instead of written out as fresh copies.
+"""
+
+MANIFEST_NAME = ".vibes_manifest.json"
+SWAP_RECORD = ".swap.json"  # In the staging directory while staged files are being swapped in
+BACKUP_DIR = ".backup"  # In the staging directory: the files the swap replaced or removed
+PARALLEL_THRESHOLD = 16  # Use a thread pool once a project has at least this many files
+
+
+@dataclass
+class ManifestEntry:
+    sha256: str
+    size: int
+    mtime: float
+
+
+@dataclass
+class WriteReport:
+    project_dir: str
+    written: List[str] = field(default_factory=list)
+    unchanged: List[str] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+    bytes_written: int = 0
+    duration: float = 0.0
+    new_blobs: int = 0  # Contents the artifact store had not seen before
+    reused_blobs: int = 0
+
+    def summary(self) -> str:
+        text = (
+            f"{len(self.written)} written ({self.bytes_written} bytes), {len(self.unchanged)} unchanged, "
+            f"{len(self.removed)} removed in {self.duration * 1000:.0f}ms"
+        )
+        if self.new_blobs or self.reused_blobs:
+            text += f"; artifact store: {self.new_blobs} new blobs, {self.reused_blobs} reused"
+        return text
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def file_hash(path: str) -> Optional[str]:
+    try:
+        with open(path, "rb") as f:
+            return content_hash(f.read())
+    except (FileNotFoundError, IsADirectoryError, NotADirectoryError):
+        return None
+
+
+def safe_join(root: str, path: str) -> str:
+    """Join a generated relative path onto root, refusing paths that escape it"""
+    root = os.path.abspath(root)
+    target = os.path.abspath(os.path.join(root, path))
+    if os.path.commonpath([root, target]) != root or target == root:
+        raise ValueError(f"Refusing to write file outside the project directory: {path}")
+    return target
+
+
+def load_manifest(project_dir: str) -> Dict[str, ManifestEntry]:
+    try:
+        with open(os.path.join(project_dir, MANIFEST_NAME), "r") as f:
+            data = json.load(f)
+        return {path: ManifestEntry(**entry) for path, entry in data.get("files", {}).items()}
+    except (FileNotFoundError, json.JSONDecodeError, TypeError):
+        return {}
+
+
+def _write_manifest(project_dir: str, entries: Dict[str, ManifestEntry]) -> None:
+    path = os.path.join(project_dir, MANIFEST_NAME)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({
+            "generated_at": time.time(),
+            "files": {p: {"sha256": e.sha256, "size": e.size, "mtime": e.mtime} for p, e in sorted(entries.items())},
+        }, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def _disk_hash(target: str, cached: Optional[ManifestEntry]) -> Optional[str]:
+    """Hash of a file on disk, trusting the manifest when size and mtime still match"""
+    try:
+        st = os.stat(target)
+    except FileNotFoundError:
+        return None
+    if cached is not None and cached.size == st.st_size and cached.mtime == st.st_mtime:
+        return cached.sha256
+    return file_hash(target)
+
+
+def _preserve(target: str, backup: str) -> None:
+    """Keep the current file at target reachable from backup, without touching target"""
+    os.makedirs(os.path.dirname(backup), exist_ok=True)
+    try:
+        os.link(target, backup, follow_symlinks=False)
+    except OSError:
+        shutil.copy2(target, backup, follow_symlinks=False)
+
+
+def _roll_back(project_dir: str, staging: str, record: Dict) -> None:
+    """Undo a swap: restore the files it replaced or removed and delete the ones it added"""
+    existed = set(record["existed"])
+    for path in record["paths"]:
+        target = safe_join(project_dir, path)
+        backup = safe_join(os.path.join(staging, BACKUP_DIR), path)
+        if path in existed:
+            if os.path.lexists(backup):
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                os.replace(backup, target)
+        elif os.path.lexists(target):
+            os.remove(target)
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _recover(project_dir: str) -> None:
+    """Roll back swaps into project_dir that a crashed writer left unfinished, and clear its staging"""
+    parent = os.path.dirname(os.path.abspath(project_dir))
+    prefix = f".{os.path.basename(project_dir)}."
+    try:
+        names = os.listdir(parent)
+    except FileNotFoundError:
+        return
+    for name in names:
+        if not (name.startswith(prefix) and name.endswith(".writing")):
+            continue
+        pid = name[len(prefix):].split(".", 1)[0]
+        if not pid.isdigit() or _pid_alive(int(pid)):
+            continue  # Not ours, or a writer that is still running
+        staging = os.path.join(parent, name)
+        try:
+            with open(os.path.join(staging, SWAP_RECORD), "r") as f:
+                _roll_back(project_dir, staging, json.load(f))
+        except (FileNotFoundError, json.JSONDecodeError):
+            pass  # Crashed before the swap started: the project was never touched
+        shutil.rmtree(staging, ignore_errors=True)
+
+
+def _map(func, items: list, max_workers: int) -> list:
+    if len(items) < PARALLEL_THRESHOLD or max_workers <= 1:
+        return [func(item) for item in items]
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        return list(pool.map(func, items))
+
+
+def _swap(project_dir: str, staging: str, changed: List[str], stale: List[str]) -> None:
+    """Move the staged files (and manifest) into place and remove the stale ones, all or nothing"""
+    paths = changed + stale + [MANIFEST_NAME]
+    removing = set(stale)
+    existed = []
+    for path in paths:
+        target = safe_join(project_dir, path)
+        if os.path.lexists(target):
+            _preserve(target, safe_join(os.path.join(staging, BACKUP_DIR), path))
+            existed.append(path)
+    record = {"paths": paths, "existed": existed}
+    with open(os.path.join(staging, SWAP_RECORD), "w") as f:
+        json.dump(record, f)
+    try:
+        for path in paths:
+            target = safe_join(project_dir, path)
+            if path in removing:
+                os.remove(target)
+            else:
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                os.replace(safe_join(staging, path), target)
+    except BaseException:
+        _roll_back(project_dir, staging, record)
+        raise
+    # Committed: from here on the staging directory is only clean-up
+    os.remove(os.path.join(staging, SWAP_RECORD))
+
+
+def write_project(
+    project_dir: str,
+    files: Dict[str, str],
+    max_workers: int = 8,
+    store: Optional[ArtifactStore] = None,
+) -> WriteReport:
+    """Bring project_dir in line with files (relative path -> content), writing only what changed
+
+    Either every change lands or, on failure, the project is left as it was.
+    """
+    started = time.perf_counter()
+    _recover(project_dir)
+    report = WriteReport(project_dir=project_dir)
+    payloads = {path: content.encode("utf-8") for path, content in files.items()}
+    targets = {path: safe_join(project_dir, path) for path in payloads}
+    hashes = {path: content_hash(data) for path, data in payloads.items()}
+    previous = load_manifest(project_dir)
+
+    on_disk = _map(lambda path: _disk_hash(targets[path], previous.get(path)), list(payloads), max_workers)
+    changed = [path for path, disk in zip(payloads, on_disk) if disk != hashes[path]]
+    changed_set = set(changed)
+    report.unchanged = [path for path, disk in zip(payloads, on_disk) if disk == hashes[path]]
+
+    if store is not None:
+        # Every file must have a blob, unchanged ones included, so the project can be materialized later
+        for path, data in payloads.items():
+            if os.path.exists(store.blob_path(hashes[path])):
+                report.reused_blobs += 1
+            else:
+                store.put(data)
+                report.new_blobs += 1
+
+    # Files an earlier run generated that are gone now are removed, unless someone edited them since
+    stale = []
+    for path, entry in previous.items():
+        if path in payloads:
+            continue
+        try:
+            target = safe_join(project_dir, path)
+        except ValueError:
+            continue
+        if _disk_hash(target, entry) == entry.sha256:
+            stale.append(path)
+
+    # Stage next to the project so the final renames stay on one filesystem
+    parent = os.path.dirname(os.path.abspath(project_dir))
+    os.makedirs(parent, exist_ok=True)
+    staging = tempfile.mkdtemp(
+        prefix=f".{os.path.basename(project_dir)}.{os.getpid()}.", suffix=".writing", dir=parent,
+    )
+    try:
+        def stage(path: str) -> None:
+            staged = safe_join(staging, path)
+            os.makedirs(os.path.dirname(staged), exist_ok=True)
+            if store is not None:
+                store.link(hashes[path], staged)
+                return
+            with open(staged, "wb") as f:
+                f.write(payloads[path])
+
+        _map(stage, changed, max_workers)
+
+        # The manifest is staged too, so it is swapped in with the files it describes
+        entries = {}
+        for path in payloads:
+            st = os.stat(safe_join(staging, path) if path in changed_set else targets[path])
+            entries[path] = ManifestEntry(sha256=hashes[path], size=st.st_size, mtime=st.st_mtime)
+        _write_manifest(staging, entries)
+
+        fresh = not os.path.isdir(project_dir) or not os.listdir(project_dir)
+        if fresh:
+            # Nothing to preserve: move the whole staged tree into place in one rename
+            if os.path.isdir(project_dir):
+                os.rmdir(project_dir)
+            os.replace(staging, project_dir)
+        else:
+            _swap(project_dir, staging, changed, stale)
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+
+    report.written = changed
+    report.bytes_written = sum(len(payloads[path]) for path in changed)
+    report.removed = stale
+
+    if store is not None:
+        store.save_manifest(project_dir, hashes, {path: len(data) for path, data in payloads.items()})
+    report.duration = time.perf_counter() - started
+    return report